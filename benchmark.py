@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能基准测试
+quantization: 特征库存储类型（float32/float16/uint16/uint8）的内存、速度与精度对比
+compaction:   每个用户保留k个代表样本时的准确率与匹配耗时
+detector:     单级Haar检测与两级检测（缩小图粗检 + 候选区域验证）的耗时和召回率
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from face_recognition.lbph_gallery import LBPHGallery, GALLERY_DTYPES
+from face_recognition.compaction import compact_histograms, compaction_report
+from face_recognition.preprocessing import FACE_SIZE
+from face_recognition.face_detector import FaceDetector
+from face_recognition.two_stage_detector import TwoStageDetector
+from face_recognition.tracking import box_iou
+
+DEFAULT_MODEL_PATH = "data/models/face_recognizer.lbph"
+DEFAULT_CASCADE = "data/models/haarcascade_frontalface_default.xml"
+ALT2_CASCADE = "data/models/haarcascade_frontalface_alt2.xml"
+
+
+def synthetic_faces(identities, samples, seed=0):
+    """生成合成人脸图像：每个身份一张低频随机纹理，样本加入平移、亮度变化和噪声
+
+    Returns:
+        images: (identities * samples, FACE_SIZE, FACE_SIZE) uint8
+        labels: (identities * samples,) int32
+    """
+    rng = np.random.default_rng(seed)
+    images = np.empty((identities * samples, FACE_SIZE, FACE_SIZE), dtype=np.uint8)
+    labels = np.repeat(np.arange(identities, dtype=np.int32), samples)
+
+    for identity in range(identities):
+        coarse = cv2.resize(rng.integers(0, 256, (10, 10)).astype(np.float32), (FACE_SIZE, FACE_SIZE),
+                            interpolation=cv2.INTER_CUBIC)
+        fine = cv2.resize(rng.integers(0, 256, (30, 30)).astype(np.float32), (FACE_SIZE, FACE_SIZE),
+                          interpolation=cv2.INTER_CUBIC)
+        base = 0.7 * coarse + 0.3 * fine
+        for j in range(samples):
+            dx, dy = rng.uniform(-3, 3, 2)
+            shift = np.float32([[1, 0, dx], [0, 1, dy]])
+            image = cv2.warpAffine(base, shift, (FACE_SIZE, FACE_SIZE), borderMode=cv2.BORDER_REFLECT)
+            image = image * rng.uniform(0.85, 1.15) + rng.normal(0, 6, image.shape)
+            images[identity * samples + j] = np.clip(image, 0, 255).astype(np.uint8)
+    return images, labels
+
+
+def cartoon_face(size):
+    """画一张Haar级联可以检测到的简笔人脸（脸部椭圆、眼睛、眉毛、鼻子、嘴）"""
+    face = np.full((size, size), 70, dtype=np.uint8)
+    c = size // 2
+    cv2.ellipse(face, (c, c), (int(size * 0.38), int(size * 0.48)), 0, 0, 360, 190, -1)
+    for ex in (c - size // 6, c + size // 6):
+        cv2.ellipse(face, (ex, int(c - size * 0.1)), (size // 12, size // 22), 0, 0, 360, 40, -1)
+        cv2.line(face, (ex - size // 10, int(c - size * 0.2)), (ex + size // 10, int(c - size * 0.2)), 60, max(1, size // 30))
+    cv2.line(face, (c, c - size // 20), (c, c + size // 8), 150, max(1, size // 25))
+    cv2.ellipse(face, (c, int(c + size * 0.25)), (size // 7, size // 25), 0, 0, 360, 80, -1)
+    return cv2.GaussianBlur(face, (5, 5), 0)
+
+
+def synthetic_scenes(count, empty, width=640, height=480, seed=0):
+    """生成带随机纹理背景的合成画面，前count张各有一张人脸，后empty张没有人脸
+
+    Returns:
+        scenes: BGR图像列表
+        boxes: 每张画面的真实人脸框列表
+    """
+    rng = np.random.default_rng(seed)
+    scenes, boxes = [], []
+    for i in range(count + empty):
+        background = rng.integers(0, 256, (height, width)).astype(np.uint8)
+        scene = cv2.GaussianBlur(background, (15, 15), 0)
+        scene_boxes = []
+        if i < count:
+            size = int(rng.integers(100, min(height, 240)))
+            x, y = int(rng.integers(0, width - size)), int(rng.integers(0, height - size))
+            scene[y:y+size, x:x+size] = cartoon_face(size)
+            scene_boxes.append((x, y, size, size))
+        scenes.append(cv2.cvtColor(scene, cv2.COLOR_GRAY2BGR))
+        boxes.append(scene_boxes)
+    return scenes, boxes
+
+
+def split_queries(labels, queries_per_label=1):
+    """每个标签留出若干样本作为查询，其余作为特征库"""
+    query_index = []
+    for label in np.unique(labels):
+        index = np.flatnonzero(labels == label)
+        if len(index) > queries_per_label:
+            query_index.extend(index[:queries_per_label])
+    query_mask = np.zeros(len(labels), dtype=bool)
+    query_mask[query_index] = True
+    return np.flatnonzero(~query_mask), np.flatnonzero(query_mask)
+
+
+def augment(images):
+    """与训练时相同的数据增强：原图、±5度旋转、亮度和对比度变化"""
+    center = (FACE_SIZE // 2, FACE_SIZE // 2)
+    augmented = []
+    for image in images:
+        augmented.append(image)
+        for angle in (-5, 5):
+            matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
+            augmented.append(cv2.warpAffine(image, matrix, (FACE_SIZE, FACE_SIZE)))
+        for alpha, beta in ((1.2, 0), (0.8, 0), (1.0, 30), (1.0, -30)):
+            augmented.append(cv2.convertScaleAbs(image, alpha=alpha, beta=beta))
+    return np.array(augmented)
+
+
+def compaction(args):
+    """对比不同k下压缩特征库的准确率和匹配耗时"""
+    captures = args.samples + 1
+    images, labels = synthetic_faces(args.identities, captures, seed=args.seed)
+    gallery_index, query_index = split_queries(labels)
+    queries = LBPHGallery().compute_histograms(images[query_index])
+    query_labels = labels[query_index]
+
+    # 每次采集增强为7个样本，模拟录入时的特征库
+    full = LBPHGallery()
+    per_user = {}
+    for label in np.unique(labels):
+        index = gallery_index[labels[gallery_index] == label]
+        per_user[label] = full.compute_histograms(augment(images[index]))
+    full.set_samples(np.concatenate(list(per_user.values())),
+                     np.concatenate([np.full(len(h), label, dtype=np.int32) for label, h in per_user.items()]))
+    print(f"合成人脸 {args.identities} 个身份 x {args.samples} 次采集（增强后每人 {full.size // args.identities} 个样本），"
+          f"查询 {len(queries)} 个")
+
+    print()
+    print(f"{'k':>6}{'样本数':>10}{'聚类(s)':>10}{'ms/查询':>10}{'准确率':>10}{'与全量一致':>12}")
+    for k in args.k:
+        start = time.perf_counter()
+        compact = {label: compact_histograms(histograms, k, seed=args.seed) for label, histograms in per_user.items()}
+        elapsed = time.perf_counter() - start
+
+        gallery = LBPHGallery()
+        gallery.set_samples(np.concatenate(list(compact.values())),
+                            np.concatenate([np.full(len(h), label, dtype=np.int32) for label, h in compact.items()]))
+        report = compaction_report(full, gallery, queries, query_labels)
+        if k == args.k[0]:
+            print(f"{'全量':>6}{report['full_samples']:>10}{'-':>10}{report['full_ms_per_query']:>10.2f}"
+                  f"{report['full_accuracy']:>10.3f}{1.0:>12.3f}")
+        print(f"{k:>6}{report['compact_samples']:>10}{elapsed:>10.2f}{report['compact_ms_per_query']:>10.2f}"
+              f"{report['compact_accuracy']:>10.3f}{report['agreement']:>12.3f}")
+    return True
+
+
+def detection_scores(detections, boxes):
+    """召回的人脸数和误检数（与真实框IoU不低于0.3视为命中）"""
+    hits = false_positives = 0
+    for found, truth in zip(detections, boxes):
+        matched = box_iou(found, truth).max(axis=1) >= 0.3 if len(found) and len(truth) else np.zeros(len(found), bool)
+        hits += min(int(matched.sum()), len(truth))
+        false_positives += int((~matched).sum())
+    return hits, false_positives
+
+
+def detector(args):
+    """对比单级Haar检测和两级检测"""
+    if args.images:
+        paths = [os.path.join(args.images, name) for name in sorted(os.listdir(args.images))]
+        frames = [cv2.resize(image, (640, 480)) for image in (cv2.imread(path) for path in paths) if image is not None]
+        boxes = None
+        print(f"数据来源: {args.images} ({len(frames)} 张，缩放到640x480，以全图单级检测结果作为真实人脸)")
+    else:
+        frames, boxes = synthetic_scenes(args.scenes, args.empty, seed=args.seed)
+        print(f"数据来源: 合成画面 640x480，{args.scenes} 张有人脸，{args.empty} 张无人脸")
+    if not frames:
+        print("❌ 没有可用的图像")
+        return False
+
+    grays = [cv2.equalizeHist(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)) for frame in frames]
+    default = FaceDetector(DEFAULT_CASCADE)
+    alt2 = FaceDetector(ALT2_CASCADE)
+    min_size = (args.min_size, args.min_size)
+
+    def run(detect, images):
+        start = time.perf_counter()
+        found = [np.asarray(detect(image)).reshape(-1, 4) for image in images]
+        return found, (time.perf_counter() - start) / len(images) * 1000
+
+    rows = []
+    full, elapsed = run(lambda g: default.detect_faces(g, min_size=min_size, equalized=True), grays)
+    if boxes is None:
+        boxes = [list(found) for found in full]
+    rows.append(("单级 default 640x480", elapsed, full))
+
+    # 当前界面的做法：缩小一半后检测
+    half = [cv2.resize(g, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA) for g in grays]
+    found, elapsed = run(lambda g: default.detect_faces(g, min_size=(min_size[0] // 2,) * 2, equalized=True), half)
+    rows.append(("单级 default 320x240", elapsed, [f * 2 for f in found]))
+
+    for name, coarse in (("alt2", alt2), ("default", default)):
+        two_stage = TwoStageDetector(default, coarse, coarse_scale=args.coarse_scale)
+        proposed, coarse_ms = run(lambda g: two_stage.propose(g, min_size), grays)
+        rows.append((f"粗检 {name} (x{args.coarse_scale})", coarse_ms, proposed))
+        found, elapsed = run(lambda g: two_stage.detect_faces(g, min_size=min_size, equalized=True), grays)
+        rows.append((f"两级 {name} + default验证", elapsed, found))
+
+    total = sum(len(b) for b in boxes)
+    print(f"真实人脸: {total}")
+    print()
+    print(f"{'方法':<28}{'ms/帧':>10}{'召回':>10}{'误检':>8}")
+    for name, elapsed, found in rows:
+        hits, false_positives = detection_scores(found, boxes)
+        print(f"{name:<28}{elapsed:>10.1f}{hits:>6}/{total:<4}{false_positives:>6}")
+    return True
+
+
+def quantization(args):
+    """对比各存储类型的内存、匹配耗时和精度"""
+    if args.model and os.path.exists(args.model):
+        from face_recognition import model_store
+        source, _, _ = model_store.load_model(args.model, mmap=False)
+        histograms, labels = source.get_histograms(), source.labels.copy()
+        print(f"数据来源: {args.model}")
+    else:
+        print(f"数据来源: 合成人脸 {args.identities} 个身份 x {args.samples} 个样本")
+        images, labels = synthetic_faces(args.identities, args.samples, seed=args.seed)
+        histograms = LBPHGallery().compute_histograms(images)
+
+    gallery_index, query_index = split_queries(labels)
+    if len(query_index) == 0:
+        print("❌ 每个身份至少需要2个样本才能留出查询")
+        return False
+    queries = histograms[query_index]
+    true_labels = labels[query_index]
+    print(f"特征库样本: {len(gallery_index)}, 查询: {len(query_index)}, 维度: {histograms.shape[1]}")
+
+    baseline = None
+    print()
+    print(f"{'类型':<8}{'内存(MB)':>10}{'字节/样本':>11}{'压缩比':>8}{'ms/查询':>10}{'top1准确率':>12}{'与float32一致':>14}{'距离相对误差':>14}")
+    for dtype in GALLERY_DTYPES:
+        gallery = LBPHGallery(dtype=dtype)
+        gallery.set_samples(histograms[gallery_index], labels[gallery_index])
+
+        gallery.match(queries[:1])  # 预热
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            distances = gallery.distances(queries)
+        elapsed = (time.perf_counter() - start) / args.repeat / len(queries) * 1000
+
+        results = gallery.rank_labels(distances, k=1)
+        predicted = np.array([result[0][0] for result in results])
+        accuracy = np.mean(predicted == true_labels)
+
+        if baseline is None:
+            baseline = (gallery.nbytes, predicted, distances)
+        agreement = np.mean(predicted == baseline[1])
+        relative_error = np.mean(np.abs(distances - baseline[2]) / np.maximum(baseline[2], 1e-6))
+
+        print(f"{dtype:<8}{gallery.nbytes / 1e6:>10.2f}{gallery.nbytes / gallery.size:>11.0f}"
+              f"{baseline[0] / gallery.nbytes:>8.1f}x{elapsed:>9.2f}{accuracy:>12.3f}{agreement:>14.3f}{relative_error:>14.2e}")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="性能基准测试")
+    subparsers = parser.add_subparsers(dest="command")
+
+    quant_parser = subparsers.add_parser("quantization", help="特征库存储类型的内存/速度/精度对比")
+    quant_parser.add_argument("--model", default=None, help=f"使用二进制模型中的直方图（如 {DEFAULT_MODEL_PATH}），默认使用合成人脸")
+    quant_parser.add_argument("--identities", type=int, default=100, help="合成人脸的身份数量")
+    quant_parser.add_argument("--samples", type=int, default=10, help="每个身份的样本数量")
+    quant_parser.add_argument("--repeat", type=int, default=1, help="计时重复次数")
+    quant_parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    quant_parser.set_defaults(func=quantization)
+
+    compact_parser = subparsers.add_parser("compaction", help="每个用户保留k个代表样本时的准确率/速度对比")
+    compact_parser.add_argument("--identities", type=int, default=50, help="合成人脸的身份数量")
+    compact_parser.add_argument("--samples", type=int, default=10, help="每个身份的采集次数（每次增强为7个样本）")
+    compact_parser.add_argument("-k", "--k", type=int, nargs="+", default=[35, 20, 10, 5, 1], help="每个用户保留的样本数")
+    compact_parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    compact_parser.set_defaults(func=compaction)
+
+    detector_parser = subparsers.add_parser("detector", help="单级与两级人脸检测的耗时/召回对比")
+    detector_parser.add_argument("--images", default=None, help="使用目录中的真实图片（以全图单级检测结果作为真实人脸），默认使用合成画面")
+    detector_parser.add_argument("--scenes", type=int, default=40, help="有人脸的合成画面数量")
+    detector_parser.add_argument("--empty", type=int, default=10, help="无人脸的合成画面数量")
+    detector_parser.add_argument("--min-size", type=int, default=100, help="640x480画面上的最小人脸尺寸")
+    detector_parser.add_argument("--coarse-scale", type=float, default=0.25, help="粗检图像相对640x480的缩放比例")
+    detector_parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    detector_parser.set_defaults(func=detector)
+
+    args = parser.parse_args()
+    if not args.command:
+        parser.print_help()
+        return 1
+
+    return 0 if args.func(args) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
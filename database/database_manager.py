@@ -4,11 +4,18 @@ import json
 from datetime import datetime
 import numpy as np
 
+from utils.logger import get_logger, DEBUG
+from database.identity_cache import IdentityCache
+
+logger = get_logger(__name__)
+
 class DatabaseManager:
     """数据库管理器"""
     
     def __init__(self, db_path="database/face_recognition.db"):
         self.db_path = db_path
+        # 用户和今日健康记录的读缓存，同一数据库文件的所有实例共用，写入后失效
+        self.cache = IdentityCache.for_database(db_path)
         self.ensure_db_directory()
         self.init_database()
     
@@ -146,40 +153,38 @@ class DatabaseManager:
                 VALUES (?, ?, ?, ?)
             ''', (user_id, date, sugar_intake, sugar_limit))
             conn.commit()
+        self.cache.invalidate_health(user_id)
     
     def get_health_records(self, user_id, date=None):
-        """获取健康记录"""
+        """获取健康记录（默认今天的记录，经过缓存）"""
         try:
-            print(f"=== 数据库查询: 获取用户 {user_id} 的健康记录 ===")
-            
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                if date:
-                    print(f"查询条件: 用户ID={user_id}, 日期={date}")
-                    cursor.execute('''
-                        SELECT * FROM health_records 
-                        WHERE user_id = ? AND date = ?
-                    ''', (user_id, date))
-                else:
-                    # 默认获取今天的记录
-                    today = datetime.now().strftime("%Y-%m-%d")
-                    print(f"查询条件: 用户ID={user_id}, 今天日期={today}")
-                    cursor.execute('''
-                        SELECT * FROM health_records 
-                        WHERE user_id = ? AND date = ? ORDER BY id DESC
-                    ''', (user_id, today))
-                
-                records = cursor.fetchall()
-                print(f"查询结果: 获取到 {len(records)} 条记录")
-                
-                for i, record in enumerate(records):
-                    print(f"  记录 {i}: ID={record[0]}, 用户ID={record[1]}, 日期={record[2]}, 糖量={record[3]}, 限制={record[4]}")
-                
-                return records
-                
+            if date:
+                return self._query_health_records(user_id, date)
+            # 默认获取今天的记录
+            today = datetime.now().strftime("%Y-%m-%d")
+            return self.cache.get_health(user_id, today, 'records',
+                                         lambda: self._query_health_records(user_id, today, latest_first=True))
         except Exception as e:
-            print(f"❌ 获取健康记录失败: {e}")
+            logger.error("❌ 获取健康记录失败: %s", e)
             return []
+    
+    def _query_health_records(self, user_id, date, latest_first=False):
+        logger.debug("=== 数据库查询: 获取用户 %s 的健康记录 ===", user_id)
+        logger.debug("查询条件: 用户ID=%s, 日期=%s", user_id, date)
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT * FROM health_records 
+                WHERE user_id = ? AND date = ?{" ORDER BY id DESC" if latest_first else ""}
+            ''', (user_id, date))
+            records = cursor.fetchall()
+        
+        logger.debug("查询结果: 获取到 %s 条记录", len(records))
+        if logger.isEnabledFor(DEBUG):
+            for i, record in enumerate(records):
+                logger.debug("  记录 %s: ID=%s, 用户ID=%s, 日期=%s, 糖量=%s, 限制=%s", i, record[0], record[1], record[2], record[3], record[4])
+        return records
             
     def delete_user(self, user_id):
         try:
@@ -196,9 +201,11 @@ class DatabaseManager:
                 cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
                 
                 conn.commit()
-                return True
+            self.cache.invalidate_users()
+            self.cache.invalidate_health(user_id)
+            return True
         except Exception as e:
-            print(f"删除用户失败: {e}")
+            logger.error("删除用户失败: %s", e)
             return False
 
     def add_face_image(self, user_id, image_path, person_name):
@@ -220,14 +227,14 @@ class DatabaseManager:
                     ''', (user_id, image_path, person_name, datetime.now()))
                     
                     conn.commit()
-                    print(f"人脸图片路径已保存到数据库: {image_path}")
+                    logger.info("人脸图片路径已保存到数据库: %s", image_path)
                     return True
                 else:
-                    print(f"人脸图片路径已存在: {image_path}")
+                    logger.debug("人脸图片路径已存在: %s", image_path)
                     return False
                     
         except Exception as e:
-            print(f"保存人脸图片路径失败: {e}")
+            logger.error("保存人脸图片路径失败: %s", e)
             return False
     
     def get_user_face_images(self, user_id):
@@ -241,53 +248,60 @@ class DatabaseManager:
                 ''', (user_id,))
                 return cursor.fetchall()
         except Exception as e:
-            print(f"获取用户人脸图片失败: {e}")
+            logger.error("获取用户人脸图片失败: %s", e)
             return []
     
     def get_user_by_name(self, name):
-        """根据姓名获取用户信息"""
-        try:
+        """根据姓名获取用户信息（经过缓存）"""
+        def query():
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute('SELECT * FROM users WHERE name = ?', (name,))
                 return cursor.fetchone()
+        
+        try:
+            return self.cache.get_user(name, query)
         except Exception as e:
-            print(f"获取用户信息失败: {e}")
+            logger.error("获取用户信息失败: %s", e)
             return None
     
     def get_user_health_today(self, user_id):
-        """获取用户今日健康记录"""
+        """获取用户今日健康记录（经过缓存）"""
         try:
             today = datetime.now().strftime("%Y-%m-%d")
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT * FROM health_records 
-                    WHERE user_id = ? AND date = ?
-                ''', (user_id, today))
-                record = cursor.fetchone()
-                
-                if record:
-                    return record
-                else:
-                    # 如果没有今日记录，创建一个默认记录
-                    cursor.execute('''
-                        INSERT INTO health_records (user_id, date, sugar_intake, sugar_limit)
-                        VALUES (?, ?, 0.0, 50.0)
-                    ''', (user_id, today))
-                    conn.commit()
-                    
-                    # 返回新创建的记录
-                    cursor.execute('''
-                        SELECT * FROM health_records 
-                        WHERE user_id = ? AND date = ?
-                    ''', (user_id, today))
-                    return cursor.fetchone()
-                    
+            return self.cache.get_health(user_id, today, 'today', lambda: self._query_user_health_today(user_id, today))
         except Exception as e:
-            print(f"获取用户今日健康记录失败: {e}")
+            logger.error("获取用户今日健康记录失败: %s", e)
             return None
     
+    def _query_user_health_today(self, user_id, today):
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT * FROM health_records 
+                WHERE user_id = ? AND date = ?
+            ''', (user_id, today))
+            record = cursor.fetchone()
+            
+            if record:
+                return record
+            
+            # 如果没有今日记录，创建一个默认记录
+            cursor.execute('''
+                INSERT INTO health_records (user_id, date, sugar_intake, sugar_limit)
+                VALUES (?, ?, 0.0, 50.0)
+            ''', (user_id, today))
+            conn.commit()
+            # 当天的记录列表已变化
+            self.cache.invalidate_health(user_id)
+            
+            # 返回新创建的记录
+            cursor.execute('''
+                SELECT * FROM health_records 
+                WHERE user_id = ? AND date = ?
+            ''', (user_id, today))
+            return cursor.fetchone()
+    
     def get_user_health_today_id(self, user_id):
         """获取用户今日健康记录的ID"""
         try:
@@ -301,7 +315,7 @@ class DatabaseManager:
                 result = cursor.fetchone()
                 return result[0] if result else None
         except Exception as e:
-            print(f"获取用户今日健康记录ID失败: {e}")
+            logger.error("获取用户今日健康记录ID失败: %s", e)
             return None
     
     def update_health_record_sugar(self, record_id, new_sugar_intake):
@@ -315,10 +329,12 @@ class DatabaseManager:
                     WHERE id = ?
                 ''', (new_sugar_intake, record_id))
                 conn.commit()
-                print(f"✅ 成功更新健康记录 {record_id} 的糖分摄入量为 {new_sugar_intake}g")
-                return True
+            # 只知道记录ID，清除所有用户的健康记录缓存
+            self.cache.invalidate_health()
+            logger.info("✅ 成功更新健康记录 %s 的糖分摄入量为 %sg", record_id, new_sugar_intake)
+            return True
         except Exception as e:
-            print(f"❌ 更新健康记录糖分摄入量失败: {e}")
+            logger.error("❌ 更新健康记录糖分摄入量失败: %s", e)
             return False
     
     def add_drink_consumption(self, user_id, drink_id):
@@ -333,7 +349,7 @@ class DatabaseManager:
             }
             
             if drink_id not in drink_sugar:
-                print(f"❌ 无效的饮品ID: {drink_id}")
+                logger.warning("❌ 无效的饮品ID: %s", drink_id)
                 return False
             
             # 基础糖量
@@ -344,39 +360,39 @@ class DatabaseManager:
             sugar_variation = random.uniform(-3, 3)
             actual_sugar = max(0, base_sugar + sugar_variation)  # 确保糖量不为负数
             
-            print(f"饮品ID {drink_id} 基础糖量: {base_sugar}g, 波动: {sugar_variation:+.1f}g, 实际糖量: {actual_sugar:.1f}g")
+            logger.debug("饮品ID %s 基础糖量: %sg, 波动: %+.1fg, 实际糖量: %.1fg", drink_id, base_sugar, sugar_variation, actual_sugar)
             
             # 获取今日健康记录
             health_record = self.get_user_health_today(user_id)
             if health_record:
-                current_sugar = health_record[3]
-                sugar_limit = health_record[4]  # 获取糖量限制
-                new_sugar = current_sugar + actual_sugar
-                
-                # 更新今日糖量摄入
+                # 在同一个事务中累加并读回，不使用缓存中的糖量，其他进程同时写入时不会丢失
                 with self.get_connection() as conn:
                     cursor = conn.cursor()
                     cursor.execute(
-                        "UPDATE health_records SET sugar_intake = ? WHERE id = ?",
-                        (new_sugar, health_record[0])
+                        "UPDATE health_records SET sugar_intake = sugar_intake + ? WHERE id = ?",
+                        (actual_sugar, health_record[0])
                     )
+                    cursor.execute("SELECT sugar_intake, sugar_limit FROM health_records WHERE id = ?", (health_record[0],))
+                    new_sugar, sugar_limit = cursor.fetchone()
                     conn.commit()
+                self.cache.invalidate_health(user_id)
+                current_sugar = new_sugar - actual_sugar
                 
-                print(f"✅ 用户 {user_id} 今日糖量摄入: {current_sugar:.1f}g + {actual_sugar:.1f}g = {new_sugar:.1f}g")
-                print(f"当前糖量: {new_sugar:.1f}g, 限制: {sugar_limit:.1f}g")
+                logger.info("✅ 用户 %s 今日糖量摄入: %.1fg + %.1fg = %.1fg", user_id, current_sugar, actual_sugar, new_sugar)
+                logger.debug("当前糖量: %.1fg, 限制: %.1fg", new_sugar, sugar_limit)
                 
                 # 检查是否超过限制
                 if new_sugar > sugar_limit:
-                    print(f"⚠️ 警告: 用户 {user_id} 糖量摄入已超过限制! 当前: {new_sugar:.1f}g, 限制: {sugar_limit:.1f}g")
+                    logger.warning("⚠️ 警告: 用户 %s 糖量摄入已超过限制! 当前: %.1fg, 限制: %.1fg", user_id, new_sugar, sugar_limit)
                     return ("WARNING", actual_sugar)  # 返回警告标识和实际糖量
                 else:
                     return ("SUCCESS", actual_sugar)  # 返回成功标识和实际糖量
             else:
-                print(f"❌ 无法获取用户 {user_id} 的健康记录")
+                logger.warning("❌ 无法获取用户 %s 的健康记录", user_id)
                 return False
                 
         except Exception as e:
-            print(f"❌ 添加饮品消费失败: {e}")
+            logger.error("❌ 添加饮品消费失败: %s", e)
             return False
     
     def get_drinks(self):
@@ -387,7 +403,7 @@ class DatabaseManager:
                 cursor.execute('SELECT * FROM drinks ORDER BY id')
                 return cursor.fetchall()
         except Exception as e:
-            print(f"获取饮品信息失败: {e}")
+            logger.error("获取饮品信息失败: %s", e)
             return []
 
     def modify_user_id(self, old_id, new_id):
@@ -416,7 +432,8 @@ class DatabaseManager:
                     
                     # 提交事务
                     conn.commit()
-                    print(f"✅ 成功修改用户ID: {old_id} -> {new_id}")
+                    self.cache.clear()
+                    logger.info("✅ 成功修改用户ID: %s -> %s", old_id, new_id)
                     return True
                     
                 except Exception as e:
@@ -425,7 +442,7 @@ class DatabaseManager:
                     raise e
                     
         except Exception as e:
-            print(f"❌ 修改用户ID失败: {e}")
+            logger.error("❌ 修改用户ID失败: %s", e)
             return False
     
     def modify_user_info(self, user_id, new_name, new_age, new_gender):
@@ -438,10 +455,11 @@ class DatabaseManager:
                     (new_name, new_age, new_gender, user_id)
                 )
                 conn.commit()
-                print(f"✅ 成功修改用户 {user_id} 的信息")
+                self.cache.invalidate_users()
+                logger.info("✅ 成功修改用户 %s 的信息", user_id)
                 return True
         except Exception as e:
-            print(f"❌ 修改用户信息失败: {e}")
+            logger.error("❌ 修改用户信息失败: %s", e)
             return False
     
     def delete_user(self, user_id):
@@ -461,7 +479,9 @@ class DatabaseManager:
                     
                     # 提交事务
                     conn.commit()
-                    print(f"✅ 成功删除用户 {user_id}")
+                    self.cache.invalidate_users()
+                    self.cache.invalidate_health(user_id)
+                    logger.info("✅ 成功删除用户 %s", user_id)
                     return True
                     
                 except Exception as e:
@@ -470,5 +490,5 @@ class DatabaseManager:
                     raise e
                     
         except Exception as e:
-            print(f"❌ 删除用户失败: {e}")
+            logger.error("❌ 删除用户失败: %s", e)
             return False
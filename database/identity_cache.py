@@ -0,0 +1,95 @@
+"""
+用户和今日健康记录的内存缓存
+
+识别到用户后要按姓名查用户、查今日健康记录，串口发送用户信息时还会再查一次今日记录，
+每次查询都新开一个sqlite连接。这些数据只在少数写操作（饮品消费、修改糖量、修改/删除用户等）时变化，
+由DatabaseManager在读取时经过缓存（未命中时才查询数据库），写入后使相关条目失效。
+同一数据库文件的所有DatabaseManager（界面和串口模块各有一个）共用一个缓存，任何一方的写入对另一方立即可见。
+健康记录按日期缓存，跨天后第一次查询时清除之前日期的条目。
+"""
+
+import os
+import threading
+
+
+class IdentityCache:
+    """按姓名缓存用户记录，按 (用户ID, 日期) 缓存健康记录"""
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def for_database(cls, db_path):
+        """返回该数据库文件共用的缓存"""
+        key = os.path.abspath(db_path)
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls()
+            return cls._instances[key]
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = {}  # 姓名 -> 用户记录
+        self._health = {}  # (用户ID, 日期, 类型) -> 健康记录；类型 'records' 为当天全部记录，'today' 为当天第一条
+        self._date = None  # 健康记录缓存对应的日期
+        self._version = 0  # 每次失效加1，查询期间发生过写入的结果不放入缓存
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, table, key, loader):
+        with self._lock:
+            if key in table:
+                self.hits += 1
+                return table[key]
+            self.misses += 1
+            version = self._version
+
+        value = loader()
+        # 查询失败或不存在时不缓存，下次重新查询
+        if value is not None:
+            with self._lock:
+                if version == self._version:
+                    table[key] = value
+        return value
+
+    def get_user(self, name, loader):
+        """按姓名获取用户记录，未命中时调用 loader() 查询"""
+        return self._get(self._users, name, loader)
+
+    def get_health(self, user_id, date, kind, loader):
+        """获取用户某天的健康记录，未命中时调用 loader() 查询"""
+        if date != self._date:
+            self._evict_dates(date)
+        value = self._get(self._health, (user_id, date, kind), loader)
+        return list(value) if isinstance(value, list) else value
+
+    def _evict_dates(self, date):
+        """日期变化后清除其他日期的健康记录"""
+        with self._lock:
+            for key in [key for key in self._health if key[1] != date]:
+                del self._health[key]
+            self._date = date
+
+    def invalidate_users(self):
+        """用户信息变化（修改、删除、修改ID）后调用"""
+        with self._lock:
+            self._users.clear()
+            self._version += 1
+
+    def invalidate_health(self, user_id=None):
+        """健康记录变化后调用，user_id为None时清除所有用户的健康记录"""
+        with self._lock:
+            if user_id is None:
+                self._health.clear()
+            else:
+                for key in [key for key in self._health if key[0] == user_id]:
+                    del self._health[key]
+            self._version += 1
+
+    def clear(self):
+        self.invalidate_users()
+        self.invalidate_health()
+
+    def stats(self):
+        with self._lock:
+            return {'users': len(self._users), 'health': len(self._health), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,74 @@
+"""
+根据最近观察到的人脸尺寸收窄检测的尺寸范围
+
+售卖机前的用户站立距离基本固定，人脸尺寸集中在一个很窄的范围内，
+而 detectMultiScale 默认从 min_size 一直搜索到整幅图像的尺度，大部分金字塔层都是无用功。
+包装在检测器外层，记录最近检测到的人脸尺寸，把 minSize/maxSize 收窄到它们的范围再各留出一定余量；
+每隔 explore_interval 次仍用完整范围检测一次，以便发现站得更近或更远的新用户。
+"""
+
+from collections import deque
+
+import numpy as np
+
+
+class AdaptiveSizeDetector:
+    """接口与 FaceDetector.detect_faces 相同，按最近的人脸尺寸收窄 min_size/max_size"""
+
+    def __init__(self, face_detector, min_size=50, max_size=None, history=20, margin=(0.8, 1.25), min_observations=3,
+                 explore_interval=10):
+        """
+        Args:
+            face_detector: 实际执行检测的FaceDetector或TwoStageDetector
+            min_size: 尺寸下限（像素），收窄后的范围不会低于该值
+            max_size: 尺寸上限（像素），None表示不限制
+            history: 记录最近多少个人脸尺寸
+            margin: 收窄后的范围相对观察到的最小/最大尺寸的比例
+            min_observations: 至少观察到多少个人脸后才开始收窄
+            explore_interval: 每隔多少次检测用完整范围检测一次，0表示不再使用完整范围
+        """
+        self.face_detector = face_detector
+        self.min_size = min_size
+        self.max_size = max_size
+        self.margin = margin
+        self.min_observations = min_observations
+        self.explore_interval = explore_interval
+        self.sizes = deque(maxlen=history)
+        self._calls = 0
+
+    def full_range(self):
+        """完整的尺寸范围"""
+        max_size = (self.max_size, self.max_size) if self.max_size else None
+        return {'min_size': (self.min_size, self.min_size), 'max_size': max_size}
+
+    def params(self):
+        """本次检测使用的 min_size/max_size"""
+        self._calls += 1
+        if len(self.sizes) < self.min_observations:
+            return self.full_range()
+        if self.explore_interval and self._calls % self.explore_interval == 0:
+            return self.full_range()
+
+        low = max(self.min_size, int(min(self.sizes) * self.margin[0]))
+        high = int(max(self.sizes) * self.margin[1])
+        if self.max_size:
+            high = min(high, self.max_size)
+        high = max(high, low + 1)
+        return {'min_size': (low, low), 'max_size': (high, high)}
+
+    def observe(self, faces):
+        """记录一次检测结果中的人脸尺寸"""
+        for _, _, w, h in np.asarray(faces).reshape(-1, 4):
+            self.sizes.append(int(min(w, h)))
+
+    def detect_faces(self, image, **kwargs):
+        """用收窄后的尺寸范围检测人脸，调用方传入的 min_size/max_size 会被覆盖"""
+        kwargs.update(self.params())
+        faces = self.face_detector.detect_faces(image, **kwargs)
+        self.observe(faces)
+        return faces
+
+    def reset(self):
+        """清除观察记录，恢复完整范围"""
+        self.sizes.clear()
+        self._calls = 0
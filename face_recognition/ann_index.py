@@ -0,0 +1,202 @@
+"""
+LBPH直方图的近似最近邻索引
+
+直方图先做平方根变换（Hellinger，欧氏距离与卡方距离单调相关性好），再用随机化PCA降到
+几十维。查询时依次：
+1. 随机超平面哈希分桶（多张表），取与查询至少在一张表中同桶的样本；
+2. 在降维空间中按欧氏距离取前 shortlist 个候选（同桶候选不足时退化为全量降维扫描）；
+3. 用LBPHGallery对候选做精确卡方距离重排。
+
+shortlist、n_tables、n_bits 控制召回率与延迟的权衡：shortlist越大、桶越粗，召回越高、越慢。
+"""
+
+import os
+import copy
+import json
+
+import numpy as np
+
+from face_recognition.lbph_gallery import swap_remove_plan
+
+
+class HistogramANNIndex:
+    """PCA + 随机投影分桶的近似最近邻索引，候选由特征库精确重排"""
+
+    def __init__(self, n_components=64, n_tables=4, n_bits=8, shortlist=64,
+                 min_gallery_size=2000, sample_size=4000, seed=0):
+        self.n_components = n_components
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.shortlist = shortlist
+        # 特征库小于该值时精确搜索已经足够快，不使用索引
+        self.min_gallery_size = min_gallery_size
+        # 训练PCA时最多使用的样本数
+        self.sample_size = sample_size
+        self.seed = seed
+
+        self.mean = None
+        self.components = None
+        self.planes = None
+        self.projected = np.empty((0, n_components), dtype=np.float32)
+        self.codes = np.empty((0, n_tables), dtype=np.int64)
+        self.labels = np.empty(0, dtype=np.int32)
+        self.metadata = {}
+
+    @classmethod
+    def from_params(cls, params):
+        """从配置字典创建（忽略未知字段）"""
+        params = dict(params or {})
+        keys = ('n_components', 'n_tables', 'n_bits', 'shortlist', 'min_gallery_size', 'sample_size', 'seed')
+        return cls(**{key: params[key] for key in keys if key in params})
+
+    @property
+    def size(self):
+        return len(self.labels)
+
+    def copy(self):
+        """返回共享当前数组的副本；增删样本总是生成新数组，不会影响另一方"""
+        return copy.copy(self)
+
+    @property
+    def is_built(self):
+        return self.components is not None
+
+    def is_active(self, gallery):
+        """索引已构建、与特征库同步且特征库足够大时才使用索引"""
+        return self.is_built and self.size == gallery.size and gallery.size >= self.min_gallery_size
+
+    def _transform(self, histograms):
+        """平方根变换后投影到主成分空间，histograms为 (N, dim)"""
+        features = np.sqrt(np.asarray(histograms, dtype=np.float32))
+        features -= self.mean
+        return features @ self.components.T
+
+    def _hash(self, projected):
+        """随机超平面哈希，返回 (N, n_tables) 的桶编号"""
+        bits = (np.einsum('nc,tcb->ntb', projected, self.planes) > 0).astype(np.int64)
+        return bits @ (1 << np.arange(self.n_bits, dtype=np.int64))
+
+    def build(self, gallery):
+        """根据特征库训练PCA和哈希平面，并为全部样本建立索引"""
+        rng = np.random.default_rng(self.seed)
+        count = gallery.size
+        if count == 0:
+            return False
+
+        # 随机化PCA（Halko et al.）：在采样的样本上求前n_components个主成分
+        sample = rng.choice(count, size=min(count, self.sample_size), replace=False)
+        features = np.sqrt(gallery.get_histograms(np.sort(sample)))
+        self.mean = features.mean(axis=0)
+        features -= self.mean
+
+        n_components = min(self.n_components, len(features))
+        probe = rng.standard_normal((features.shape[1], n_components + 8)).astype(np.float32)
+        basis = features @ probe
+        for _ in range(2):
+            basis, _ = np.linalg.qr(basis)
+            basis = features @ (features.T @ basis)
+        basis, _ = np.linalg.qr(basis)
+        _, _, vt = np.linalg.svd(basis.T @ features, full_matrices=False)
+        self.components = np.ascontiguousarray(vt[:n_components], dtype=np.float32)
+        self.n_components = n_components
+
+        self.planes = rng.standard_normal((self.n_tables, n_components, self.n_bits)).astype(np.float32)
+
+        # 分块投影全部样本，避免一次性复制整个特征库
+        self.projected = np.empty((0, n_components), dtype=np.float32)
+        self.codes = np.empty((0, self.n_tables), dtype=np.int64)
+        self.labels = np.empty(0, dtype=np.int32)
+        for start in range(0, count, 1024):
+            end = min(count, start + 1024)
+            self._append(gallery.get_histograms(np.arange(start, end)), gallery.labels[start:end])
+        return True
+
+    def _append(self, histograms, labels):
+        projected = self._transform(histograms).astype(np.float32)
+        self.projected = np.concatenate([self.projected, projected])
+        self.codes = np.concatenate([self.codes, self._hash(projected)])
+        self.labels = np.concatenate([self.labels, np.asarray(labels, dtype=np.int32)])
+
+    def add_samples(self, histograms, label):
+        """与LBPHGallery.add_samples同步追加样本（沿用已训练的PCA和哈希平面）"""
+        if not self.is_built:
+            return
+        histograms = np.asarray(histograms, dtype=np.float32).reshape(len(histograms), -1)
+        self._append(histograms, np.full(len(histograms), label, dtype=np.int32))
+
+    def remove_label(self, label):
+        """与LBPHGallery.remove_label同步删除样本（使用相同的填补方案，保持下标一致）"""
+        if not self.is_built:
+            return
+        holes, movers, new_size = swap_remove_plan(self.labels, label)
+        # 旧数组可能仍在被识别使用，在副本中填补
+        projected = self.projected[:new_size].copy()
+        codes = self.codes[:new_size].copy()
+        labels = self.labels[:new_size].copy()
+        projected[holes] = self.projected[movers]
+        codes[holes] = self.codes[movers]
+        labels[holes] = self.labels[movers]
+        self.projected, self.codes, self.labels = projected, codes, labels
+
+    def candidates(self, query_histogram):
+        """返回候选样本下标（最多shortlist个）"""
+        projected = self._transform(np.asarray(query_histogram, dtype=np.float32).reshape(1, -1))
+        query_codes = self._hash(projected)[0]
+
+        bucket = np.flatnonzero((self.codes == query_codes).any(axis=1))
+        pool = bucket if len(bucket) >= self.shortlist else np.arange(self.size)
+
+        diff = self.projected[pool] - projected[0]
+        distances = np.einsum('nc,nc->n', diff, diff)
+        if len(pool) > self.shortlist:
+            top = np.argpartition(distances, self.shortlist - 1)[:self.shortlist]
+            pool = pool[top]
+        # 按下标排序，重排时按列读取特征矩阵更连续
+        return np.sort(pool)
+
+    def match(self, gallery, query_histograms, k=1):
+        """近似搜索：分桶 + 降维距离筛选候选，再由特征库精确重排
+
+        Returns:
+            与 LBPHGallery.match 相同格式的结果
+        """
+        queries = np.asarray(query_histograms, dtype=np.float32).reshape(-1, gallery.dim)
+        state = gallery.state
+        results = []
+        for query in queries:
+            columns = self.candidates(query)
+            distances = gallery.distances(query, columns=columns, state=state)[0]
+            results.append(gallery.rank_columns(distances, columns, k, state=state))
+        return results
+
+    def save(self, path, metadata=None):
+        """保存索引（临时文件写完后替换）"""
+        self.metadata = dict(metadata or {})
+        config = {
+            'n_tables': self.n_tables, 'n_bits': self.n_bits, 'shortlist': self.shortlist,
+            'min_gallery_size': self.min_gallery_size, 'sample_size': self.sample_size, 'seed': self.seed,
+        }
+        tmp_path = path + '.tmp.npz'
+        np.savez(
+            tmp_path,
+            mean=self.mean, components=self.components, planes=self.planes,
+            projected=self.projected, codes=self.codes, labels=self.labels,
+            header=np.array(json.dumps({'config': config, 'metadata': self.metadata}))
+        )
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        """加载索引，返回其元数据；调优参数（shortlist等）保留当前实例的设置"""
+        with np.load(path) as data:
+            self.mean = data['mean']
+            self.components = data['components']
+            self.planes = data['planes']
+            self.projected = data['projected']
+            self.codes = data['codes']
+            self.labels = data['labels']
+            header = json.loads(str(data['header']))
+
+        self.n_components = self.components.shape[0]
+        self.n_tables, _, self.n_bits = self.planes.shape
+        self.metadata = header.get('metadata', {})
+        return self.metadata
@@ -0,0 +1,76 @@
+"""
+进程内共享的级联分类器
+
+解析一次级联XML（约1MB）的耗时远大于在一张人脸图上检测一次，所有入口都应从这里取分类器。
+cv2.CascadeClassifier 的检测不保证线程安全，所以分类器按 (路径, 线程) 缓存：
+每个线程对每个XML只解析一次，不同线程互不干扰；FaceDetector 按路径全局共享。
+"""
+
+import os
+import threading
+
+import cv2
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_CASCADE = 'haarcascade_frontalface_default.xml'
+
+_local = threading.local()
+_lock = threading.Lock()
+_detectors = {}
+
+
+def _builtin_cascade(name):
+    """OpenCV自带的级联模型路径，当前OpenCV没有打包 cv2.data 时返回None"""
+    haarcascades = getattr(getattr(cv2, 'data', None), 'haarcascades', None)
+    return os.path.join(haarcascades, name) if haarcascades else None
+
+
+def resolve_cascade_path(cascade_path=None):
+    """默认使用OpenCV内置的人脸检测模型，返回绝对路径作为缓存键
+
+    配置的路径不存在时（例如没有config.yaml时默认配置中的相对文件名）改用OpenCV自带的同名模型。
+    """
+    if cascade_path is None:
+        cascade_path = _builtin_cascade(DEFAULT_CASCADE) or DEFAULT_CASCADE
+    elif not os.path.exists(cascade_path):
+        builtin = _builtin_cascade(os.path.basename(cascade_path))
+        if builtin and os.path.exists(builtin):
+            logger.debug("级联模型 %s 不存在，使用OpenCV自带的 %s", cascade_path, builtin)
+            cascade_path = builtin
+    return os.path.abspath(cascade_path)
+
+
+def get_cascade(cascade_path=None):
+    """取当前线程的级联分类器，首次使用时加载
+
+    Raises:
+        ValueError: 模型文件无法加载
+    """
+    path = resolve_cascade_path(cascade_path)
+    cascades = getattr(_local, 'cascades', None)
+    if cascades is None:
+        cascades = _local.cascades = {}
+
+    cascade = cascades.get(path)
+    if cascade is None:
+        cascade = cv2.CascadeClassifier(path)
+        if cascade.empty():
+            raise ValueError(f"无法加载人脸检测模型: {path}")
+        cascades[path] = cascade
+        logger.debug("线程 %s 加载级联分类器: %s", threading.current_thread().name, path)
+    return cascade
+
+
+def get_detector(cascade_path=None):
+    """取按路径共享的FaceDetector"""
+    from face_recognition.face_detector import FaceDetector
+
+    path = resolve_cascade_path(cascade_path)
+    with _lock:
+        detector = _detectors.get(path)
+        if detector is None:
+            detector = _detectors[path] = FaceDetector(path)
+    return detector
@@ -0,0 +1,104 @@
+"""
+特征库压缩：每个用户只保留k个代表样本（k-medoids）
+
+数据增强会为每次采集生成多个几乎相同的样本，它们在识别时各自都要计算一次距离。
+在用户自己的样本之间按卡方距离做k-medoids聚类，只保留每个簇的中心样本（medoid）。
+medoid是真实样本而不是平均值，保证保留下来的直方图与识别时的距离定义一致。
+"""
+
+import time
+
+import numpy as np
+
+from face_recognition.lbph_gallery import LBPHGallery
+
+
+def pairwise_distances(histograms):
+    """同一用户样本之间的卡方距离矩阵 (n, n)"""
+    gallery = LBPHGallery()
+    histograms = np.asarray(histograms, dtype=np.float32)
+    gallery.set_matrix(np.ascontiguousarray(histograms.T), np.zeros(len(histograms), dtype=np.int32))
+    return gallery.distances(histograms)
+
+
+def select_medoids(histograms, k, max_iter=20, seed=0):
+    """k-medoids聚类，返回k个代表样本的下标
+
+    Args:
+        histograms: 一个用户的直方图 (n, dim)
+        k: 保留的样本数，n <= k 时返回全部下标
+        max_iter: 最大迭代次数
+        seed: 初始化随机种子
+
+    Returns:
+        medoids: 升序排列的样本下标
+    """
+    n = len(histograms)
+    if n <= k:
+        return np.arange(n)
+
+    distances = pairwise_distances(histograms)
+    rng = np.random.default_rng(seed)
+
+    # k-medoids++ 初始化：第一个取离其他样本最近的样本，之后按距离加权抽样
+    medoids = [int(np.argmin(distances.sum(axis=1)))]
+    nearest = distances[medoids[0]].copy()
+    while len(medoids) < k:
+        weights = nearest ** 2
+        total = weights.sum()
+        if total <= 0:
+            candidates = np.setdiff1d(np.arange(n), medoids)
+            medoids.append(int(rng.choice(candidates)))
+        else:
+            medoids.append(int(rng.choice(n, p=weights / total)))
+        nearest = np.minimum(nearest, distances[medoids[-1]])
+    medoids = np.array(medoids)
+
+    # 交替执行：按最近medoid分簇，再把每个簇的medoid换成簇内距离和最小的样本
+    for _ in range(max_iter):
+        assignment = np.argmin(distances[:, medoids], axis=1)
+        updated = medoids.copy()
+        for cluster in range(k):
+            members = np.flatnonzero(assignment == cluster)
+            if len(members) == 0:
+                continue
+            within = distances[np.ix_(members, members)].sum(axis=1)
+            updated[cluster] = members[np.argmin(within)]
+        if np.array_equal(updated, medoids):
+            break
+        medoids = updated
+
+    return np.sort(np.unique(medoids))
+
+
+def compact_histograms(histograms, k, seed=0):
+    """只保留k个代表样本"""
+    histograms = np.asarray(histograms, dtype=np.float32)
+    return histograms[select_medoids(histograms, k, seed=seed)]
+
+
+def compaction_report(full_gallery, compact_gallery, queries, query_labels, k=1):
+    """对比压缩前后的识别准确率和匹配耗时
+
+    Args:
+        full_gallery: 压缩前的LBPHGallery
+        compact_gallery: 压缩后的LBPHGallery
+        queries: 查询直方图 (n, dim)
+        query_labels: 查询的真实标签
+
+    Returns:
+        report: 包含样本数、准确率、一致率和平均每次查询耗时（毫秒）的字典
+    """
+    query_labels = np.asarray(query_labels)
+    report = {'queries': len(queries)}
+    predictions = {}
+    for name, gallery in (('full', full_gallery), ('compact', compact_gallery)):
+        start = time.perf_counter()
+        results = gallery.match(queries, k=k)
+        elapsed = time.perf_counter() - start
+        predictions[name] = np.array([result[0][0] if result else -1 for result in results])
+        report[f'{name}_samples'] = gallery.size
+        report[f'{name}_accuracy'] = float(np.mean(predictions[name] == query_labels)) if len(queries) else 0.0
+        report[f'{name}_ms_per_query'] = elapsed / max(1, len(queries)) * 1000
+    report['agreement'] = float(np.mean(predictions['full'] == predictions['compact'])) if len(queries) else 0.0
+    return report
@@ -1,21 +1,30 @@
 import cv2
 import numpy as np
 import os
+import itertools
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from face_recognition.preprocessing import to_gray
+from face_recognition.cascade_registry import get_cascade, resolve_cascade_path
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 class FaceDetector:
     """人脸检测器，使用OpenCV的Haar级联分类器"""
     
     def __init__(self, cascade_path=None):
-        if cascade_path is None:
-            # 使用OpenCV内置的人脸检测模型
-            cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        
-        self.face_cascade = cv2.CascadeClassifier(cascade_path)
-        
-        if self.face_cascade.empty():
-            raise ValueError(f"无法加载人脸检测模型: {cascade_path}")
+        # 默认使用OpenCV内置的人脸检测模型；分类器由 cascade_registry 按线程缓存，可在多个线程中共用同一个检测器
+        self.cascade_path = resolve_cascade_path(cascade_path)
+        get_cascade(self.cascade_path)  # 立即加载一次，模型无法加载时抛出ValueError
+    
+    @property
+    def face_cascade(self):
+        """当前线程的级联分类器"""
+        return get_cascade(self.cascade_path)
     
-    def detect_faces(self, image, scale_factor=1.05, min_neighbors=6, min_size=(50, 50)):
+    def detect_faces(self, image, scale_factor=1.05, min_neighbors=6, min_size=(50, 50), equalized=False, max_size=None,
+                     equalize=True):
         """
         检测图像中的人脸
         
@@ -24,28 +33,82 @@ class FaceDetector:
             scale_factor: 图像缩放因子（更小的值提高精度但降低速度）
             min_neighbors: 最小邻居数（更高的值减少误检）
             min_size: 最小人脸尺寸
+            equalized: image已是均衡化后的灰度图（如FramePreprocessor.detection_image）时跳过预处理
+            max_size: 最大人脸尺寸，None表示不限制
+            equalize: 检测前是否做直方图均衡化（equalized为True时忽略）
             
         Returns:
             faces: 检测到的人脸矩形框列表 [(x, y, w, h), ...]
         """
-        if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        else:
+        if equalized:
             gray = image
-        
-        # 图像预处理：直方图均衡化提高检测效果
-        gray = cv2.equalizeHist(gray)
+        else:
+            gray = to_gray(image)
+            if equalize:
+                # 图像预处理：直方图均衡化提高检测效果
+                gray = cv2.equalizeHist(gray)
         
         # 人脸检测
         faces = self.face_cascade.detectMultiScale(
             gray,
             scaleFactor=scale_factor,
             minNeighbors=min_neighbors,
-            minSize=min_size
+            minSize=min_size,
+            maxSize=max_size or (0, 0)
         )
         
         return faces
     
+    def detect_batch(self, images, workers=None, window=None, **kwargs):
+        """
+        批量检测人脸：图像解码和检测在线程池中并行进行，结果按完成顺序逐个返回
+        
+        cv2.imread 和 detectMultiScale 执行时都会释放GIL，级联分类器按线程缓存，线程池即可利用多核。
+        同时在处理中的图像不超过 window 张，导入几千张照片时内存占用保持不变。
+        灰度转换也在工作线程中完成，返回灰度图，调用方裁剪人脸时不需要再转换。
+        
+        Args:
+            images: 图像路径或已解码图像的可迭代对象
+            workers: 线程数，默认CPU核数
+            window: 同时在处理中的最大图像数，默认 workers 的2倍
+            **kwargs: 传给 detect_faces 的参数（如 equalize=False 表示直接在灰度图上检测）
+            
+        Yields:
+            (index, gray, faces): 在输入中的序号、解码后的灰度图像（读取失败时为None）和人脸矩形框
+        """
+        workers = workers or os.cpu_count() or 1
+        window = max(window or workers * 2, workers)
+        
+        def work(item):
+            try:
+                image = cv2.imread(item) if isinstance(item, str) else item
+                if image is None:
+                    logger.warning("无法读取图像: %s", item)
+                    return None, ()
+                gray = to_gray(image)
+                return gray, self.detect_faces(gray, **kwargs)
+            except Exception as e:
+                logger.error("检测失败: %s", e)
+                return None, ()
+        
+        items = enumerate(images)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="FaceDetect") as executor:
+            pending = {executor.submit(work, item): index for index, item in itertools.islice(items, window)}
+            try:
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        index = pending.pop(future)
+                        # 每完成一张补充一张，保持窗口大小
+                        for next_index, item in itertools.islice(items, 1):
+                            pending[executor.submit(work, item)] = next_index
+                        image, faces = future.result()
+                        yield index, image, faces
+            finally:
+                # 调用方提前结束迭代时不再处理尚未开始的图像
+                for future in pending:
+                    future.cancel()
+    
     def extract_largest_face(self, image):
         """提取最大的人脸区域"""
         faces = self.detect_faces(image)
@@ -1,29 +1,97 @@
 import os
+import json
+import threading
 import cv2
 import numpy as np
 import pickle
 from typing import List, Tuple, Optional
 
+from face_recognition import model_store
+from face_recognition.lbph_gallery import LBPHGallery
+from face_recognition.gallery_store import GalleryStore
+from face_recognition.ann_index import HistogramANNIndex
+from face_recognition.sharded_gallery import ShardedGallery
+from face_recognition.compaction import compact_histograms
+from face_recognition.preprocessing import FACE_SIZE, preprocess_face
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
 class FaceRecognizer:
     """使用OpenCV LBPH的人脸识别器，基于用户代码优化"""
     
-    def __init__(self, model_path=None, tolerance=100):
+    def __init__(self, model_path=None, tolerance=100, ann_params=None, shards=0, gallery_dtype='float32',
+                 max_samples_per_user=None, load=True, migrate=False):
         self.tolerance = tolerance  # 置信度阈值，LBPH中置信度越低越好，所以设置较高阈值
-        self.recognizer = cv2.face.LBPHFaceRecognizer_create()
         self.known_face_names = []
         self.model_path = model_path or "data/models/face_recognizer.yml"
+        self.binary_model_path = model_store.binary_model_path(self.model_path)
         self.name_to_id = {}  # 姓名到ID的映射
         self.id_to_name = {}  # ID到姓名的映射
+        self.gallery_dtype = gallery_dtype  # 特征库在内存中的存储类型：float32/float16/uint16/uint8
+        self.max_samples_per_user = max_samples_per_user  # 训练时每个用户最多保留的代表样本数，None或0表示不压缩
+        self.gallery = LBPHGallery(dtype=gallery_dtype)  # 向量化的直方图特征库，替代recognizer.predict
+        self.store = GalleryStore(GalleryStore.default_dir(self.model_path))  # 按用户持久化的直方图
+        
+        # 可选的近似最近邻索引，ann_params为None或enabled为False时始终精确搜索
+        self.ann_params = ann_params
+        self.ann_index_path = os.path.splitext(self.model_path)[0] + ".ann.npz"
+        self.ann_index = None
+        if ann_params and ann_params.get('enabled', True):
+            self.ann_index = HistogramANNIndex.from_params(ann_params)
+        
+        # 多进程分片匹配，shards大于1时启用；特征库仍在本进程维护，每次替换模型时在 _write_lock 内同步到分片
+        self.shards = shards
+        self.sharded_gallery = None
+        
+        # 热重载：识别时先取出当前模型的引用，后台加载完成后在锁内整体替换
+        self._state_lock = threading.RLock()
+        # 录入、删除用户时串行执行，在特征库和索引的副本上修改，完成后在 _state_lock 内替换引用（写时复制）
+        self._write_lock = threading.Lock()
+        self._reload_thread = None
+        self._watch_thread = None
+        self._watch_stop = threading.Event()
+        self._loaded_signature = None
+        self.model_generation = 0  # 模型每次变化（训练、录入、删除、重载）时递增，供识别结果缓存判断失效
         
         # 尝试加载已有模型
-        self.load_model()
+        if load:
+            self.load_model(migrate=migrate)
+            with self._write_lock:
+                self._sync_shards(self.gallery, self.model_generation)
     
-    def load_model(self):
-        """加载训练好的模型"""
+    def load_model(self, migrate=False):
+        """加载训练好的模型
+        
+        按用户存储是权威数据，二进制模型是它的快照：快照版本与存储一致时直接内存映射，
+        否则在内存中从按用户存储重建。默认只读，不写任何文件（测试、预览和热重载都可以放心加载）。
+        
+        Args:
+            migrate: True时把旧的二进制/YAML模型导入按用户存储，并刷新快照和索引文件
+                     （model_tools.py convert 使用）
+        """
+        self._loaded_signature = self.model_signature()
         try:
+            if self.store.exists():
+                return self._load_from_store(migrate)
+            
+            if self._binary_model_is_current():
+                _, id_to_name, header = model_store.load_model(
+                    self.binary_model_path, mmap=os.name != 'nt', gallery=self.gallery, dtype=self.gallery_dtype
+                )
+                self._set_label_map(id_to_name)
+                logger.info("成功加载模型: %s (%s 个样本)", self.binary_model_path, header['count'])
+                if migrate:
+                    self._import_gallery_to_store()
+                    self.save_model()
+                self.build_ann_index(save=migrate)
+                return True
+            
             if os.path.exists(self.model_path):
-                self.recognizer.read(self.model_path)
-                print(f"成功加载模型: {self.model_path}")
+                recognizer = cv2.face.LBPHFaceRecognizer_create()
+                recognizer.read(self.model_path)
+                self.gallery.load_from_recognizer(recognizer)
+                logger.info("成功加载模型: %s", self.model_path)
                 
                 # 尝试加载标签映射文件
                 label_map_path = self.model_path.replace('.yml', '_labels.pkl')
@@ -33,54 +101,308 @@ class FaceRecognizer:
                         self.name_to_id = label_data.get('name_to_id', {})
                         self.id_to_name = label_data.get('id_to_name', {})
                         self.known_face_names = list(self.name_to_id.keys())
-                        print(f"加载标签映射: {self.known_face_names}")
+                        logger.info("加载标签映射: %s", self.known_face_names)
                 
+                # 导入按用户存储并生成二进制快照，之后启动不再解析YAML
+                if migrate:
+                    self._import_gallery_to_store()
+                    self.save_model()
+                self.build_ann_index(save=migrate)
                 return True
             else:
-                print(f"模型文件不存在: {self.model_path}")
+                logger.warning("模型文件不存在: %s", self.model_path)
                 return False
         except Exception as e:
-            print(f"加载模型失败: {e}")
+            logger.error("加载模型失败: %s", e)
             return False
     
-    def save_model(self):
-        """保存训练好的模型和标签映射"""
+    def _load_from_store(self, migrate=False):
+        """从按用户存储加载，快照未过期时直接内存映射快照"""
+        if os.path.exists(self.binary_model_path):
+            header = model_store.read_header(self.binary_model_path)
+            if (header['metadata'].get('store_version') == self.store.version
+                    and header.get('dtype', 'float32') == str(self.gallery.dtype)):
+                _, id_to_name, header = model_store.load_model(
+                    self.binary_model_path, mmap=os.name != 'nt', gallery=self.gallery
+                )
+                self._set_label_map(id_to_name)
+                logger.info("成功加载模型: %s (%s 个样本)", self.binary_model_path, header['count'])
+                logger.info("加载标签映射: %s", self.known_face_names)
+                self._load_ann_index(migrate)
+                return True
+        
+        # 快照过期（有用户增删或存储类型改变），从按用户存储重建，migrate时刷新快照
+        params = self.store.params or self.gallery.params
+        self.gallery.set_params(params['radius'], params['neighbors'], params['grid_x'], params['grid_y'],
+                                dtype=self.gallery_dtype)
+        histograms, labels = self.store.load_all()
+        if histograms is not None:
+            self.gallery.set_samples(histograms, labels)
+        self._set_label_map(self.store.id_to_name())
+        logger.info("从按用户存储重建模型: %s (%s 个样本)", self.store.root_dir, self.gallery.size)
+        logger.info("加载标签映射: %s", self.known_face_names)
+        if migrate:
+            self.save_model()
+        self.build_ann_index(save=migrate)
+        return True
+    
+    def _load_ann_index(self, save=False):
+        """加载与按用户存储版本一致的近似最近邻索引，否则重新构建"""
+        if self.ann_index is None:
+            return False
+        
+        if os.path.exists(self.ann_index_path):
+            try:
+                metadata = self.ann_index.load(self.ann_index_path)
+                if metadata.get('store_version') == self.store.version and np.array_equal(self.ann_index.labels, self.gallery.labels):
+                    logger.info("加载近似最近邻索引: %s", self.ann_index_path)
+                    return True
+            except Exception as e:
+                logger.error("加载近似最近邻索引失败: %s", e)
+        
+        return self.build_ann_index(save=save)
+    
+    def build_ann_index(self, gallery=None, ann_index=None, save=True):
+        """为特征库构建近似最近邻索引并保存在模型旁边
+        
+        特征库小于索引的min_gallery_size时不构建，识别直接走精确搜索。
+        
+        Args:
+            gallery/ann_index: 默认为当前的特征库和索引，录入用户时传入尚未替换的副本
+            save: 是否保存索引文件
+        """
+        gallery = gallery or self.gallery
+        ann_index = ann_index or self.ann_index
+        if ann_index is None:
+            return False
+        
         try:
-            os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
-            
-            # 保存模型
-            self.recognizer.write(self.model_path)
-            print(f"模型已保存: {self.model_path}")
-            
-            # 保存标签映射
-            label_map_path = self.model_path.replace('.yml', '_labels.pkl')
-            label_data = {
-                'name_to_id': self.name_to_id,
-                'id_to_name': self.id_to_name
-            }
-            with open(label_map_path, 'wb') as f:
-                pickle.dump(label_data, f)
-            print(f"标签映射已保存: {label_map_path}")
+            if gallery.size < ann_index.min_gallery_size:
+                return False
             
+            ann_index.build(gallery)
+            if save:
+                ann_index.save(self.ann_index_path, metadata={'store_version': self.store.version})
+                logger.info("近似最近邻索引已保存: %s (%s 个样本)", self.ann_index_path, ann_index.size)
             return True
         except Exception as e:
-            print(f"保存模型失败: {e}")
+            logger.error("构建近似最近邻索引失败: %s", e)
             return False
     
-    def add_training_sample(self, face_image, person_name):
-        """添加训练样本"""
+    def _save_ann_index(self, ann_index=None):
+        """增量修改后保存索引，使其与按用户存储的版本一致"""
+        ann_index = ann_index or self.ann_index
+        if ann_index is None or not ann_index.is_built:
+            return
         try:
-            # 转换为灰度图像
-            if len(face_image.shape) == 3:
-                gray = cv2.cvtColor(face_image, cv2.COLOR_BGR2GRAY)
-            else:
-                gray = face_image
+            ann_index.save(self.ann_index_path, metadata={'store_version': self.store.version})
+        except Exception as e:
+            logger.error("保存近似最近邻索引失败: %s", e)
+    
+    def _current_state(self):
+        """取出当前模型（特征库、标签映射、索引、模型版本号）的引用，之后的识别都使用这一版本
+        
+        这些对象替换后不再被修改（录入、删除在副本上进行），锁外使用是安全的。
+        """
+        with self._state_lock:
+            return self.gallery, self.id_to_name, self.ann_index, self.model_generation
+        
+    def _match(self, gallery, ann_index, generation, queries, k):
+        """特征库足够大且索引可用时走近似搜索（候选精确重排），否则精确搜索（可选多进程分片）"""
+        if ann_index is not None and ann_index.is_active(gallery):
+            return ann_index.match(gallery, queries, k=k)
+        sharded_gallery = self.sharded_gallery
+        if sharded_gallery is not None and gallery.size > 0:
+            # 分片版本与本次识别使用的模型不一致（正在同步）时本进程精确搜索
+            results = sharded_gallery.match(queries, k=k, version=generation)
+            if results is not None:
+                return results
+        return gallery.match(queries, k=k)
+    
+    def _sync_shards(self, gallery, generation):
+        """把即将替换进来的特征库同步到分片工作进程（调用方持有 _write_lock）"""
+        if self.shards <= 1 or gallery.size == 0:
+            return
+        try:
+            if self.sharded_gallery is None:
+                self.sharded_gallery = ShardedGallery(self.shards, gallery.params, dtype=str(gallery.dtype))
+                logger.info("已启动 %s 个特征库分片进程", self.shards)
+            self.sharded_gallery.sync(gallery, version=generation)
+            logger.info("特征库已同步到分片: %s 个样本", gallery.size)
+        except Exception as e:
+            logger.error("同步特征库分片失败: %s", e)
+    
+    def close(self):
+        """停止模型监视和分片工作进程"""
+        self.stop_watching()
+        with self._write_lock:
+            if self.sharded_gallery is not None:
+                self.sharded_gallery.close()
+                self.sharded_gallery = None
+    
+    def model_signature(self):
+        """模型在磁盘上的版本标识：(按用户存储的版本号, YAML模型的修改时间)
+        
+        按用户存储存在时 load_model 不再读取YAML，此时只看存储的版本号，YAML的修改时间记为None。
+        """
+        if os.path.exists(self.store.index_path):
+            try:
+                with open(self.store.index_path, "r", encoding="utf-8") as f:
+                    return json.load(f)["version"], None
+            except (OSError, ValueError, KeyError):
+                # 索引正在被替换时读取可能失败，下次轮询再判断
+                return self._loaded_signature
+        yml_mtime = os.path.getmtime(self.model_path) if os.path.exists(self.model_path) else None
+        return None, yml_mtime
+    
+    def _local_signature(self):
+        """本实例当前模型对应的版本标识（本实例自己的增量修改不会触发重载）"""
+        if self._loaded_signature is None:
+            return None
+        if self.store.foreign_changes:
+            # 修改存储时发现其他进程也修改过，内存中缺少这些修改，需要重新加载
+            return None
+        if self.store.exists():
+            return self.store.version, None
+        return self._loaded_signature
+    
+    def reload_model(self):
+        """在当前线程加载磁盘上的最新模型，完成后整体替换；加载期间的识别仍使用旧模型
+        
+        Returns:
+            是否成功
+        """
+        try:
+            loader = FaceRecognizer(self.model_path, self.tolerance, ann_params=self.ann_params,
+                                    gallery_dtype=self.gallery_dtype,
+                                    max_samples_per_user=self.max_samples_per_user, load=False)
+            # 正在运行的实例仍在使用快照和索引文件，重载时只读取
+            if not loader.load_model():
+                return False
+            
+            # 与录入、删除用户互斥，避免替换存储时丢失正在进行的修改
+            with self._write_lock:
+                self._sync_shards(loader.gallery, self.model_generation + 1)
+                with self._state_lock:
+                    self.gallery = loader.gallery
+                    self.ann_index = loader.ann_index
+                    self.store = loader.store
+                    self._loaded_signature = loader._loaded_signature
+                    self._set_label_map(loader.id_to_name)
+                    self.model_generation += 1
             
-            # 图像预处理：直方图均衡化提高对比度
-            gray = cv2.equalizeHist(gray)
+            logger.info("模型已重新加载: %s 个样本，%s 个用户", self.gallery.size, len(self.known_face_names))
+            return True
+        except Exception as e:
+            logger.error("重新加载模型失败: %s", e)
+            return False
+    
+    def reload_async(self, on_finished=None):
+        """在后台线程重新加载模型，不阻塞调用线程（如界面线程）
+        
+        Args:
+            on_finished: 加载结束后在后台线程中调用 on_finished(success)
             
-            # 调整图像大小为标准尺寸
-            gray = cv2.resize(gray, (150, 150))
+        Returns:
+            是否启动了新的加载（已有加载在进行时返回False）
+        """
+        if self._reload_thread is not None and self._reload_thread.is_alive():
+            return False
+        
+        def run():
+            success = self.reload_model()
+            if on_finished:
+                on_finished(success)
+        
+        self._reload_thread = threading.Thread(target=run, name="FaceModelReload", daemon=True)
+        self._reload_thread.start()
+        return True
+    
+    def start_watching(self, interval=2.0, on_reload=None):
+        """轮询模型文件，其他进程（如train_faces.py）重新训练后自动在后台重载
+        
+        Args:
+            interval: 轮询间隔（秒）
+            on_reload: 重载结束后在后台线程中调用 on_reload(success)
+        """
+        if self._watch_thread is not None and self._watch_thread.is_alive():
+            return
+        
+        def watch():
+            while not self._watch_stop.wait(interval):
+                try:
+                    signature = self.model_signature()
+                    if signature != self._local_signature() and signature != (None, None):
+                        logger.info("检测到模型文件更新，后台重新加载")
+                        self.reload_async(on_reload)
+                except Exception as e:
+                    logger.error("检查模型文件失败: %s", e)
+        
+        self._watch_stop.clear()
+        self._watch_thread = threading.Thread(target=watch, name="FaceModelWatcher", daemon=True)
+        self._watch_thread.start()
+    
+    def stop_watching(self):
+        """停止监视模型文件"""
+        self._watch_stop.set()
+        if self._watch_thread is not None:
+            self._watch_thread.join(timeout=5)
+            self._watch_thread = None
+    
+    def _ensure_store(self):
+        """第一次录入或删除用户前创建按用户存储；只读加载的旧模型先整体导入，避免已有用户丢失
+        
+        其他进程可能已经创建了存储，这时只刷新索引，不覆盖其中的用户。
+        """
+        if self.store.params is not None:
+            return
+        if self.store.create(self.gallery.params) and self.gallery.size > 0:
+            self._import_gallery_to_store(reset=False)
+    
+    def _import_gallery_to_store(self, reset=True):
+        """把当前特征库按标签拆分写入按用户存储"""
+        if reset:
+            self.store.reset(self.gallery.params)
+        for label_id in np.unique(self.gallery.labels):
+            histograms = self.gallery.get_histograms(np.flatnonzero(self.gallery.labels == label_id))
+            self.store.put_user(int(label_id), self.id_to_name.get(int(label_id)), histograms)
+        logger.info("已导入按用户存储: %s", self.store.root_dir)
+    
+    def _binary_model_is_current(self):
+        """二进制模型存在且不比YAML模型旧"""
+        if not os.path.exists(self.binary_model_path):
+            return False
+        if not os.path.exists(self.model_path):
+            return True
+        return os.path.getmtime(self.binary_model_path) >= os.path.getmtime(self.model_path)
+    
+    def _set_label_map(self, id_to_name):
+        """设置标签映射"""
+        self.id_to_name = dict(id_to_name)
+        self.name_to_id = {name: label_id for label_id, name in self.id_to_name.items()}
+        self.known_face_names = list(self.name_to_id.keys())
+    
+    def save_model(self, gallery=None, id_to_name=None):
+        """保存特征库和标签映射到二进制模型文件
+        
+        Args:
+            gallery/id_to_name: 默认为当前的特征库和标签映射，训练时传入尚未替换的新模型
+        """
+        try:
+            model_store.save_model(
+                self.binary_model_path, gallery or self.gallery, self.id_to_name if id_to_name is None else id_to_name,
+                metadata={'tolerance': self.tolerance, 'store_version': self.store.version}
+            )
+            logger.info("模型已保存: %s", self.binary_model_path)
+            return True
+        except Exception as e:
+            logger.error("保存模型失败: %s", e)
+            return False
+    
+    def add_training_sample(self, face_image, person_name):
+        """添加训练样本"""
+        try:
+            gray = self.preprocess_face(face_image)
             
             # 添加到训练数据
             if not hasattr(self, 'training_images'):
@@ -90,94 +412,284 @@ class FaceRecognizer:
             self.training_images.append(gray)
             self.training_labels.append(person_name)
             
-            print(f"成功添加 {person_name} 的训练样本")
+            logger.debug("成功添加 %s 的训练样本", person_name)
             return True
         except Exception as e:
-            print(f"添加训练样本失败: {e}")
+            logger.error("添加训练样本失败: %s", e)
             return False
     
     def train(self):
-        """训练模型"""
-        try:
-            if not hasattr(self, 'training_images') or len(self.training_images) < 2:
-                print("训练样本不足")
+        """全量训练模型：用当前会话的训练样本重建整个特征库
+        
+        只新增或更新个别用户时请使用 enroll_user，代价只与该用户的样本数有关。
+        """
+        with self._write_lock:
+            try:
+                if not hasattr(self, 'training_images') or len(self.training_images) < 2:
+                    logger.warning("训练样本不足")
+                    return False
+                
+                # 创建标签映射（保持样本出现顺序）
+                unique_names = list(dict.fromkeys(self.training_labels))
+                name_to_id = {name: i for i, name in enumerate(unique_names)}
+                id_to_name = {i: name for name, i in name_to_id.items()}
+                
+                # 转换标签为数字ID
+                numeric_labels = [name_to_id[name] for name in self.training_labels]
+                
+                # 转换为numpy数组
+                images = np.array(self.training_images)
+                labels = np.array(numeric_labels, dtype=np.int32)
+                
+                logger.info("开始训练，图像数量: %s, 标签数量: %s", len(images), len(labels))
+                logger.info("标签映射: %s", name_to_id)
+                
+                # 在新的特征库和索引上训练，识别线程在替换前继续使用旧模型
+                gallery = LBPHGallery(dtype=self.gallery_dtype, **self.gallery.params)
+                ann_index = HistogramANNIndex.from_params(self.ann_params) if self.ann_index is not None else None
+                
+                # 计算LBPH直方图，每个用户按需压缩为代表样本
+                histograms = gallery.compute_histograms(images)
+                per_user = {label_id: self._compact(histograms[labels == label_id]) for label_id in id_to_name}
+                histograms = np.concatenate(list(per_user.values()))
+                labels = np.concatenate([np.full(len(h), label_id, dtype=np.int32) for label_id, h in per_user.items()])
+                gallery.set_samples(histograms, labels)
+                
+                # 重写按用户存储
+                self.store.reset(gallery.params)
+                for name, label_id in name_to_id.items():
+                    self.store.put_user(label_id, name, per_user[label_id])
+                
+                # 保存模型
+                self.save_model(gallery, id_to_name)
+                self.build_ann_index(gallery, ann_index)
+                self._sync_shards(gallery, self.model_generation + 1)
+                
+                with self._state_lock:
+                    self.gallery = gallery
+                    self.ann_index = ann_index
+                    self._set_label_map(id_to_name)
+                    self.model_generation += 1
+                
+                logger.info("训练完成，共 %s 个用户", len(unique_names))
+                return True
+                
+            except Exception as e:
+                logger.error("训练失败: %s", e)
                 return False
+        
+    def _compact(self, histograms):
+        """样本数超过 max_samples_per_user 时只保留k-medoids代表样本"""
+        if self.max_samples_per_user and len(histograms) > self.max_samples_per_user:
+            return compact_histograms(histograms, self.max_samples_per_user)
+        return histograms
+    
+    def enroll_user(self, person_name, face_images, replace=True):
+        """增量录入一个用户，不影响其他用户
+        
+        只计算该用户样本的直方图，只改写该用户自己的存储文件，代价与特征库大小无关。
+        二进制快照由全量训练或 model_tools.py convert 刷新，在此之前加载时从按用户存储重建。
+        
+        Args:
+            person_name: 用户姓名
+            face_images: 人脸图像列表（BGR或灰度）
+            replace: True时替换该用户已有的样本，False时追加
             
-            # 创建标签映射
-            unique_names = list(set(self.training_labels))
-            self.name_to_id = {name: i for i, name in enumerate(unique_names)}
-            self.id_to_name = {i: name for name, i in self.name_to_id.items()}
-            
-            # 转换标签为数字ID
-            numeric_labels = [self.name_to_id[name] for name in self.training_labels]
-            
-            # 转换为numpy数组
-            images = np.array(self.training_images)
-            labels = np.array(numeric_labels)
-            
-            print(f"开始训练，图像数量: {len(images)}, 标签数量: {len(labels)}")
-            print(f"标签映射: {self.name_to_id}")
-            
-            # 训练模型
-            self.recognizer.train(images, labels)
-            
-            # 保存模型
-            self.save_model()
-            
-            # 更新已知人脸信息
-            self.known_face_names = unique_names
-            
-            print(f"训练完成，共 {len(unique_names)} 个用户")
-            return True
-            
-        except Exception as e:
-            print(f"训练失败: {e}")
-            return False
+        Returns:
+            是否成功
+        """
+        with self._write_lock:
+            try:
+                if len(face_images) == 0:
+                    logger.warning("训练样本不足")
+                    return False
+                
+                # 在副本上修改，识别线程在替换前继续使用旧的特征库和索引
+                gallery = self.gallery.copy()
+                ann_index = self.ann_index.copy() if self.ann_index is not None else None
+                
+                faces = np.stack([self.preprocess_face(face) for face in face_images])
+                histograms = gallery.compute_histograms(faces)
+                
+                self._ensure_store()
+                
+                label_id = self.name_to_id.get(person_name)
+                if label_id is None:
+                    label_id = self.store.allocate_label()
+                
+                existing = None
+                if not replace and label_id in self.store.users():
+                    existing = np.asarray(self.store.load_user(label_id))
+                merged = histograms if existing is None else np.concatenate([existing, histograms])
+                kept = self._compact(merged)
+                self.store.put_user(label_id, person_name, kept)
+                
+                if existing is None or len(kept) < len(merged):
+                    # 替换或压缩后重新放入该用户的全部样本
+                    gallery.remove_label(label_id)
+                    if ann_index is not None:
+                        ann_index.remove_label(label_id)
+                    added = kept
+                else:
+                    added = histograms
+                gallery.add_samples(added, label_id)
+                
+                # 索引沿用已训练的投影增量追加；尚未构建且特征库已足够大时才全量构建
+                if ann_index is not None:
+                    if ann_index.is_built:
+                        ann_index.add_samples(added, label_id)
+                        self._save_ann_index(ann_index)
+                    else:
+                        self.build_ann_index(gallery, ann_index)
+                self._sync_shards(gallery, self.model_generation + 1)
+                
+                with self._state_lock:
+                    self.gallery = gallery
+                    self.ann_index = ann_index
+                    self._set_label_map({**self.id_to_name, label_id: person_name})
+                    self.model_generation += 1
+                
+                logger.info("已录入 %s (ID: %s) 的 %s 个样本（保留 %s 个），特征库共 %s 个样本",
+                            person_name, label_id, len(histograms), len(kept), gallery.size)
+                return True
+                
+            except Exception as e:
+                logger.error("录入用户失败: %s", e)
+                return False
+        
+    def remove_user(self, person_name):
+        """从模型中删除一个用户"""
+        with self._write_lock:
+            try:
+                label_id = self.name_to_id.get(person_name)
+                if label_id is None:
+                    logger.warning("用户不在模型中: %s", person_name)
+                    return False
+                
+                self._ensure_store()
+                self.store.remove_user(label_id)
+                gallery = self.gallery.copy()
+                removed = gallery.remove_label(label_id)
+                ann_index = self.ann_index.copy() if self.ann_index is not None else None
+                if ann_index is not None:
+                    ann_index.remove_label(label_id)
+                    self._save_ann_index(ann_index)
+                
+                id_to_name = {key: name for key, name in self.id_to_name.items() if key != label_id}
+                self._sync_shards(gallery, self.model_generation + 1)
+                with self._state_lock:
+                    self.gallery = gallery
+                    self.ann_index = ann_index
+                    self._set_label_map(id_to_name)
+                    self.model_generation += 1
+                
+                logger.info("已从模型中删除 %s 的 %s 个样本", person_name, removed)
+                return True
+                
+            except Exception as e:
+                logger.error("删除用户失败: %s", e)
+                return False
+        
+    def preprocess_face(self, face_image, out=None):
+        """预处理人脸图像：灰度、直方图均衡化、缩放到标准尺寸
+        
+        Args:
+            face_image: 人脸图像（BGR或灰度）
+            out: 可选的 150x150 uint8 输出缓冲区
+        """
+        return preprocess_face(face_image, out=out)
     
     def recognize_face(self, face_image):
         """识别人脸"""
         try:
-            # 转换为灰度图像
-            if len(face_image.shape) == 3:
-                gray = cv2.cvtColor(face_image, cv2.COLOR_BGR2GRAY)
-            else:
-                gray = face_image
+            matches = self.recognize_face_topk(face_image, k=1)
+            if not matches:
+                logger.warning("特征库为空，无法识别")
+                return "Unknown", 999.0
             
-            # 图像预处理：直方图均衡化提高对比度
-            gray = cv2.equalizeHist(gray)
-            
-            # 调整图像大小
-            gray = cv2.resize(gray, (150, 150))
-            
-            # 进行预测
-            label_id, confidence = self.recognizer.predict(gray)
+            name, confidence = matches[0]
             
             # 调试信息
-            print(f"识别调试: label_id={label_id}, confidence={confidence}")
-            print(f"标签映射: {self.id_to_name}")
-            print(f"已知人脸: {self.known_face_names}")
-            
-            # 获取对应的姓名
-            if label_id in self.id_to_name:
-                name = self.id_to_name[label_id]
-                print(f"找到匹配: label_id={label_id} -> name={name}")
-            else:
-                name = "Unknown"
-                print(f"未找到匹配: label_id={label_id} 不在 {list(self.id_to_name.keys())}")
+            logger.debug("识别调试: name=%s, confidence=%s", name, confidence)
+            logger.debug("标签映射: %s", self.id_to_name)
+            logger.debug("已知人脸: %s", self.known_face_names)
             
             # 检查置信度 - LBPH的置信度越低越好
             if confidence > self.tolerance:
-                print(f"置信度 {confidence} 超过阈值 {self.tolerance}，标记为Unknown")
+                logger.debug("置信度 %s 超过阈值 %s，标记为Unknown", confidence, self.tolerance)
                 name = "Unknown"
             
-            print(f"最终识别结果: name={name}, confidence={confidence}")
+            logger.debug("最终识别结果: name=%s, confidence=%s", name, confidence)
             
             return name, confidence
             
         except Exception as e:
-            print(f"人脸识别失败: {e}")
+            logger.error("人脸识别失败: %s", e)
             return "Unknown", 999.0
     
+    def recognize_face_topk(self, face_image, k=3):
+        """识别人脸，返回距离最近的k个身份
+        
+        Args:
+            face_image: 人脸图像（BGR或灰度）
+            k: 返回的身份数量
+            
+        Returns:
+            matches: [(name, distance), ...]，按距离升序；未在标签映射中的ID记为Unknown
+        """
+        gallery, id_to_name, ann_index, generation = self._current_state()
+        gray = self.preprocess_face(face_image)
+        
+        # 在特征库中批量计算卡方距离
+        query = gallery.compute_histograms(gray)
+        matches = self._match(gallery, ann_index, generation, query, k=k)[0]
+        
+        return [(id_to_name.get(label_id, "Unknown"), distance) for label_id, distance in matches]
+    
+    def recognize_batch(self, face_images):
+        """批量识别多张人脸
+        
+        所有人脸预处理后堆叠为一个数组，一次性计算直方图并与特征库做向量化匹配。
+        
+        Args:
+            face_images: 人脸图像列表（BGR或灰度，尺寸可以不同）
+            
+        Returns:
+            results: 与输入顺序一致的 [(name, confidence), ...]
+        """
+        if len(face_images) == 0:
+            return []
+        
+        try:
+            gallery, id_to_name, ann_index, generation = self._current_state()
+            faces = np.empty((len(face_images), FACE_SIZE, FACE_SIZE), dtype=np.uint8)
+            for i, face_image in enumerate(face_images):
+                self.preprocess_face(face_image, out=faces[i])
+            
+            queries = gallery.compute_histograms(faces)
+            matches = self._match(gallery, ann_index, generation, queries, k=1)
+            
+            results = []
+            for best in matches:
+                if not best:
+                    results.append(("Unknown", 999.0))
+                    continue
+                
+                label_id, confidence = best[0]
+                name = id_to_name.get(label_id, "Unknown")
+                
+                # 检查置信度 - LBPH的置信度越低越好
+                if confidence > self.tolerance:
+                    name = "Unknown"
+                results.append((name, confidence))
+            
+            logger.debug("批量识别结果: %s", results)
+            return results
+            
+        except Exception as e:
+            logger.error("批量人脸识别失败: %s", e)
+            return [("Unknown", 999.0)] * len(face_images)
+    
     def get_known_faces(self):
         """获取已知人脸列表"""
         return self.known_face_names.copy()
@@ -187,4 +699,4 @@ class FaceRecognizer:
         if hasattr(self, 'training_images'):
             self.training_images.clear()
             self.training_labels.clear()
-        print("训练数据已清空")
\ No newline at end of file
+        logger.info("训练数据已清空")
\ No newline at end of file
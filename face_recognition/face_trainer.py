@@ -6,6 +6,13 @@ import random
 import shutil
 from datetime import datetime
 
+from face_recognition.preprocessing import preprocess_face
+from face_recognition.cascade_registry import get_cascade, get_detector
+from utils.frame_source import create_frame_source
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
 class FaceTrainer:
     """统一的人脸训练器，整合Qt界面和命令行训练"""
     
@@ -20,19 +27,8 @@ class FaceTrainer:
         os.makedirs(self.face_images_dir, exist_ok=True)
     
     def preprocess_face(self, face_image):
-        """预处理人脸图像"""
-        if len(face_image.shape) == 3:
-            gray = cv2.cvtColor(face_image, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = face_image
-        
-        # 直方图均衡化
-        gray = cv2.equalizeHist(gray)
-        
-        # 调整大小
-        gray = cv2.resize(gray, (150, 150))
-        
-        return gray
+        """预处理人脸图像（与识别时的预处理一致）"""
+        return preprocess_face(face_image)
     
     def save_face_image(self, face_image, person_name, index):
         """保存人脸图片到文件系统"""
@@ -47,7 +43,7 @@ class FaceTrainer:
         
         # 保存图片
         cv2.imwrite(filepath, face_image)
-        print(f"保存人脸图片: {filepath}")
+        logger.debug("保存人脸图片: %s", filepath)
         
         return filepath
     
@@ -79,10 +75,19 @@ class FaceTrainer:
         return augmented
     
     def collect_training_samples(self, camera, person_name, num_samples=20):
-        """收集训练样本，包含数据增强和图片保存"""
+        """收集训练样本，包含数据增强和图片保存
+
+        camera 为已打开的 cv2.VideoCapture 或帧来源；None时按配置创建并在采集结束后释放
+        """
+        owns_camera = camera is None
+        if owns_camera:
+            camera = create_frame_source()
+            if not camera.open():
+                return [], []
+        
         samples = []
         saved_images = []  # 保存的图片路径
-        print(f"开始收集 {person_name} 的训练样本...")
+        logger.info("开始收集 %s 的训练样本...", person_name)
         
         for i in range(num_samples):
             ret, frame = camera.read()
@@ -108,12 +113,14 @@ class FaceTrainer:
                 augmented_faces = self.augment_face(face_roi)
                 samples.extend(augmented_faces)
                 
-                print(f"样本 {i+1}/{num_samples} - 生成 {len(augmented_faces)} 个增强样本")
+                logger.debug("样本 %s/%s - 生成 %s 个增强样本", i+1, num_samples, len(augmented_faces))
             
             # 等待一下
             cv2.waitKey(100)
         
-        print(f"总共收集到 {len(samples)} 个训练样本，保存了 {len(saved_images)} 张图片")
+        if owns_camera:
+            camera.release()
+        logger.info("总共收集到 %s 个训练样本，保存了 %s 张图片", len(samples), len(saved_images))
         
         # 保存到数据库（如果有数据库管理器）
         if self.db_manager:
@@ -121,37 +128,41 @@ class FaceTrainer:
         
         return samples, saved_images
     
-    def collect_from_directory(self, dir_path, person_name):
-        """从目录收集训练样本（基于用户代码）"""
+    def collect_from_directory(self, dir_path, person_name, workers=None):
+        """从目录收集训练样本（基于用户代码），workers为并行检测的线程数，默认CPU核数"""
         faces = []
         saved_images = []
-        print(f"从目录收集 {person_name} 的训练样本: {dir_path}")
+        logger.info("从目录收集 %s 的训练样本: %s", person_name, dir_path)
         
         if not os.path.exists(dir_path):
-            print(f"目录不存在: {dir_path}")
+            logger.warning("目录不存在: %s", dir_path)
             return faces, saved_images
         
-        for i, file in enumerate(os.listdir(dir_path)):
-            file_path = os.path.join(dir_path, file)
-            if os.path.isfile(file_path):
-                # 读取图像
-                img = cv2.imread(file_path)
-                if img is None:
-                    continue
-                
-                # 检测人脸
-                face, rect = self.face_detect_demo(img)
-                if face is not None:
-                    # 保存检测到的人脸图片
-                    saved_path = self.save_face_image(face, person_name, i)
-                    saved_images.append(saved_path)
-                    
-                    # 预处理人脸
-                    processed_face = self.preprocess_face(face)
-                    faces.append(processed_face)
-                    print(f"成功处理: {file}")
-        
-        print(f"从目录收集到 {len(faces)} 个样本，保存了 {len(saved_images)} 张图片")
+        file_paths = [os.path.join(dir_path, file) for file in os.listdir(dir_path)]
+        file_paths = [path for path in file_paths if os.path.isfile(path)]
+        
+        # 读取和检测在线程池中并行进行；参数与 face_detect_demo 相同（灰度图上直接检测，不做均衡化）
+        detector = get_detector("data/models/haarcascade_frontalface_default.xml")
+        for i, gray, rects in detector.detect_batch(file_paths, workers=workers, scale_factor=1.2, min_neighbors=6,
+                                                    min_size=(0, 0), equalize=False):
+            if gray is None or len(rects) == 0:
+                continue
+            
+            # 取最大的人脸
+            x, y, w, h = max(rects, key=lambda r: r[2] * r[3])
+            face = gray[y:y+h, x:x+w]
+            file = os.path.basename(file_paths[i])
+            
+            # 保存检测到的人脸图片
+            saved_path = self.save_face_image(face, person_name, i)
+            saved_images.append(saved_path)
+            
+            # 预处理人脸
+            processed_face = self.preprocess_face(face)
+            faces.append(processed_face)
+            logger.debug("成功处理: %s", file)
+        
+        logger.info("从目录收集到 %s 个样本，保存了 %s 张图片", len(faces), len(saved_images))
         
         # 保存到数据库
         if self.db_manager:
@@ -163,7 +174,7 @@ class FaceTrainer:
         """保存训练数据到数据库"""
         try:
             if not self.db_manager:
-                print("数据库管理器未初始化，跳过数据库保存")
+                logger.warning("数据库管理器未初始化，跳过数据库保存")
                 return
             
             # 检查用户是否存在，不存在则创建
@@ -178,22 +189,21 @@ class FaceTrainer:
             if user_id is None:
                 # 创建新用户
                 user_id = self.db_manager.add_user(person_name, 25, "未知")
-                print(f"创建新用户: {person_name}, ID: {user_id}")
+                logger.info("创建新用户: %s, ID: %s", person_name, user_id)
             
             # 保存人脸图片路径到数据库
             for image_path in image_paths:
                 self.db_manager.add_face_image(user_id, image_path, person_name)
             
-            print(f"训练数据已保存到数据库，用户ID: {user_id}")
+            logger.info("训练数据已保存到数据库，用户ID: %s", user_id)
             
         except Exception as e:
-            print(f"保存到数据库失败: {e}")
+            logger.error("保存到数据库失败: %s", e)
     
     def face_detect_demo(self, image):
         """人脸检测函数（基于用户代码）"""
         gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        face_detector = cv2.CascadeClassifier("data/models/haarcascade_frontalface_default.xml")
-        faces = face_detector.detectMultiScale(gray, 1.2, 6)
+        faces = get_cascade("data/models/haarcascade_frontalface_default.xml").detectMultiScale(gray, 1.2, 6)
         
         # 如果未检测到面部，则返回None
         if len(faces) == 0:
@@ -212,55 +222,41 @@ class FaceTrainer:
             self.training_data[person_name] = []
         
         self.training_data[person_name].extend(face_images)
-        print(f"为 {person_name} 添加了 {len(face_images)} 个训练样本")
+        logger.info("为 %s 添加了 %s 个训练样本", person_name, len(face_images))
     
     def train_all(self):
-        """训练所有收集的数据"""
+        """训练所有收集的数据（逐个用户增量录入，不影响模型中的其他用户）"""
         if not self.training_data:
-            print("没有训练数据")
+            logger.warning("没有训练数据")
             return False
         
-        print("开始训练所有数据...")
+        logger.info("开始训练所有数据...")
         
-        # 清空之前的训练数据
-        self.face_recognizer.clear_training_data()
-        
-        # 添加所有训练样本
+        success = True
         for person_name, faces in self.training_data.items():
-            print(f"添加 {person_name} 的 {len(faces)} 个样本")
-            for face in faces:
-                self.face_recognizer.add_training_sample(face, person_name)
-        
-        # 开始训练
-        success = self.face_recognizer.train()
+            logger.info("录入 %s 的 %s 个样本", person_name, len(faces))
+            if not self.face_recognizer.enroll_user(person_name, faces):
+                success = False
         
         if success:
-            print("所有数据训练完成！")
+            logger.info("所有数据训练完成！")
             # 清空训练数据
             self.training_data.clear()
         else:
-            print("训练失败！")
+            logger.error("训练失败！")
         
         return success
     
     def train_person(self, person_name, samples):
-        """训练特定人员的人脸识别模型"""
-        print(f"开始训练 {person_name} 的识别模型...")
-        
-        # 清空之前的训练数据
-        self.face_recognizer.clear_training_data()
-        
-        # 添加所有样本
-        for sample in samples:
-            self.face_recognizer.add_training_sample(sample, person_name)
+        """训练特定人员的人脸识别模型（增量录入，替换该人员已有的样本）"""
+        logger.info("开始训练 %s 的识别模型...", person_name)
         
-        # 训练模型
-        success = self.face_recognizer.train()
+        success = self.face_recognizer.enroll_user(person_name, samples)
         
         if success:
-            print(f"{person_name} 训练完成！")
+            logger.info("%s 训练完成！", person_name)
         else:
-            print(f"{person_name} 训练失败！")
+            logger.error("%s 训练失败！", person_name)
         
         return success
     
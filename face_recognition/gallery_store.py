@@ -0,0 +1,187 @@
+"""
+按用户持久化的LBPH直方图存储
+
+每个用户的直方图单独保存为一个 .npy 文件，index.json 记录标签ID、姓名、文件名和版本号。
+增删一个用户只需要读写该用户自己的文件和很小的索引文件，与整个特征库的大小无关。
+界面和 train_faces.py 可能同时修改同一个存储：每次修改都在文件锁内重新读取索引再写回，
+不会覆盖其他进程录入的用户。
+"""
+
+import os
+import json
+from contextlib import contextmanager
+
+import numpy as np
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+
+class GalleryStore:
+    """按用户存放直方图的目录存储"""
+
+    INDEX_FILE = "index.json"
+    LOCK_FILE = "index.lock"
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        self.index_path = os.path.join(root_dir, self.INDEX_FILE)
+        self.lock_path = os.path.join(root_dir, self.LOCK_FILE)
+        self.index = self._read_index()
+        self.foreign_changes = False  # 加载后其他进程修改过存储，内存中的模型需要重新加载
+
+    @staticmethod
+    def default_dir(model_path):
+        """根据模型路径得到存储目录"""
+        return os.path.splitext(model_path)[0] + "_gallery"
+
+    def exists(self):
+        """存储是否已经创建"""
+        return os.path.exists(self.index_path)
+
+    @property
+    def version(self):
+        """存储版本号，每次修改递增，用于判断二进制快照是否过期"""
+        return self.index["version"]
+
+    @property
+    def params(self):
+        """创建存储时使用的LBPH参数"""
+        return self.index.get("params")
+
+    def _read_index(self):
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {"version": 0, "next_label": 0, "params": None, "users": {}}
+
+    @contextmanager
+    def _modify(self):
+        """在文件锁内重新读取索引，修改后由调用方写回"""
+        os.makedirs(self.root_dir, exist_ok=True)
+        with open(self.lock_path, "a+b") as lock_file:
+            if os.name == 'nt':
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            else:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                index = self._read_index()
+                if index["version"] != self.index["version"]:
+                    self.foreign_changes = True
+                self.index = index
+                yield index
+            finally:
+                if os.name == 'nt':
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+                else:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _write_index(self):
+        os.makedirs(self.root_dir, exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def _bump(self):
+        self.index["version"] += 1
+        self._write_index()
+
+    def reset(self, params):
+        """清空存储（全量重新训练时使用）"""
+        with self._modify() as index:
+            for entry in index["users"].values():
+                self._remove_file(entry["file"])
+            self.index = {"version": index["version"], "next_label": 0, "params": params, "users": {}}
+            self._bump()
+        # 全量重写后存储只包含本实例的数据
+        self.foreign_changes = False
+
+    def create(self, params):
+        """存储尚未创建时用给定的LBPH参数创建，返回是否新建（已存在时只刷新索引）"""
+        with self._modify() as index:
+            if index.get("params") is not None:
+                return False
+            index["params"] = params
+            self._bump()
+        return True
+
+    def users(self):
+        """返回 {label_id: entry}"""
+        return {int(label_id): entry for label_id, entry in self.index["users"].items()}
+
+    def id_to_name(self):
+        """有姓名的标签映射"""
+        return {label_id: entry["name"] for label_id, entry in self.users().items() if entry.get("name")}
+
+    def find_label(self, name):
+        """根据姓名查找标签ID，不存在时返回None"""
+        for label_id, entry in self.users().items():
+            if entry.get("name") == name:
+                return label_id
+        return None
+
+    def allocate_label(self):
+        """分配一个新的标签ID，立即写入索引，其他进程不会分配到同一个ID"""
+        with self._modify() as index:
+            label_id = index["next_label"]
+            index["next_label"] = label_id + 1
+            self._write_index()
+        return label_id
+
+    def load_user(self, label_id):
+        """读取一个用户的直方图 (k, dim)"""
+        entry = self.index["users"][str(label_id)]
+        return np.load(os.path.join(self.root_dir, entry["file"]), mmap_mode="r")
+
+    def put_user(self, label_id, name, histograms):
+        """写入（替换）一个用户的全部直方图"""
+        histograms = np.ascontiguousarray(histograms, dtype=np.float32)
+        filename = f"user_{label_id:05d}.npy"
+
+        with self._modify() as index:
+            tmp_path = os.path.join(self.root_dir, filename + ".tmp")
+            with open(tmp_path, "wb") as f:
+                np.save(f, histograms)
+            os.replace(tmp_path, os.path.join(self.root_dir, filename))
+
+            index["next_label"] = max(index["next_label"], label_id + 1)
+            index["users"][str(label_id)] = {"name": name, "file": filename, "count": len(histograms)}
+            self._bump()
+
+    def remove_user(self, label_id):
+        """删除一个用户，返回是否存在"""
+        with self._modify() as index:
+            entry = index["users"].pop(str(label_id), None)
+            if entry is None:
+                return False
+            self._remove_file(entry["file"])
+            self._bump()
+        return True
+
+    def _remove_file(self, filename):
+        path = os.path.join(self.root_dir, filename)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def load_all(self):
+        """读取所有用户
+
+        Returns:
+            histograms: (N, dim) float32
+            labels: (N,) int32
+        """
+        blocks = []
+        labels = []
+        for label_id in sorted(self.users()):
+            histograms = self.load_user(label_id)
+            blocks.append(histograms)
+            labels.append(np.full(len(histograms), label_id, dtype=np.int32))
+
+        if not blocks:
+            return None, np.empty(0, dtype=np.int32)
+        return np.concatenate(blocks), np.concatenate(labels)
@@ -0,0 +1,151 @@
+"""
+按人脸轨迹的多帧身份投票
+
+单帧识别结果会因为姿态、光照偶尔出错，直接用来切换当前用户会引发一轮数据库查询和串口发送。
+每条轨迹在最近 window 帧中累积投票，满足以下任一条件即确定身份并提前结束：
+- 同一身份的票数达到 min_votes 且占窗口内多数
+- 同一身份的累计置信度达到 decision_score（每帧置信度为 1 - 距离/max_distance）
+确定为已知用户后该轨迹只每隔 reverify_interval 秒复核一帧：结果一致则延续，不一致则重新投票，
+直到轨迹结束或模型发生变化；最近一次确认的距离超过 confident_distance（不够可信）时不再跳过识别，
+每帧都复核，直到出现可信的一帧。
+确定为Unknown的结果只保持 unknown_retry 秒，之后重新投票，以便人转正脸后仍能被识别。
+"""
+
+import time
+from collections import deque
+
+
+class IdentityVoter:
+    """以轨迹ID为键的多帧身份投票器"""
+
+    def __init__(self, min_votes=3, window=5, decision_score=1.2, max_distance=None, unknown_retry=2.0,
+                 forget_after=2.0, reverify_interval=3.0, confident_distance=None):
+        """
+        Args:
+            min_votes: 确定身份所需的一致帧数
+            window: 参与投票的最近帧数
+            decision_score: 累计置信度达到该值时提前确定身份
+            max_distance: 置信度为0时的LBPH距离，默认使用识别器的tolerance
+            unknown_retry: Unknown决定的有效期（秒）
+            forget_after: 轨迹多少秒没有出现后丢弃其投票
+            reverify_interval: 已知用户决定的复核间隔（秒），0表示不复核
+            confident_distance: 最近一次确认的LBPH距离不超过该值时才按 reverify_interval 跳过识别，
+                                否则每帧复核；None表示不按距离区分
+        """
+        self.min_votes = min_votes
+        self.window = window
+        self.decision_score = decision_score
+        self.max_distance = max_distance
+        self.unknown_retry = unknown_retry
+        self.forget_after = forget_after
+        self.reverify_interval = reverify_interval
+        self.confident_distance = confident_distance
+        # 轨迹ID -> {'votes': deque, 'decision': (name, confidence), 'decided_at', 'verified_distance', 'generation', 'last_seen'}
+        self.entries = {}
+        self.recognized = 0  # 实际调用识别器的人脸数
+        self.skipped = 0  # 因已确定身份而跳过的人脸数
+
+    def _entry(self, track_id, generation, now):
+        entry = self.entries.get(track_id)
+        if entry is None or entry['generation'] != generation:
+            entry = {'votes': deque(maxlen=self.window), 'decision': None, 'decided_at': None,
+                     'verified_distance': None, 'generation': generation, 'last_seen': now}
+            self.entries[track_id] = entry
+        entry['last_seen'] = now
+        return entry
+
+    def decision(self, track_id, generation, now=None):
+        """已确定的身份 (name, confidence)，尚未确定或需要复核时返回None"""
+        now = time.time() if now is None else now
+        entry = self.entries.get(track_id)
+        if entry is None or entry['generation'] != generation or entry['decision'] is None:
+            return None
+        age = now - entry['decided_at']
+        if entry['decision'][0] == "Unknown":
+            if age >= self.unknown_retry:
+                entry['decision'] = None
+                entry['votes'].clear()
+                return None
+        elif self.reverify_interval and (age >= self.reverify_interval or not self._confident(entry)):
+            # 保留原决定，由 vote 用本帧的识别结果复核
+            return None
+        return entry['decision']
+
+    def _confident(self, entry):
+        """最近一次确认的距离是否足够可信"""
+        return self.confident_distance is None or entry['verified_distance'] <= self.confident_distance
+
+    def vote(self, track_id, name, confidence, generation, max_distance=100.0, now=None):
+        """为一条轨迹加入一帧的识别结果
+
+        Returns:
+            decision: 投票后确定的身份 (name, confidence)，尚未确定时返回None
+        """
+        now = time.time() if now is None else now
+        entry = self._entry(track_id, generation, now)
+        if entry['decision'] is not None:
+            if entry['decision'][0] == name:
+                # 复核结果一致，延续原决定；本帧距离决定下次复核的时间
+                entry['decided_at'] = now
+                entry['verified_distance'] = confidence
+                return entry['decision']
+            # 复核结果不一致，从本帧开始重新投票
+            entry['decision'] = None
+            entry['votes'].clear()
+
+        score = 0.0 if name == "Unknown" else max(0.0, 1.0 - confidence / max_distance)
+        entry['votes'].append((name, confidence, score))
+
+        agreeing = [vote for vote in entry['votes'] if vote[0] == name]
+        majority = len(agreeing) * 2 > len(entry['votes'])
+        if (len(agreeing) >= self.min_votes and majority) or sum(vote[2] for vote in agreeing) >= self.decision_score:
+            entry['decision'] = (name, sum(vote[1] for vote in agreeing) / len(agreeing))
+            entry['decided_at'] = now
+            entry['verified_distance'] = entry['decision'][1]
+        return entry['decision']
+
+    def recognize(self, recognizer, track_ids, face_images, now=None):
+        """识别一帧中的人脸，已确定身份的轨迹不再调用识别器
+
+        Args:
+            recognizer: FaceRecognizer
+            track_ids: 每张人脸的轨迹ID
+            face_images: 与track_ids对应的人脸图像
+            now: 当前时间，默认time.time()
+
+        Returns:
+            results: 与输入顺序一致的 [(name, confidence, decided), ...]；
+                     未确定的轨迹返回本帧的识别结果，decided为False
+        """
+        now = time.time() if now is None else now
+        generation = recognizer.model_generation
+        max_distance = self.max_distance or recognizer.tolerance
+
+        results = []
+        pending = []
+        for i, track_id in enumerate(track_ids):
+            decided = self.decision(track_id, generation, now)
+            if decided is None:
+                pending.append(i)
+                results.append(None)
+            else:
+                self.entries[track_id]['last_seen'] = now
+                results.append((decided[0], decided[1], True))
+        self.skipped += len(results) - len(pending)
+        self.recognized += len(pending)
+
+        if pending:
+            recognized = recognizer.recognize_batch([face_images[i] for i in pending])
+            for i, (name, confidence) in zip(pending, recognized):
+                decided = self.vote(track_ids[i], name, confidence, generation, max_distance, now)
+                results[i] = (decided[0], decided[1], True) if decided else (name, confidence, False)
+
+        # 丢弃已经消失的轨迹
+        for track_id in [tid for tid, entry in self.entries.items() if now - entry['last_seen'] > self.forget_after]:
+            del self.entries[track_id]
+
+        return results
+
+    def clear(self):
+        """清空所有轨迹的投票"""
+        self.entries.clear()
@@ -0,0 +1,514 @@
+import copy
+import math
+
+import numpy as np
+
+# 特征库支持的存储类型：float16按原值存放；整数类型按样本做比例量化（每个样本一个缩放系数）
+GALLERY_DTYPES = ('float32', 'float16', 'uint16', 'uint8')
+
+
+def quantize(matrix, dtype):
+    """把 (dim, N) 的float32直方图矩阵转换为存储类型
+
+    Returns:
+        stored: (dim, N) 存储类型的矩阵
+        scales: (N,) 每个样本的缩放系数（反量化为 stored * scales），浮点类型为None
+    """
+    dtype = np.dtype(dtype)
+    if dtype.kind == 'f':
+        return np.ascontiguousarray(matrix, dtype=dtype), None
+
+    # 每个样本的最大值映射到整数类型的上限，按列分块避免一次性创建整块临时矩阵
+    limit = np.iinfo(dtype).max
+    scales = matrix.max(axis=0).astype(np.float32) / np.float32(limit)
+    scales[scales == 0] = 1.0
+    stored = np.empty(matrix.shape, dtype=dtype)
+    for start in range(0, matrix.shape[1], 1024):
+        end = start + 1024
+        stored[:, start:end] = np.rint(matrix[:, start:end] / scales[start:end])
+    return stored, scales
+
+
+def swap_remove_plan(labels, label):
+    """计算删除某个标签时的“末尾填补空位”方案
+
+    Returns:
+        holes: 需要被填补的位置
+        movers: 用来填补的末尾位置（与holes一一对应）
+        new_size: 删除后的样本数量
+    """
+    removed = np.flatnonzero(labels == label)
+    new_size = len(labels) - len(removed)
+    holes = removed[removed < new_size]
+    tail = np.arange(new_size, len(labels))
+    movers = tail[labels[tail] != label]
+    return holes, movers, new_size
+
+
+class GalleryState:
+    """特征库某一版本的全部数据，创建后不再修改
+
+    矩阵、直方图和、缩放系数、标签和按标签分组的索引必须彼此一致。增删样本时构建新的状态，
+    再用一次赋值替换特征库的状态，读取方在开始时取出状态引用，整个计算过程看到的都是同一版本。
+    """
+
+    __slots__ = ('matrix', 'row_sums', 'scales', 'labels', 'order', 'unique_labels', 'label_starts', 'buffer', 'tail')
+
+    def __init__(self, matrix, row_sums, scales, labels, buffer=None, tail=None):
+        self.matrix = matrix  # (dim, N) 存储类型
+        self.row_sums = row_sums
+        self.scales = scales  # 整数存储类型的每样本缩放系数
+        self.labels = labels
+        # 增量添加样本时使用的可扩容缓冲区，matrix是它的前N列；
+        # tail 记录缓冲区已被哪个长度的状态使用，只有最新的状态才能在原缓冲区末尾追加
+        self.buffer = buffer
+        self.tail = tail
+
+        # 按标签排序后的索引，用于每个标签取最小距离
+        self.order = np.argsort(labels, kind='stable')
+        self.unique_labels, self.label_starts = np.unique(labels[self.order], return_index=True)
+
+    @property
+    def size(self):
+        return len(self.labels)
+
+
+class LBPHGallery:
+    """LBPH特征库：所有训练直方图存放在一个连续的矩阵中，批量计算卡方距离
+
+    特征提取与OpenCV的LBPHFaceRecognizer保持一致（扩展LBP + 空间直方图），
+    距离使用与predict相同的HISTCMP_CHISQR_ALT，因此可以直接替换predict。
+    矩阵按 (dim, N) 存放，查询时只需读取查询直方图非零的那些行。
+    dtype 为 float16/uint16/uint8 时以紧凑格式存放，距离计算时按块反量化。
+    数据保存在不可变的 GalleryState 中，增删样本替换整个状态，识别可以与录入、删除并发进行。
+    """
+
+    def __init__(self, radius=1, neighbors=8, grid_x=8, grid_y=8, block_elements=1 << 16, dtype='float32'):
+        if str(np.dtype(dtype)) not in GALLERY_DTYPES:
+            raise ValueError(f"不支持的特征库存储类型: {dtype}")
+        self.dtype = np.dtype(dtype)
+        self.radius = radius
+        self.neighbors = neighbors
+        self.grid_x = grid_x
+        self.grid_y = grid_y
+        # 距离计算时每个分块的元素个数，保证临时缓冲区能放进缓存
+        self.block_elements = block_elements
+        # 计算直方图时每批处理的图像数量
+        self.histogram_batch = 64
+
+        self._state = self._empty_state()
+        self._init_sampling_points()
+
+    def _empty_state(self):
+        return GalleryState(np.empty((self.dim, 0), dtype=self.dtype), np.empty(0, dtype=np.float32),
+                            np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int32))
+
+    @property
+    def state(self):
+        """当前版本的数据"""
+        return self._state
+
+    def copy(self):
+        """返回与本实例共享当前数据的副本，之后对任一方的增删都不会影响另一方"""
+        return copy.copy(self)
+
+    @property
+    def labels(self):
+        """每个样本的标签"""
+        return self._state.labels
+
+    @property
+    def dim(self):
+        """单个直方图的维度"""
+        return self.grid_x * self.grid_y * (1 << self.neighbors)
+
+    @property
+    def size(self):
+        """特征库中的样本数量"""
+        return self._state.size
+
+    @property
+    def quantized(self):
+        """是否使用整数量化存储"""
+        return self.dtype.kind == 'u'
+
+    @property
+    def histograms(self):
+        """以 (N, dim) 形式访问特征库中的直方图（非float32存储时返回反量化后的副本）"""
+        if self.dtype == np.float32:
+            return self._state.matrix.T
+        return self.get_histograms()
+
+    @property
+    def matrix(self):
+        """按 (dim, N) 存放的直方图矩阵（存储类型）"""
+        return self._state.matrix
+
+    @property
+    def scales(self):
+        """整数存储类型的每样本缩放系数"""
+        return self._state.scales
+
+    @property
+    def nbytes(self):
+        """特征库占用的内存字节数"""
+        state = self._state
+        return state.matrix.nbytes + state.row_sums.nbytes + state.scales.nbytes + state.labels.nbytes
+
+    def get_histograms(self, columns=None, state=None):
+        """取出部分样本的float32直方图 (M, dim)，columns为None时取全部"""
+        state = state or self._state
+        matrix = state.matrix if columns is None else state.matrix[:, np.asarray(columns, dtype=np.int64)]
+        histograms = matrix.T.astype(np.float32)
+        if self.quantized:
+            scales = state.scales if columns is None else state.scales[columns]
+            histograms *= scales[:, np.newaxis]
+        return histograms
+
+    @property
+    def row_sums(self):
+        """每个样本直方图的元素和"""
+        return self._state.row_sums
+
+    @property
+    def params(self):
+        """LBPH参数"""
+        return {
+            'radius': self.radius,
+            'neighbors': self.neighbors,
+            'grid_x': self.grid_x,
+            'grid_y': self.grid_y
+        }
+
+    def _init_sampling_points(self):
+        """预先计算圆形邻域采样点的双线性插值权重（与OpenCV elbp一致）"""
+        self._points = []
+        for n in range(self.neighbors):
+            # 角度按双精度计算后再转float32，与OpenCV的取整结果保持一致
+            x = np.float32(self.radius * math.cos(2.0 * math.pi * n / self.neighbors))
+            y = np.float32(-self.radius * math.sin(2.0 * math.pi * n / self.neighbors))
+            fx, fy = int(np.floor(x)), int(np.floor(y))
+            cx, cy = int(np.ceil(x)), int(np.ceil(y))
+            ty = np.float32(y - fy)
+            tx = np.float32(x - fx)
+            one = np.float32(1.0)
+            w1 = (one - tx) * (one - ty)
+            w2 = tx * (one - ty)
+            w3 = (one - tx) * ty
+            w4 = tx * ty
+            self._points.append((fx, fy, cx, cy, w1, w2, w3, w4))
+
+    def set_params(self, radius, neighbors, grid_x, grid_y, dtype=None):
+        """更新LBPH参数和存储类型（会清空特征库）"""
+        if dtype is not None:
+            if str(np.dtype(dtype)) not in GALLERY_DTYPES:
+                raise ValueError(f"不支持的特征库存储类型: {dtype}")
+            self.dtype = np.dtype(dtype)
+        self.radius = radius
+        self.neighbors = neighbors
+        self.grid_x = grid_x
+        self.grid_y = grid_y
+        self._init_sampling_points()
+        self.set_samples(np.empty((0, self.dim), dtype=np.float32), np.empty(0, dtype=np.int32))
+
+    def set_samples(self, histograms, labels):
+        """用新的直方图矩阵 (N, dim) 和标签替换特征库"""
+        histograms = np.asarray(histograms, dtype=np.float32).reshape(-1, self.dim)
+        self.set_matrix(histograms.T, labels)
+
+    def set_matrix(self, matrix, labels, row_sums=None, scales=None):
+        """直接设置按 (dim, N) 存放的直方图矩阵
+
+        matrix已经是存储类型的连续数组（例如内存映射的模型文件，整数类型需同时给出scales）时不会发生拷贝，
+        否则按float32直方图处理并转换为存储类型。
+        """
+        labels = np.asarray(labels, dtype=np.int32).reshape(-1)
+        if matrix.shape != (self.dim, len(labels)):
+            raise ValueError(f"直方图矩阵形状 {matrix.shape} 与标签数量 {len(labels)} 不一致")
+
+        if matrix.dtype == self.dtype and (scales is not None or not self.quantized):
+            matrix = np.ascontiguousarray(matrix)
+        else:
+            matrix, scales = quantize(np.asarray(matrix, dtype=np.float32), self.dtype)
+            row_sums = None
+
+        if scales is None:
+            scales = np.empty(0, dtype=np.float32)
+        scales = np.asarray(scales, dtype=np.float32).reshape(-1)
+
+        if row_sums is None:
+            row_sums = matrix.sum(axis=0, dtype=np.float32)
+            if self.quantized:
+                row_sums *= scales
+
+        self._state = GalleryState(matrix, np.asarray(row_sums, dtype=np.float32).reshape(-1), scales, labels)
+
+    def _appendable_buffer(self, state, capacity):
+        """返回可以在末尾追加样本的缓冲区（前size列与state.matrix相同）
+
+        只有最新使用该缓冲区的状态可以原地追加：写入的列在所有旧状态的可见范围之外。
+        否则（或容量不足）分配新的缓冲区，容量按倍数增长，均摊O(1)。
+        """
+        size = state.size
+        if state.buffer is not None and state.tail[0] == size and state.buffer.shape[1] >= capacity:
+            return state.buffer, state.tail
+        buffer = np.empty((self.dim, max(capacity, 2 * size, 16)), dtype=self.dtype)
+        buffer[:, :size] = state.matrix
+        return buffer, [size]
+
+    def add_samples(self, histograms, label):
+        """追加同一标签的一批直方图，代价与新增样本数成正比"""
+        histograms = np.asarray(histograms, dtype=np.float32).reshape(-1, self.dim)
+        count = len(histograms)
+        if count == 0:
+            return
+
+        state = self._state
+        stored, scales = quantize(histograms.T, self.dtype)
+        row_sums = stored.sum(axis=0, dtype=np.float32)
+        if self.quantized:
+            row_sums *= scales
+            scales = np.concatenate([state.scales, scales])
+        else:
+            scales = state.scales
+
+        size = state.size
+        buffer, tail = self._appendable_buffer(state, size + count)
+        buffer[:, size:size + count] = stored
+        tail[0] = size + count
+        self._state = GalleryState(
+            buffer[:, :size + count],
+            np.concatenate([state.row_sums, row_sums]),
+            scales,
+            np.concatenate([state.labels, np.full(count, label, dtype=np.int32)]),
+            buffer, tail,
+        )
+
+    def remove_label(self, label):
+        """删除某个标签的全部样本，用末尾的样本填补空位
+
+        旧状态可能仍在被识别使用，填补在新的缓冲区中进行（复制整个特征库，删除用户不是频繁操作）。
+
+        Returns:
+            removed: 删除的样本数量
+        """
+        state = self._state
+        holes, movers, new_size = swap_remove_plan(state.labels, label)
+        count = state.size - new_size
+        if count == 0:
+            return 0
+
+        buffer = np.empty((self.dim, max(new_size, 16)), dtype=self.dtype)
+        buffer[:, :new_size] = state.matrix[:, :new_size]
+        buffer[:, holes] = state.matrix[:, movers]
+        row_sums = np.array(state.row_sums[:new_size], dtype=np.float32)
+        row_sums[holes] = state.row_sums[movers]
+        labels = np.array(state.labels[:new_size], dtype=np.int32)
+        labels[holes] = state.labels[movers]
+        scales = state.scales
+        if self.quantized:
+            scales = np.array(state.scales[:new_size], dtype=np.float32)
+            scales[holes] = state.scales[movers]
+
+        self._state = GalleryState(buffer[:, :new_size], row_sums, scales, labels, buffer, [new_size])
+        return count
+
+    def load_from_recognizer(self, recognizer):
+        """从OpenCV的LBPHFaceRecognizer同步参数和训练直方图"""
+        self.set_params(
+            recognizer.getRadius(),
+            recognizer.getNeighbors(),
+            recognizer.getGridX(),
+            recognizer.getGridY()
+        )
+        histograms = recognizer.getHistograms()
+        if len(histograms) > 0:
+            self.set_samples(np.vstack(histograms), recognizer.getLabels())
+
+    def compute_lbp(self, images):
+        """计算扩展LBP编码图
+
+        Args:
+            images: 灰度图像，形状为 (H, W) 或 (B, H, W)，uint8
+
+        Returns:
+            codes: LBP编码，形状为 (B, H-2r, W-2r)，int32
+        """
+        images = np.asarray(images)
+        if images.ndim == 2:
+            images = images[np.newaxis]
+
+        r = self.radius
+        batch, rows, cols = images.shape
+        src = images.astype(np.float32)
+        center = src[:, r:rows - r, r:cols - r]
+        codes = np.zeros(center.shape, dtype=np.int32)
+        eps = np.finfo(np.float32).eps
+
+        def shifted(dy, dx):
+            return src[:, r + dy:rows - r + dy, r + dx:cols - r + dx]
+
+        for n, (fx, fy, cx, cy, w1, w2, w3, w4) in enumerate(self._points):
+            t = (w1 * shifted(fy, fx) + w2 * shifted(fy, cx)
+                 + w3 * shifted(cy, fx) + w4 * shifted(cy, cx))
+            bit = (t > center) | (np.abs(t - center) < eps)
+            codes |= bit.astype(np.int32) << n
+
+        return codes
+
+    def compute_histograms(self, images):
+        """计算LBPH空间直方图
+
+        Args:
+            images: 灰度图像，形状为 (H, W) 或 (B, H, W)，uint8
+
+        Returns:
+            histograms: 形状为 (B, dim) 的float32矩阵
+        """
+        images = np.asarray(images)
+        if images.ndim == 2:
+            images = images[np.newaxis]
+
+        # 大批量时分批计算，限制中间数组的内存
+        if len(images) > self.histogram_batch:
+            return np.concatenate([
+                self.compute_histograms(images[start:start + self.histogram_batch])
+                for start in range(0, len(images), self.histogram_batch)
+            ])
+
+        codes = self.compute_lbp(images)
+        batch, rows, cols = codes.shape
+        num_patterns = 1 << self.neighbors
+        height = rows // self.grid_y
+        width = cols // self.grid_x
+
+        # 截掉不能整除网格的边缘，重排为 (B, grid_y, grid_x, cell像素)
+        cells = codes[:, :height * self.grid_y, :width * self.grid_x]
+        cells = cells.reshape(batch, self.grid_y, height, self.grid_x, width)
+        cells = cells.transpose(0, 1, 3, 2, 4).reshape(batch, -1, height * width)
+
+        # 每个cell的编码加上偏移后统一做一次bincount
+        num_cells = self.grid_x * self.grid_y
+        offsets = np.arange(batch * num_cells, dtype=np.int64).reshape(batch, num_cells, 1) * num_patterns
+        counts = np.bincount((cells + offsets).ravel(), minlength=batch * num_cells * num_patterns)
+
+        histograms = counts.astype(np.float32).reshape(batch, self.dim)
+        histograms /= np.float32(height * width)
+        return histograms
+
+    def distances(self, query_histograms, columns=None, state=None):
+        """计算查询直方图与特征库样本的卡方距离（HISTCMP_CHISQR_ALT）
+
+        利用 (g-q)^2/(g+q) = (g+q) - 4gq/(g+q)，只有查询直方图非零的维度需要逐元素计算。
+
+        Args:
+            query_histograms: 形状为 (dim,) 或 (B, dim)
+            columns: 只与这些样本下标比较，为None时比较全部样本
+            state: 使用的数据版本，默认为当前版本
+
+        Returns:
+            distances: 形状为 (B, N) 的float32矩阵，N为参与比较的样本数
+        """
+        state = state or self._state
+        matrix = state.matrix
+        queries = np.asarray(query_histograms, dtype=np.float32).reshape(-1, self.dim)
+        if columns is None:
+            row_sums = state.row_sums
+            scales = state.scales
+        else:
+            columns = np.asarray(columns, dtype=np.int64)
+            row_sums = state.row_sums[columns]
+            scales = state.scales[columns] if self.quantized else state.scales
+
+        count = len(row_sums)
+        result = np.empty((len(queries), count), dtype=np.float32)
+        if count == 0:
+            return result
+
+        block = max(1, self.block_elements // count)
+        numerator = np.empty((block, count), dtype=np.float32)
+        denominator = np.empty((block, count), dtype=np.float32)
+        cross = np.empty(count, dtype=np.float32)
+        # 非float32存储时，每个分块先反量化到这个缓冲区
+        dequantized = np.empty((block, count), dtype=np.float32) if self.dtype != np.float32 else None
+
+        for i, query in enumerate(queries):
+            nonzero = np.flatnonzero(query)
+            cross.fill(0.0)
+            for start in range(0, len(nonzero), block):
+                index = nonzero[start:start + block]
+                n = len(index)
+                if columns is None:
+                    rows = matrix[index]
+                else:
+                    rows = matrix[index[:, np.newaxis], columns]
+                if dequantized is not None:
+                    if self.quantized:
+                        np.multiply(rows, scales, out=dequantized[:n])
+                    else:
+                        dequantized[:n] = rows
+                    rows = dequantized[:n]
+                values = query[index, np.newaxis]
+                np.multiply(rows, values, out=numerator[:n])
+                np.add(rows, values, out=denominator[:n])
+                np.divide(numerator[:n], denominator[:n], out=numerator[:n])
+                cross += numerator[:n].sum(axis=0)
+
+            distance = row_sums + query.sum()
+            distance -= 4.0 * cross
+            np.maximum(distance, 0.0, out=distance)
+            result[i] = 2.0 * distance
+
+        return result
+
+    def match(self, query_histograms, k=1):
+        """在特征库中查找最相近的k个身份
+
+        Args:
+            query_histograms: 形状为 (dim,) 或 (B, dim)
+            k: 返回的身份数量（同一标签只取最近的样本）
+
+        Returns:
+            results: 每个查询一个列表 [(label, distance), ...]，按距离升序
+        """
+        queries = np.asarray(query_histograms, dtype=np.float32).reshape(-1, self.dim)
+        state = self._state
+        if state.size == 0:
+            return [[] for _ in range(len(queries))]
+
+        return self.rank_labels(self.distances(queries, state=state), k, state=state)
+
+    def rank_labels(self, distances, k=1, state=None):
+        """将样本距离按标签聚合（每个标签取最小距离），返回每个查询的top-k (label, distance)"""
+        state = state or self._state
+        distances = np.asarray(distances, dtype=np.float32).reshape(-1, state.size)
+        grouped = distances[:, state.order]
+        per_label = np.minimum.reduceat(grouped, state.label_starts, axis=1)
+
+        k = min(k, per_label.shape[1])
+        results = []
+        for row in per_label:
+            top = np.argpartition(row, k - 1)[:k] if k < len(row) else np.arange(len(row))
+            top = top[np.argsort(row[top], kind='stable')]
+            results.append([(int(state.unique_labels[i]), float(row[i])) for i in top])
+        return results
+
+    def rank_columns(self, distances, columns, k=1, state=None):
+        """对部分样本的距离按标签聚合，返回top-k (label, distance)
+
+        Args:
+            distances: 形状为 (M,) 的距离
+            columns: 这些距离对应的样本下标
+        """
+        labels = (state or self._state).labels
+        results = []
+        seen = set()
+        for i in np.argsort(distances, kind='stable'):
+            label = int(labels[columns[i]])
+            if label in seen:
+                continue
+            seen.add(label)
+            results.append((label, float(distances[i])))
+            if len(results) >= k:
+                break
+        return results
@@ -0,0 +1,189 @@
+"""
+二进制人脸模型存储
+
+单个文件中依次存放：魔数、JSON头（LBPH参数、存储类型、标签映射、元数据、各数据段偏移）、
+按 (dim, N) 存放的直方图矩阵（float32/float16/uint16/uint8）、每个样本的直方图和、int32标签，
+以及整数存储类型的每样本缩放系数。
+数据段按64字节对齐，可以直接内存映射给LBPHGallery使用，打开模型只需要解析很小的JSON头。
+"""
+
+import os
+import json
+import pickle
+import struct
+from datetime import datetime
+
+import numpy as np
+
+from face_recognition.lbph_gallery import LBPHGallery
+
+MAGIC = b'LBPHGAL\x01'
+FORMAT_VERSION = 2
+SUPPORTED_VERSIONS = (1, 2)  # 版本1只有float32矩阵，没有dtype和scales
+ALIGNMENT = 64
+BINARY_SUFFIX = '.lbph'
+
+
+def binary_model_path(model_path):
+    """根据YAML模型路径得到对应的二进制模型路径"""
+    return os.path.splitext(model_path)[0] + BINARY_SUFFIX
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def save_model(path, gallery, id_to_name, metadata=None):
+    """保存特征库和标签映射到二进制模型文件
+
+    先写入临时文件再替换，读取方永远不会看到写了一半的模型。
+
+    Args:
+        path: 模型文件路径
+        gallery: LBPHGallery
+        id_to_name: 标签ID到姓名的映射
+        metadata: 附加的元数据（需可JSON序列化）
+    """
+    count = gallery.size
+    dim = gallery.dim
+    matrix_bytes = dim * count * gallery.dtype.itemsize
+    vector_bytes = count * 4
+
+    header = {
+        'version': FORMAT_VERSION,
+        'params': gallery.params,
+        'dtype': str(gallery.dtype),
+        'dim': dim,
+        'count': count,
+        'id_to_name': {str(label_id): name for label_id, name in id_to_name.items()},
+        'metadata': dict(metadata or {}, saved_at=datetime.now().isoformat(timespec='seconds')),
+    }
+
+    # 头部长度会影响偏移量，先用占位偏移计算一次长度再回填
+    header['offsets'] = {'matrix': 0, 'row_sums': 0, 'labels': 0, 'scales': 0}
+    header_size = len(json.dumps(header, ensure_ascii=False).encode('utf-8')) + 64
+    matrix_offset = _align(len(MAGIC) + 4 + header_size)
+    row_sums_offset = _align(matrix_offset + matrix_bytes)
+    labels_offset = _align(row_sums_offset + vector_bytes)
+    scales_offset = _align(labels_offset + vector_bytes)
+    header['offsets'] = {
+        'matrix': matrix_offset, 'row_sums': row_sums_offset, 'labels': labels_offset, 'scales': scales_offset
+    }
+
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    header_bytes = header_bytes.ljust(matrix_offset - len(MAGIC) - 4, b' ')
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header_bytes)))
+        f.write(header_bytes)
+        f.write(np.ascontiguousarray(gallery.matrix, dtype=gallery.dtype.newbyteorder('<')).tobytes())
+        f.seek(row_sums_offset)
+        f.write(np.ascontiguousarray(gallery.row_sums, dtype='<f4').tobytes())
+        f.seek(labels_offset)
+        f.write(np.ascontiguousarray(gallery.labels, dtype='<i4').tobytes())
+        if gallery.quantized:
+            f.seek(scales_offset)
+            f.write(np.ascontiguousarray(gallery.scales, dtype='<f4').tobytes())
+    os.replace(tmp_path, path)
+
+
+def read_header(path):
+    """只读取模型文件头"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"不是有效的二进制人脸模型: {path}")
+        (header_length,) = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(header_length).decode('utf-8'))
+
+    if header.get('version') not in SUPPORTED_VERSIONS:
+        raise ValueError(f"不支持的模型版本: {header.get('version')}")
+    return header
+
+
+def load_model(path, mmap=True, gallery=None, dtype=None):
+    """加载二进制模型文件
+
+    Args:
+        path: 模型文件路径
+        mmap: 是否以只读内存映射方式打开直方图矩阵（Windows上映射中的文件无法被替换，可关闭）
+        gallery: 要写入的LBPHGallery，为None时新建
+        dtype: 特征库的存储类型，None时使用模型文件中的类型；与文件不同时加载后重新量化（不再内存映射）
+
+    Returns:
+        gallery, id_to_name, header
+    """
+    header = read_header(path)
+    params = header['params']
+    count = header['count']
+    offsets = header['offsets']
+    stored_dtype = np.dtype(header.get('dtype', 'float32'))
+
+    if gallery is None:
+        gallery = LBPHGallery()
+    gallery.set_params(params['radius'], params['neighbors'], params['grid_x'], params['grid_y'], dtype=stored_dtype)
+    if gallery.dim != header['dim']:
+        raise ValueError(f"模型维度 {header['dim']} 与参数不一致")
+
+    if count > 0:
+        file_dtype = stored_dtype.newbyteorder('<')
+        if mmap:
+            matrix = np.memmap(path, dtype=file_dtype, mode='r', offset=offsets['matrix'], shape=(gallery.dim, count))
+        else:
+            with open(path, 'rb') as f:
+                f.seek(offsets['matrix'])
+                matrix = np.fromfile(f, dtype=file_dtype, count=gallery.dim * count).reshape(gallery.dim, count)
+
+        scales = None
+        with open(path, 'rb') as f:
+            f.seek(offsets['row_sums'])
+            row_sums = np.fromfile(f, dtype='<f4', count=count)
+            f.seek(offsets['labels'])
+            labels = np.fromfile(f, dtype='<i4', count=count)
+            if gallery.quantized:
+                f.seek(offsets['scales'])
+                scales = np.fromfile(f, dtype='<f4', count=count)
+
+        gallery.set_matrix(matrix, labels, row_sums, scales)
+
+    if dtype is not None and np.dtype(dtype) != gallery.dtype:
+        histograms = gallery.get_histograms()
+        labels = np.array(gallery.labels)
+        gallery.set_params(params['radius'], params['neighbors'], params['grid_x'], params['grid_y'], dtype=dtype)
+        gallery.set_samples(histograms, labels)
+
+    id_to_name = {int(label_id): name for label_id, name in header['id_to_name'].items()}
+    return gallery, id_to_name, header
+
+
+def load_label_map(label_map_path):
+    """读取旧版 _labels.pkl 标签映射"""
+    if not os.path.exists(label_map_path):
+        return {}
+    with open(label_map_path, 'rb') as f:
+        label_data = pickle.load(f)
+    return dict(label_data.get('id_to_name', {}))
+
+
+def convert_yaml_model(yml_path, output_path=None, label_map_path=None):
+    """将OpenCV的YAML模型和 _labels.pkl 标签映射转换为二进制模型
+
+    Returns:
+        output_path: 生成的二进制模型路径
+    """
+    import cv2
+
+    output_path = output_path or binary_model_path(yml_path)
+    label_map_path = label_map_path or yml_path.replace('.yml', '_labels.pkl')
+
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.read(yml_path)
+
+    gallery = LBPHGallery()
+    gallery.load_from_recognizer(recognizer)
+    id_to_name = load_label_map(label_map_path)
+
+    save_model(output_path, gallery, id_to_name, metadata={'source': os.path.basename(yml_path)})
+    return output_path
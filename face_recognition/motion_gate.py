@@ -0,0 +1,61 @@
+"""
+运动门控：画面没有变化时跳过人脸检测和识别
+
+售卖机前大部分时间要么没有人，要么有人站着不动。把检测图缩小到很小的尺寸后与上一次
+实际处理的画面做差，变化的像素比例低于 min_area 时认为画面静止，直接沿用上一次的结果。
+参考画面只在实际处理时更新，缓慢的光照变化会累积起来最终触发一次处理；
+超过 max_static_time 秒没有处理时也强制处理一次。
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+from face_recognition.preprocessing import to_gray
+
+
+class MotionGate:
+    """缩小画面的帧差检测"""
+
+    def __init__(self, threshold=15, min_area=0.01, size=(40, 30), max_static_time=5.0):
+        """
+        Args:
+            threshold: 像素灰度差超过该值视为变化
+            min_area: 变化像素占比达到该值时认为画面有变化
+            size: 做差前把画面缩小到的尺寸 (宽, 高)
+            max_static_time: 画面静止时最长多少秒强制处理一次
+        """
+        self.threshold = threshold
+        self.min_area = min_area
+        self.size = tuple(size)
+        self.max_static_time = max_static_time
+        self.reference = None
+        self.reference_time = 0.0
+        self.passed = 0
+        self.skipped = 0
+
+    def changed(self, image, now=None):
+        """画面相对上一次处理时是否有变化；返回True时调用方应处理该帧
+
+        Args:
+            image: 灰度图或BGR图（如FramePreprocessor.detection_image）
+            now: 当前时间，默认time.time()
+        """
+        now = time.time() if now is None else now
+        small = cv2.resize(to_gray(image), self.size, interpolation=cv2.INTER_AREA)
+
+        if self.reference is not None and now - self.reference_time < self.max_static_time:
+            diff = cv2.absdiff(small, self.reference)
+            if np.count_nonzero(diff > self.threshold) < self.min_area * diff.size:
+                self.skipped += 1
+                return False
+
+        self.reference = small
+        self.reference_time = now
+        self.passed += 1
+        return True
+
+    def reset(self):
+        """下一帧强制处理"""
+        self.reference = None
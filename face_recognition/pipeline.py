@@ -0,0 +1,436 @@
+"""
+后台识别流水线：采集 → 检测 → 识别 → 身份确认
+
+界面线程只负责显示画面和结果，检测、LBPH匹配、数据库查询和串口发送都在工作线程中进行：
+- 采集：摄像头线程写入 FrameBuffer（只保留最新帧）
+- 检测：按 interval 取最新帧，预处理、运动门控、ROI/全图检测，截取人脸区域
+- 识别：人脸跟踪 + 多帧身份投票
+- 身份确认：身份变化时查询数据库、切换串口当前用户，把结果交给 on_result 回调
+相邻阶段之间是容量为1的队列，下游处理不过来时丢弃旧的任务，延迟不会累积。
+流水线本身不依赖Qt，界面通过信号把 on_result 转到主线程，无界面服务直接在回调中处理。
+"""
+
+import queue
+import threading
+import time
+
+from face_recognition.adaptive_size import AdaptiveSizeDetector
+from face_recognition.cascade_registry import get_detector
+from face_recognition.face_recognizer import FaceRecognizer
+from face_recognition.identity_voter import IdentityVoter
+from face_recognition.motion_gate import MotionGate
+from face_recognition.preprocessing import FramePreprocessor
+from face_recognition.roi_tracker import RoiTracker
+from face_recognition.tracking import FaceTracker
+from face_recognition.two_stage_detector import TwoStageDetector
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class RecognitionResult:
+    """一次识别的结果，交给界面或无界面服务显示"""
+
+    def __init__(self, seq, timestamp, faces, results, generation):
+        self.seq = seq  # 帧序号
+        self.timestamp = timestamp  # 采集时间
+        self.faces = faces  # 原始画面坐标的人脸框 [(x, y, w, h), ...]
+        self.results = results  # 与faces对应的 [(name, confidence, decided), ...]
+        self.generation = generation  # 识别时的模型版本
+        self.largest_index = max(range(len(faces)), key=lambda i: faces[i][2] * faces[i][3]) if len(faces) else None
+        self.status = 'no_face'  # no_face / pending / known / unknown
+        self.identity_changed = False  # 当前用户是否在这次结果中切换
+        self.user_info = None  # 当前用户的数据库记录
+        self.health_record = None  # 当前用户最新的健康记录
+        self.error = None  # 查询数据库失败时的错误信息
+
+    @property
+    def name(self):
+        """最大人脸的识别结果"""
+        return None if self.largest_index is None else self.results[self.largest_index][0]
+
+    @property
+    def confidence(self):
+        return None if self.largest_index is None else self.results[self.largest_index][1]
+
+
+def put_latest(q, item):
+    """放入容量有限的队列，队列已满时丢弃最旧的任务；返回是否丢弃了任务"""
+    try:
+        q.put_nowait(item)
+        return False
+    except queue.Full:
+        try:
+            q.get_nowait()
+        except queue.Empty:
+            pass
+        q.put_nowait(item)
+        return True
+
+
+class DetectionStage:
+    """预处理、运动门控和人脸检测"""
+
+    def __init__(self, preprocessor, detector, roi_tracker=None, motion_gate=None, detect_params=None):
+        self.preprocessor = preprocessor
+        self.detector = detector
+        self.roi_tracker = roi_tracker
+        self.motion_gate = motion_gate
+        self.detect_params = detect_params or {}
+
+    def process(self, frame, now, settled=True):
+        """检测一帧
+
+        Args:
+            settled: 上一次结果是否已全部确定身份，只有确定后才允许运动门控跳过静止画面
+
+        Returns:
+            None 表示画面静止、沿用上次结果；否则为 (faces, face_rois)，faces为原始画面坐标
+        """
+        # 灰度转换、缩小（提高检测速度）和均衡化每帧只做一次
+        prepared = self.preprocessor.process(frame)
+
+        if self.motion_gate is not None and settled and not self.motion_gate.changed(prepared.detection_image, now):
+            return None
+
+        if self.roi_tracker is not None:
+            faces = self.roi_tracker.detect(prepared.detection_image, **self.detect_params)
+        else:
+            faces = self.detector.detect_faces(prepared.detection_image, equalized=True, **self.detect_params)
+
+        if len(faces) == 0:
+            return [], []
+        # 将检测结果转换回原始尺寸，从共享的灰度图截取人脸区域，增加10%边界确保完整
+        # 灰度图每帧复用，下一帧会覆盖它；人脸区域交给识别线程前复制出来
+        faces = prepared.to_frame_coordinates(faces)
+        return faces, [crop.copy() for crop in prepared.crops(faces, margin=0.1)]
+
+    def reset(self):
+        if self.roi_tracker is not None:
+            self.roi_tracker.reset()
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+
+
+class RecognitionStage:
+    """人脸跟踪和多帧身份投票"""
+
+    def __init__(self, face_recognizer, face_tracker, identity_voter):
+        self.face_recognizer = face_recognizer
+        self.face_tracker = face_tracker
+        self.identity_voter = identity_voter
+        self.last_faces = []
+
+    def process(self, faces, face_rois, now):
+        """返回 [(name, confidence, decided), ...]"""
+        track_ids = self.face_tracker.update(faces, now)
+        self.last_faces = faces
+        if len(faces) == 0:
+            return []
+        return self.identity_voter.recognize(self.face_recognizer, track_ids, face_rois, now)
+
+    def keep_alive(self, now):
+        """画面静止时保持人脸轨迹不过期"""
+        self.face_tracker.update(self.last_faces, now)
+
+    def reset(self):
+        self.face_tracker.reset()
+        self.identity_voter.clear()
+        self.last_faces = []
+
+
+class IdentityResolver:
+    """以最大（离售卖机最近）的人脸为当前用户，身份变化时才查询数据库和切换串口当前用户"""
+
+    def __init__(self, db_manager, serial_comm=None, face_recognizer=None):
+        self.db_manager = db_manager
+        self.serial_comm = serial_comm
+        self.face_recognizer = face_recognizer  # 用于在模型变化后检查当前用户是否已被删除
+        self.active_identity = None  # 当前用户姓名或"Unknown"；没有人脸时为None
+        self.generation = None  # 最近一次结果的模型版本
+        self.user_info = None
+        self.health_record = None
+
+    def resolve(self, result):
+        """补全result中的当前用户信息"""
+        if result.generation != self.generation:
+            # 录入或删除用户后，只有当前用户本身被删除时才放弃缓存的用户信息
+            self.generation = result.generation
+            if (self.face_recognizer is not None and self.active_identity not in (None, "Unknown")
+                    and self.active_identity not in self.face_recognizer.name_to_id):
+                self._switch(None, result)
+
+        if result.largest_index is None:
+            result.status = 'no_face'
+            if self.active_identity is not None:
+                self._switch(None, result)
+            return result
+
+        name, _, decided = result.results[result.largest_index]
+        if not decided:
+            # 投票尚未完成，保持当前用户不变
+            result.status = 'pending'
+        elif name and name != "Unknown":
+            result.status = 'known'
+            if name != self.active_identity:
+                self._switch(name, result)
+        else:
+            result.status = 'unknown'
+            if self.active_identity != "Unknown":
+                self._switch("Unknown", result)
+
+        result.user_info = self.user_info
+        result.health_record = self.health_record
+        return result
+
+    def _switch(self, identity, result):
+        self.active_identity = identity
+        self.user_info = None
+        self.health_record = None
+        result.identity_changed = True
+
+        if identity is None or identity == "Unknown":
+            if self.serial_comm:
+                self.serial_comm.clear_current_user()
+            return
+
+        self.user_info = self.db_manager.get_user_by_name(identity)
+        if not self.user_info:
+            if self.serial_comm:
+                self.serial_comm.clear_current_user()
+            return
+
+        # 设置当前用户到串口通信模块
+        if self.serial_comm:
+            self.serial_comm.set_current_user(self.user_info[0], self.user_info[1])
+
+        # 获取健康记录 - 切换用户时获取最新数据，之后由串口回调刷新
+        try:
+            health_records = self.db_manager.get_health_records(self.user_info[0])
+            logger.debug("获取到用户 %s 的 %s 条健康记录", self.user_info[1], len(health_records))
+            if health_records:
+                self.health_record = health_records[-1]
+        except Exception as e:
+            logger.error("❌ 获取健康记录失败: %s", e)
+            result.error = str(e)
+
+    def reset(self):
+        self.active_identity = None
+        self.generation = None
+        self.user_info = None
+        self.health_record = None
+
+
+class RecognitionPipeline:
+    """把检测、识别、身份确认放到各自的工作线程中"""
+
+    def __init__(self, frame_buffer, detection, recognition, resolver, interval=0.5, on_result=None):
+        """
+        Args:
+            frame_buffer: 摄像头写入的FrameBuffer
+            detection: DetectionStage
+            recognition: RecognitionStage
+            resolver: IdentityResolver
+            interval: 两次检测之间的最短间隔（秒）
+            on_result: 每次得到RecognitionResult时在工作线程中调用的回调
+        """
+        self.frame_buffer = frame_buffer
+        self.detection = detection
+        self.recognition = recognition
+        self.resolver = resolver
+        self.interval = interval
+        self.on_result = on_result
+
+        self._recognize_queue = queue.Queue(maxsize=1)
+        self._resolve_queue = queue.Queue(maxsize=1)
+        self._stop = threading.Event()
+        self._threads = []
+        self._settled = True  # 上一次识别结果是否已全部确定身份
+        self.dropped = 0  # 下游处理不过来时丢弃的任务数
+        self.stage_ms = {'detect': 0.0, 'recognize': 0.0, 'resolve': 0.0}  # 各阶段最近一次耗时
+
+    @property
+    def is_running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self):
+        """启动工作线程"""
+        if self.is_running:
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._run_stage, args=(name, target), name=f"Recognition-{name}", daemon=True)
+            for name, target in (('detect', self._detect_loop), ('recognize', self._recognize_loop),
+                                 ('resolve', self._resolve_loop))
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info("识别流水线已启动")
+
+    def stop(self, reset=True):
+        """停止工作线程；reset为True时清除跟踪、投票和当前用户"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+        for q in (self._recognize_queue, self._resolve_queue):
+            while not q.empty():
+                q.get_nowait()
+        if reset:
+            self.detection.reset()
+            self.recognition.reset()
+            self.resolver.reset()
+            self._settled = True
+        logger.info("识别流水线已停止")
+
+    def _run_stage(self, name, target):
+        while not self._stop.is_set():
+            try:
+                target()
+            except Exception as e:
+                logger.error("识别流水线 %s 阶段出错: %s", name, e)
+                time.sleep(0.1)
+
+    def _detect_loop(self):
+        last_seq = 0
+        next_time = 0.0
+        while not self._stop.is_set():
+            # 控制识别频率
+            delay = next_time - time.time()
+            if delay > 0 and self._stop.wait(delay):
+                return
+            latest = self.frame_buffer.latest(after=last_seq, timeout=0.1, consumer='pipeline')
+            if latest is None:
+                continue
+            last_seq, timestamp, frame = latest
+            now = time.time()
+            next_time = now + self.interval
+
+            detected = self.detection.process(frame, now, self._settled)
+            self.stage_ms['detect'] = (time.time() - now) * 1000
+            self.dropped += put_latest(self._recognize_queue, (last_seq, timestamp, now, detected))
+
+    def _recognize_loop(self):
+        while not self._stop.is_set():
+            try:
+                seq, timestamp, now, detected = self._recognize_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if detected is None:
+                # 画面静止，沿用上次结果
+                self.recognition.keep_alive(now)
+                continue
+
+            start = time.time()
+            faces, face_rois = detected
+            results = self.recognition.process(faces, face_rois, now)
+            self._settled = all(decided for _, _, decided in results)
+            self.stage_ms['recognize'] = (time.time() - start) * 1000
+
+            generation = self.recognition.face_recognizer.model_generation
+            result = RecognitionResult(seq, timestamp, [tuple(int(v) for v in face) for face in faces], results, generation)
+            self.dropped += put_latest(self._resolve_queue, result)
+
+    def _resolve_loop(self):
+        while not self._stop.is_set():
+            try:
+                result = self._resolve_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            start = time.time()
+            self.resolver.resolve(result)
+            self.stage_ms['resolve'] = (time.time() - start) * 1000
+            logger.debug("识别结果: 帧 %s, %s 张人脸, 状态 %s, 最大人脸 %s (%s), 各阶段耗时 %s",
+                         result.seq, len(result.faces), result.status, result.name, result.confidence, self.stage_ms)
+            if self.on_result:
+                self.on_result(result)
+
+
+def create_face_recognizer(settings):
+    """按配置创建FaceRecognizer"""
+    return FaceRecognizer(
+        model_path=settings.get('face_recognition.model_path'),
+        tolerance=settings.get('face_recognition.tolerance', 100),
+        ann_params=settings.get('face_recognition.ann'),
+        shards=settings.get('face_recognition.shards', 0),
+        gallery_dtype=settings.get('face_recognition.gallery_dtype', 'float32'),
+        max_samples_per_user=settings.get('training.max_samples_per_user', 0),
+    )
+
+
+def create_pipeline(settings, frame_buffer, face_recognizer, db_manager, serial_comm=None, on_result=None):
+    """按配置文件的 face_detection / face_recognition 部分组装识别流水线
+
+    Args:
+        settings: 配置对象（utils.config.config），通过 get('a.b', default) 读取
+        其余参数同 RecognitionPipeline / IdentityResolver
+    """
+    face_detector = get_detector(settings.get('face_detection.model_path'))
+
+    # 检测参数（检测图为画面缩小一半后的灰度图，尺寸以检测图像素计）
+    min_face_size = settings.get('face_detection.min_face_size', 50)
+    detect_params = {
+        'scale_factor': settings.get('face_detection.scale_factor', 1.05),
+        'min_neighbors': settings.get('face_detection.min_neighbors', 6),
+        'min_size': (min_face_size, min_face_size),
+    }
+
+    # 全图检测：缩小图上快速粗检，只在候选区域内用Haar验证
+    full_detector = face_detector
+    if settings.get('face_detection.two_stage.enabled', True):
+        full_detector = TwoStageDetector(
+            face_detector,
+            get_detector(settings.get('face_detection.two_stage.coarse_model_path',
+                                      'data/models/haarcascade_frontalface_alt2.xml')),
+            coarse_scale=settings.get('face_detection.two_stage.coarse_scale', 0.5),
+            coarse_scale_factor=settings.get('face_detection.two_stage.coarse_scale_factor', 1.2),
+            coarse_min_neighbors=settings.get('face_detection.two_stage.coarse_min_neighbors', 1),
+        )
+
+    # 按最近的人脸尺寸收窄全图检测的尺寸范围（用户站立距离基本固定）
+    if settings.get('face_detection.adaptive_size.enabled', True):
+        full_detector = AdaptiveSizeDetector(
+            full_detector,
+            min_size=min_face_size,
+            margin=tuple(settings.get('face_detection.adaptive_size.margin', [0.8, 1.25])),
+            explore_interval=settings.get('face_detection.adaptive_size.explore_interval', 10),
+        )
+
+    # 两次全图检测之间只在上次人脸附近的ROI内检测
+    roi_tracker = None
+    if settings.get('face_detection.roi_tracking.enabled', True):
+        roi_tracker = RoiTracker(
+            face_detector,
+            redetect_interval=settings.get('face_detection.roi_tracking.redetect_interval', 10),
+            roi_margin=settings.get('face_detection.roi_tracking.roi_margin', 0.5),
+            full_detector=full_detector,
+        )
+
+    # 画面静止且识别结果已确定时跳过检测和识别
+    motion_gate = None
+    if settings.get('face_detection.motion_gate.enabled', True):
+        motion_gate = MotionGate(
+            threshold=settings.get('face_detection.motion_gate.threshold', 15),
+            min_area=settings.get('face_detection.motion_gate.min_area', 0.01),
+            max_static_time=settings.get('face_detection.motion_gate.max_static_time', 5.0),
+        )
+
+    # 人脸跟踪 + 多帧身份投票：同一轨迹确定身份后只定期复核，单帧误识别不会切换当前用户
+    identity_voter = IdentityVoter(
+        min_votes=settings.get('face_recognition.voting.min_votes', 3),
+        window=settings.get('face_recognition.voting.window', 5),
+        decision_score=settings.get('face_recognition.voting.decision_score', 1.2),
+        unknown_retry=settings.get('face_recognition.voting.unknown_retry', 2.0),
+        reverify_interval=settings.get('face_recognition.voting.reverify_interval', 3.0),
+        confident_distance=settings.get('face_recognition.voting.confident_distance'),
+    )
+
+    # 每0.5秒识别一次；灰度/缩放/均衡化每帧只做一次，检测和识别共用
+    return RecognitionPipeline(
+        frame_buffer,
+        DetectionStage(FramePreprocessor(detection_scale=0.5), full_detector, roi_tracker, motion_gate, detect_params),
+        RecognitionStage(face_recognizer, FaceTracker(), identity_voter),
+        IdentityResolver(db_manager, serial_comm, face_recognizer),
+        interval=settings.get('face_recognition.interval', 0.5),
+        on_result=on_result,
+    )
@@ -0,0 +1,87 @@
+"""
+共享的图像预处理
+
+每帧只做一次灰度转换、缩放和直方图均衡化，检测和识别都从同一组预分配的缓冲区读取，
+避免检测器和识别器各自重复转换整帧和每个人脸区域。
+"""
+
+import cv2
+import numpy as np
+
+FACE_SIZE = 150  # 识别使用的标准人脸尺寸
+
+
+def to_gray(image, out=None):
+    """转换为灰度图，已是灰度图时直接返回"""
+    if len(image.shape) == 3:
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=out)
+    return image
+
+
+def preprocess_face(face_image, out=None, size=FACE_SIZE):
+    """预处理人脸图像：灰度、直方图均衡化、缩放到标准尺寸
+
+    训练和识别都使用这个函数，保证两边的预处理完全一致。
+
+    Args:
+        face_image: 人脸图像（BGR或灰度）
+        out: 可选的 size x size uint8 输出缓冲区
+        size: 标准尺寸
+    """
+    gray = cv2.equalizeHist(to_gray(face_image))
+    return cv2.resize(gray, (size, size), dst=out)
+
+
+class FramePreprocessor:
+    """每帧一次的预处理：整帧灰度图 + 缩小并均衡化后的检测图
+
+    缓冲区在帧尺寸不变时重复使用。process() 之后：
+    - gray: 原始分辨率的灰度图，用于截取识别用的人脸区域
+    - detection_image: 缩小后并均衡化的灰度图，直接交给检测器
+    """
+
+    def __init__(self, detection_scale=0.5):
+        self.detection_scale = detection_scale
+        self.gray = None
+        self.detection_image = None
+        self._small = None
+
+    def _allocate(self, shape):
+        height, width = shape[:2]
+        small_size = (max(1, int(width * self.detection_scale)), max(1, int(height * self.detection_scale)))
+        self.gray = np.empty((height, width), dtype=np.uint8)
+        self._small = np.empty((small_size[1], small_size[0]), dtype=np.uint8)
+        self.detection_image = np.empty_like(self._small)
+
+    def process(self, frame):
+        """预处理一帧图像，返回自身以便链式调用"""
+        if self.gray is None or self.gray.shape != frame.shape[:2]:
+            self._allocate(frame.shape)
+
+        if len(frame.shape) == 3:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self.gray)
+        else:
+            self.gray[...] = frame
+
+        if self.detection_scale == 1.0:
+            cv2.equalizeHist(self.gray, dst=self.detection_image)
+        else:
+            cv2.resize(self.gray, (self._small.shape[1], self._small.shape[0]), dst=self._small)
+            cv2.equalizeHist(self._small, dst=self.detection_image)
+        return self
+
+    def to_frame_coordinates(self, faces):
+        """把检测图上的人脸框换算回原始分辨率"""
+        scale = 1.0 / self.detection_scale
+        return [(int(x * scale), int(y * scale), int(w * scale), int(h * scale)) for (x, y, w, h) in faces]
+
+    def crop(self, face, margin=0.1):
+        """从灰度图截取人脸区域（视图，不复制），四周增加 margin 比例的边界"""
+        x, y, w, h = face
+        pad = int(min(w, h) * margin)
+        height, width = self.gray.shape
+        return self.gray[max(0, y - pad):min(height, y + h + pad), max(0, x - pad):min(width, x + w + pad)]
+
+    def crops(self, faces, margin=0.1):
+        """截取多张人脸区域"""
+        return [self.crop(face, margin) for face in faces]
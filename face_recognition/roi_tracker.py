@@ -0,0 +1,147 @@
+"""
+检测框跟踪：两次全图检测之间只在人脸附近的ROI内检测
+
+全图检测后记住每张人脸的位置和灰度模板。之后每次只在扩大后的ROI内运行级联分类器：
+ROI先缩小到人脸约 roi_face_size 像素，人脸尺寸也限制在上次尺寸附近，搜索量只有全图的一小部分。
+级联在ROI内没有检测到时，用模板匹配（cv2.matchTemplate）短暂跟随，模板也匹配不上时丢弃该人脸。
+每隔 redetect_interval 次或所有人脸都丢失时重新做一次全图检测，以便发现新出现的人脸。
+"""
+
+import cv2
+import numpy as np
+
+from face_recognition.tracking import box_iou
+
+
+def expand_box(box, margin, shape):
+    """人脸框四周各扩大 margin（相对宽高）后裁剪到图像内，返回 (x0, y0, x1, y1)"""
+    x, y, w, h = (int(v) for v in box)
+    dx, dy = int(w * margin), int(h * margin)
+    height, width = shape[:2]
+    return max(0, x - dx), max(0, y - dy), min(width, x + w + dx), min(height, y + h + dy)
+
+
+def detect_around(face_detector, image, box, margin=0.5, size_range=(0.7, 1.4), face_size=40, **kwargs):
+    """只在某个人脸框附近检测人脸
+
+    ROI先缩小到人脸约 face_size 像素，人脸尺寸限制在 box 尺寸的 size_range 倍之间。
+
+    Args:
+        face_detector: FaceDetector
+        image: 均衡化后的灰度图
+        box: 参考人脸框 (x, y, w, h)
+        **kwargs: 传给 FaceDetector.detect_faces 的其他参数
+
+    Returns:
+        faces: 原图坐标的人脸框 (n, 4)，可能为空
+    """
+    x0, y0, x1, y1 = expand_box(box, margin, image.shape)
+    roi = image[y0:y1, x0:x1]
+    w, h = int(box[2]), int(box[3])
+
+    # 大人脸先缩小再检测，结果再映射回原图
+    scale = min(1.0, face_size / min(w, h))
+    small = roi if scale == 1.0 else cv2.resize(roi, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    min_size = int(min(w, h) * scale * size_range[0])
+    max_size = int(max(w, h) * scale * size_range[1])
+    faces = face_detector.detect_faces(small, **dict(kwargs, min_size=(min_size, min_size),
+                                                     max_size=(max_size, max_size), equalized=True))
+    if len(faces) == 0:
+        return np.empty((0, 4), dtype=np.int32)
+    return np.round(np.asarray(faces) / scale).astype(np.int32) + [x0, y0, 0, 0]
+
+
+class RoiTracker:
+    """在FaceDetector外层按ROI跟踪人脸，输入输出与 FaceDetector.detect_faces 相同"""
+
+    def __init__(self, face_detector, redetect_interval=10, roi_margin=0.5, size_range=(0.7, 1.4),
+                 roi_face_size=40, template_threshold=0.6, max_template_frames=3, full_detector=None):
+        """
+        Args:
+            face_detector: FaceDetector
+            redetect_interval: 每隔多少次检测做一次全图检测
+            roi_margin: ROI在人脸框四周各扩大的比例（相对人脸宽高）
+            size_range: ROI内检测的人脸尺寸相对上次尺寸的范围
+            roi_face_size: ROI缩放后的人脸尺寸（像素），级联分类器的窗口为24像素
+            template_threshold: 模板匹配的最低归一化相关系数
+            max_template_frames: 级联连续漏检时最多用模板跟随的次数
+            full_detector: 全图检测使用的检测器（如TwoStageDetector），默认与face_detector相同
+        """
+        self.face_detector = face_detector
+        self.full_detector = full_detector or face_detector
+        self.redetect_interval = redetect_interval
+        self.roi_margin = roi_margin
+        self.size_range = size_range
+        self.roi_face_size = roi_face_size
+        self.template_threshold = template_threshold
+        self.max_template_frames = max_template_frames
+        self.tracks = []  # [{'box': (x, y, w, h), 'template': 灰度图, 'misses': 连续模板跟随次数}]
+        self._since_full = 0
+        self.full_detections = 0
+        self.roi_detections = 0
+
+    def _full_detect(self, image, **kwargs):
+        faces = self.full_detector.detect_faces(image, **kwargs)
+        self.full_detections += 1
+        self._since_full = 0
+        self.tracks = [self._track(image, box) for box in faces]
+        return faces
+
+    @staticmethod
+    def _track(image, box, misses=0):
+        x, y, w, h = (int(v) for v in box)
+        return {'box': (x, y, w, h), 'template': image[y:y+h, x:x+w].copy(), 'misses': misses}
+
+    def _follow(self, image, track, **kwargs):
+        """在ROI内更新一个人脸框，丢失时返回None"""
+        faces = detect_around(self.face_detector, image, track['box'], self.roi_margin, self.size_range,
+                              self.roi_face_size, **kwargs)
+        if len(faces) > 0:
+            best = int(np.argmax(box_iou(faces, [track['box']])[:, 0]))
+            return self._track(image, faces[best])
+
+        x, y, w, h = track['box']
+        x0, y0, x1, y1 = expand_box(track['box'], self.roi_margin, image.shape)
+        roi = image[y0:y1, x0:x1]
+
+        # 级联漏检（侧脸、模糊）时用模板匹配跟随几帧
+        if track['misses'] >= self.max_template_frames or roi.shape[0] < h or roi.shape[1] < w:
+            return None
+        scores = cv2.matchTemplate(roi, track['template'], cv2.TM_CCOEFF_NORMED)
+        _, best_score, _, (mx, my) = cv2.minMaxLoc(scores)
+        if best_score < self.template_threshold:
+            return None
+        return {'box': (x0 + mx, y0 + my, w, h), 'template': track['template'], 'misses': track['misses'] + 1}
+
+    def detect(self, image, **kwargs):
+        """检测人脸
+
+        Args:
+            image: 均衡化后的灰度图（如FramePreprocessor.detection_image）
+            **kwargs: 传给 FaceDetector.detect_faces 的参数（scale_factor、min_neighbors、min_size）
+
+        Returns:
+            faces: 检测到的人脸矩形框 (n, 4)
+        """
+        kwargs.setdefault('equalized', True)
+        self._since_full += 1
+        if not self.tracks or self._since_full >= self.redetect_interval:
+            return self._full_detect(image, **kwargs)
+
+        tracks = []
+        for track in self.tracks:
+            followed = self._follow(image, track, **kwargs)
+            # 两个ROI跟到同一张人脸时只保留一个
+            if followed is not None and all(box_iou([followed['box']], [t['box']])[0, 0] < 0.5 for t in tracks):
+                tracks.append(followed)
+        self.roi_detections += 1
+
+        if not tracks:
+            return self._full_detect(image, **kwargs)
+        self.tracks = tracks
+        return np.array([track['box'] for track in tracks], dtype=np.int32)
+
+    def reset(self):
+        """丢弃所有跟踪，下次检测做全图检测"""
+        self.tracks = []
+        self._since_full = 0
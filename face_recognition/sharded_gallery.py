@@ -0,0 +1,178 @@
+"""
+多进程分片的LBPH特征库
+
+特征库按样本（列）均分为若干分片，每个分片的 (dim, n) 直方图矩阵放在一块共享内存中，
+由一个常驻的工作进程挂载。查询时主进程把查询直方图发给所有工作进程并行计算，
+每个分片返回按标签聚合后的top-k，主进程对同一标签取最小距离后再合并出全局top-k。
+
+某个标签的全局最小距离一定来自某个分片，且在该分片中排名不会低于全局排名，
+所以各分片的top-k合并后与单进程 LBPHGallery.match 的结果一致。
+"""
+
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from face_recognition.lbph_gallery import LBPHGallery
+
+
+def _shard_worker(conn, params, dtype):
+    """分片工作进程：挂载共享内存中的分片矩阵，响应匹配请求"""
+    gallery = LBPHGallery(dtype=dtype, **params)
+    shm = None
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+
+        command = message[0]
+        try:
+            if command == 'load':
+                _, name, labels, row_sums, scales = message
+                # 先释放旧分片的视图再关闭旧的共享内存
+                gallery.set_params(**params)
+                if shm is not None:
+                    shm.close()
+                    shm = None
+                if name is not None:
+                    shm = shared_memory.SharedMemory(name=name)
+                    matrix = np.ndarray((gallery.dim, len(labels)), dtype=gallery.dtype, buffer=shm.buf)
+                    gallery.set_matrix(matrix, labels, row_sums, scales)
+                conn.send(('ok', gallery.size))
+            elif command == 'match':
+                _, queries, k = message
+                conn.send(('ok', gallery.match(queries, k=k)))
+            elif command == 'stop':
+                break
+        except Exception as e:
+            conn.send(('error', str(e)))
+
+    gallery.set_params(**params)
+    if shm is not None:
+        shm.close()
+    conn.close()
+
+
+class ShardedGallery:
+    """把LBPHGallery分片到多个工作进程中并行匹配
+
+    只负责匹配；特征库的增删仍在主进程的LBPHGallery上进行，
+    sync() 在特征库变化后把新的分片写入共享内存。
+    """
+
+    def __init__(self, n_shards, params, dtype='float32'):
+        self.n_shards = n_shards
+        self.params = dict(params)
+        self.dtype = np.dtype(dtype)
+        self.version = None  # 当前分片对应的模型版本
+        self._lock = threading.Lock()
+        self._segments = []
+
+        # 使用spawn启动，避免在已有线程（摄像头、串口）的进程中fork
+        context = mp.get_context('spawn')
+        self._connections = []
+        self._processes = []
+        for i in range(n_shards):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(target=_shard_worker, args=(child_conn, self.params, str(self.dtype)),
+                                      name=f"GalleryShard-{i}", daemon=True)
+            process.start()
+            child_conn.close()
+            self._connections.append(parent_conn)
+            self._processes.append(process)
+
+    def _request(self, messages):
+        """向每个分片发送一条消息，等待全部返回"""
+        for conn, message in zip(self._connections, messages):
+            conn.send(message)
+        replies = []
+        for conn in self._connections:
+            status, payload = conn.recv()
+            if status != 'ok':
+                raise RuntimeError(f"分片进程出错: {payload}")
+            replies.append(payload)
+        return replies
+
+    def sync(self, gallery, version=None):
+        """把特征库重新分片写入共享内存，并通知工作进程挂载"""
+        if gallery.params != self.params or gallery.dtype != self.dtype:
+            raise ValueError(f"特征库参数 {gallery.params} ({gallery.dtype}) 与分片参数 {self.params} ({self.dtype}) 不一致")
+
+        state = gallery.state
+        with self._lock:
+            old_segments = self._segments
+            self._segments = []
+            messages = []
+            bounds = np.linspace(0, state.size, self.n_shards + 1).astype(np.int64)
+            for start, end in zip(bounds[:-1], bounds[1:]):
+                count = int(end - start)
+                if count == 0:
+                    messages.append(('load', None, np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32), None))
+                    continue
+                shm = shared_memory.SharedMemory(create=True, size=gallery.dim * count * self.dtype.itemsize)
+                matrix = np.ndarray((gallery.dim, count), dtype=self.dtype, buffer=shm.buf)
+                matrix[...] = state.matrix[:, start:end]
+                del matrix
+                self._segments.append(shm)
+                messages.append((
+                    'load', shm.name,
+                    np.array(state.labels[start:end], dtype=np.int32),
+                    np.array(state.row_sums[start:end], dtype=np.float32),
+                    np.array(state.scales[start:end], dtype=np.float32) if gallery.quantized else None,
+                ))
+
+            self._request(messages)
+            self.version = version
+
+            # 工作进程已挂载新分片，旧的共享内存可以释放
+            for shm in old_segments:
+                shm.close()
+                shm.unlink()
+
+    def match(self, query_histograms, k=1, version=None):
+        """并行匹配，返回与 LBPHGallery.match 相同格式的结果
+
+        Args:
+            version: 调用方使用的模型版本，与当前分片版本不一致时返回None
+        """
+        queries = np.ascontiguousarray(query_histograms, dtype=np.float32)
+        with self._lock:
+            if version is not None and version != self.version:
+                return None
+            replies = self._request([('match', queries, k)] * self.n_shards)
+
+        results = []
+        for per_shard in zip(*replies):
+            best = {}
+            for matches in per_shard:
+                for label_id, distance in matches:
+                    if label_id not in best or distance < best[label_id]:
+                        best[label_id] = distance
+            results.append(sorted(best.items(), key=lambda item: item[1])[:k])
+        return results
+
+    def close(self):
+        """停止工作进程并释放共享内存"""
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.send(('stop',))
+                except (OSError, EOFError):
+                    pass
+            for process in self._processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+            for conn in self._connections:
+                conn.close()
+            for shm in self._segments:
+                shm.close()
+                shm.unlink()
+            self._connections = []
+            self._processes = []
+            self._segments = []
+            self.version = None
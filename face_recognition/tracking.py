@@ -0,0 +1,81 @@
+"""
+人脸跟踪：按检测框的IoU把相邻帧中的人脸关联成轨迹，为每张人脸分配稳定的轨迹ID
+"""
+
+import time
+
+import numpy as np
+
+
+def box_iou(boxes_a, boxes_b):
+    """计算两组 (x, y, w, h) 检测框两两之间的IoU，返回 (len(a), len(b)) 矩阵"""
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+
+    ax2, ay2 = a[:, 0] + a[:, 2], a[:, 1] + a[:, 3]
+    bx2, by2 = b[:, 0] + b[:, 2], b[:, 1] + b[:, 3]
+
+    inter_w = np.minimum(ax2[:, None], bx2[None]) - np.maximum(a[:, 0, None], b[None, :, 0])
+    inter_h = np.minimum(ay2[:, None], by2[None]) - np.maximum(a[:, 1, None], b[None, :, 1])
+    inter = np.clip(inter_w, 0, None) * np.clip(inter_h, 0, None)
+
+    union = (a[:, 2] * a[:, 3])[:, None] + (b[:, 2] * b[:, 3])[None] - inter
+    return inter / np.maximum(union, 1e-6)
+
+
+class FaceTracker:
+    """基于IoU贪心匹配的简单人脸跟踪器"""
+
+    def __init__(self, iou_threshold=0.3, max_missed_time=1.0):
+        """
+        Args:
+            iou_threshold: 检测框与轨迹的IoU不低于该值才视为同一张人脸
+            max_missed_time: 轨迹连续多少秒没有匹配到人脸后结束
+        """
+        self.iou_threshold = iou_threshold
+        self.max_missed_time = max_missed_time
+        self.tracks = {}  # 轨迹ID -> {'box': (x, y, w, h), 'last_seen': 时间}
+        self._next_id = 0
+
+    def update(self, faces, now=None):
+        """用当前帧的检测结果更新轨迹
+
+        Args:
+            faces: 检测框列表 [(x, y, w, h), ...]
+            now: 当前时间，默认time.time()
+
+        Returns:
+            track_ids: 与faces顺序一致的轨迹ID列表
+        """
+        now = time.time() if now is None else now
+
+        # 结束长时间未出现的轨迹
+        for track_id in [tid for tid, track in self.tracks.items() if now - track['last_seen'] > self.max_missed_time]:
+            del self.tracks[track_id]
+
+        track_ids = [None] * len(faces)
+        if len(faces) > 0 and self.tracks:
+            existing = list(self.tracks)
+            iou = box_iou(faces, [self.tracks[tid]['box'] for tid in existing])
+
+            # 按IoU从大到小贪心匹配，每条轨迹、每张人脸最多匹配一次
+            for flat in np.argsort(iou, axis=None)[::-1]:
+                face_index, track_index = np.unravel_index(flat, iou.shape)
+                if iou[face_index, track_index] < self.iou_threshold:
+                    break
+                if track_ids[face_index] is not None or existing[track_index] is None:
+                    continue
+                track_ids[face_index] = existing[track_index]
+                existing[track_index] = None
+
+        for i, box in enumerate(faces):
+            if track_ids[i] is None:
+                track_ids[i] = self._next_id
+                self._next_id += 1
+            self.tracks[track_ids[i]] = {'box': tuple(int(v) for v in box), 'last_seen': now}
+
+        return track_ids
+
+    def reset(self):
+        """清除所有轨迹"""
+        self.tracks.clear()
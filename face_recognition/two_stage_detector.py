@@ -0,0 +1,93 @@
+"""
+两级人脸检测：缩小图上的快速粗检 + 候选区域内的Haar验证
+
+scale_factor=1.05 的Haar级联在整幅图上逐级搜索，代价随图像面积和尺度数增长。
+粗检在缩小 coarse_scale 倍的图上用较大的 scale_factor 和较少的邻居数运行，只负责提出候选框（宁多勿漏）；
+验证级在每个候选框附近的小ROI内用原来的参数运行级联，只保留验证通过的人脸，误检由这一级过滤。
+仓库自带的两个Haar模型都可以做粗检或验证（alt2在粗检时更快），也可以换成LBP级联。
+"""
+
+import cv2
+import numpy as np
+
+from face_recognition.preprocessing import to_gray
+from face_recognition.roi_tracker import detect_around
+from face_recognition.tracking import box_iou
+
+
+class TwoStageDetector:
+    """接口与 FaceDetector.detect_faces 相同的两级检测器"""
+
+    def __init__(self, verify_detector, coarse_detector=None, coarse_scale=0.5, coarse_scale_factor=1.2,
+                 coarse_min_neighbors=1, verify_margin=0.3, size_range=(0.6, 1.6), verify_face_size=40):
+        """
+        Args:
+            verify_detector: 验证级FaceDetector
+            coarse_detector: 粗检FaceDetector，默认与验证级相同
+            coarse_scale: 粗检图像相对输入图像的缩放比例
+            coarse_scale_factor: 粗检的scale_factor
+            coarse_min_neighbors: 粗检的min_neighbors，越小召回越高、候选越多
+            verify_margin: 验证ROI在候选框四周各扩大的比例
+            size_range: 验证时人脸尺寸相对候选框尺寸的范围
+            verify_face_size: 验证ROI缩放后的人脸尺寸（像素）
+        """
+        self.verify_detector = verify_detector
+        self.coarse_detector = coarse_detector or verify_detector
+        self.coarse_scale = coarse_scale
+        self.coarse_scale_factor = coarse_scale_factor
+        self.coarse_min_neighbors = coarse_min_neighbors
+        self.verify_margin = verify_margin
+        self.size_range = size_range
+        self.verify_face_size = verify_face_size
+        self.candidates = 0  # 粗检提出的候选框总数
+        self.verified = 0  # 验证通过的人脸总数
+
+    def propose(self, gray, min_size=(50, 50), max_size=None):
+        """粗检：返回输入图像坐标的候选框 (n, 4)"""
+        scale = self.coarse_scale
+        small = gray if scale == 1.0 else cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        # 级联窗口为24像素，缩小后比它更小的人脸粗检无法发现
+        coarse_min = max(24, int(min(min_size) * scale))
+        coarse_max = (int(max_size[0] * scale), int(max_size[1] * scale)) if max_size else None
+        candidates = self.coarse_detector.detect_faces(
+            small, scale_factor=self.coarse_scale_factor, min_neighbors=self.coarse_min_neighbors,
+            min_size=(coarse_min, coarse_min), max_size=coarse_max, equalized=True,
+        )
+        if len(candidates) == 0:
+            return np.empty((0, 4), dtype=np.int32)
+        return np.round(np.asarray(candidates) / scale).astype(np.int32)
+
+    def detect_faces(self, image, scale_factor=1.05, min_neighbors=6, min_size=(50, 50), equalized=False, max_size=None):
+        """
+        检测图像中的人脸
+
+        Args:
+            image: 输入图像
+            scale_factor: 验证级的图像缩放因子
+            min_neighbors: 验证级的最小邻居数
+            min_size: 最小人脸尺寸
+            equalized: image已是均衡化后的灰度图时跳过预处理
+            max_size: 最大人脸尺寸，None表示不限制
+
+        Returns:
+            faces: 检测到的人脸矩形框 (n, 4)
+        """
+        gray = image if equalized else cv2.equalizeHist(to_gray(image))
+        candidates = self.propose(gray, min_size, max_size)
+        self.candidates += len(candidates)
+
+        faces = []
+        for box in candidates:
+            found = detect_around(self.verify_detector, gray, box, self.verify_margin, self.size_range,
+                                  self.verify_face_size, scale_factor=scale_factor, min_neighbors=min_neighbors)
+            for face in found:
+                if face[2] < min_size[0] or face[3] < min_size[1]:
+                    continue
+                # 相邻候选框可能验证出同一张人脸
+                if all(box_iou([face], [kept])[0, 0] < 0.5 for kept in faces):
+                    faces.append(face)
+
+        self.verified += len(faces)
+        if not faces:
+            return np.empty((0, 4), dtype=np.int32)
+        return np.array(faces, dtype=np.int32)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+无界面识别服务
+
+没有屏幕的售卖机上不需要PyQt5界面：采集线程把帧写入FrameBuffer，识别流水线完成检测、识别、
+数据库查询和串口切换用户，识别结果只写日志。不导入Qt、不绘制预览，启动更快，内存和CPU占用更低。
+
+用法：
+    python headless_service.py                          # 使用配置中的摄像头
+    python main.py --headless                           # 同上
+    python headless_service.py --source data/replay --fast --no-serial   # 在录像上回放测试整条流程
+"""
+
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from database.database_manager import DatabaseManager
+from face_recognition.pipeline import create_face_recognizer, create_pipeline
+from utils.config import config
+from utils.frame_buffer import FrameBuffer
+from utils.frame_source import create_frame_source
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class CaptureThread(threading.Thread):
+    """采集线程：把帧来源的帧写入FrameBuffer，来源结束（回放完毕）时退出"""
+
+    def __init__(self, frame_source, frame_buffer):
+        super().__init__(name="Capture", daemon=True)
+        self.frame_source = frame_source
+        self.frame_buffer = frame_buffer
+        self.running = False
+
+    def run(self):
+        self.running = True
+        while self.running and self.frame_source.isOpened():
+            ret, frame = self.frame_source.read()
+            if ret:
+                self.frame_buffer.put(frame)
+            else:
+                time.sleep(0.03)
+        self.frame_source.release()
+        self.running = False
+
+    def stop(self):
+        self.running = False
+        self.join(timeout=2)
+
+
+class HeadlessService:
+    """摄像头 → 检测 → 识别 → 串口，不依赖Qt"""
+
+    def __init__(self, source=None, realtime=None, serial_port=None, use_serial=True, stats_interval=60):
+        """
+        Args:
+            source: 摄像头设备ID、录像文件或图片目录，None时使用配置
+            realtime: 回放时是否按原始帧率播放，None时使用配置
+            serial_port: 串口设备，None时使用SerialCommunication的默认端口
+            use_serial: 是否连接串口（回放测试时可以关闭）
+            stats_interval: 输出运行统计的间隔（秒），0表示不输出
+        """
+        self.stats_interval = stats_interval
+        self.db_manager = DatabaseManager()
+        self.face_recognizer = create_face_recognizer(config)
+        # 其他进程（如train_faces.py）重新训练后，在后台线程加载新模型并整体替换
+        self.face_recognizer.start_watching()
+
+        self.serial_comm = None
+        if use_serial:
+            # pyserial只在需要串口时导入
+            from serial_communication import SerialCommunication
+            self.serial_comm = SerialCommunication(serial_port) if serial_port else SerialCommunication()
+            self.serial_comm.on_data_updated = self.on_serial_data_updated
+
+        self.frame_source = create_frame_source(source, realtime=realtime)
+        self.frame_buffer = FrameBuffer(capacity=1)
+        self.pipeline = create_pipeline(config, self.frame_buffer, self.face_recognizer, self.db_manager,
+                                        self.serial_comm, on_result=self.on_result)
+        self.capture_thread = None
+        self._stop = threading.Event()
+        self.results = 0  # 流水线输出的结果数
+        self.identity_changes = 0  # 当前用户切换次数
+
+    def on_result(self, result):
+        """识别结果回调（在流水线线程中调用），只记录当前用户的变化"""
+        self.results += 1
+        if not result.identity_changed:
+            return
+        self.identity_changes += 1
+        if result.status == 'known' and result.user_info:
+            record = result.health_record
+            logger.info("当前用户: %s (ID: %s, 置信度 %.2f)%s", result.user_info[1], result.user_info[0], result.confidence,
+                        f", 今日糖分 {record[3]:.2f}g / {record[4]:.2f}g" if record else "")
+        elif result.status == 'known':
+            logger.warning("识别到 %s，但数据库中没有该用户", result.name)
+        elif result.status == 'unknown':
+            logger.info("当前用户: 未知人脸")
+        else:
+            logger.info("当前用户: 无（未检测到人脸）")
+
+    def on_serial_data_updated(self, user_id, user_name, actual_sugar):
+        logger.info("用户 %s (ID: %s) 饮品已出，实际增加糖量 %.1fg", user_name, user_id, actual_sugar)
+
+    def log_stats(self):
+        logger.info("运行统计: 帧 %s, 识别结果 %s, 用户切换 %s, 流水线丢弃 %s, 各阶段耗时(ms) %s, 用户缓存 %s",
+                    self.frame_buffer.stats(), self.results, self.identity_changes, self.pipeline.dropped,
+                    {name: round(ms, 1) for name, ms in self.pipeline.stage_ms.items()}, self.db_manager.cache.stats())
+
+    def start(self):
+        """打开帧来源、串口并启动采集和识别线程，帧来源打开失败时返回False"""
+        if not self.frame_source.open():
+            return False
+        if self.serial_comm and not self.serial_comm.start():
+            logger.warning("串口未连接，只进行识别")
+        self.capture_thread = CaptureThread(self.frame_source, self.frame_buffer)
+        self.capture_thread.start()
+        self.pipeline.start()
+        logger.info("无界面识别服务已启动")
+        return True
+
+    def run(self, duration=None):
+        """运行到收到停止信号、回放结束或经过duration秒"""
+        if not self.start():
+            return False
+        started = time.time()
+        last_stats = started
+        try:
+            while not self._stop.wait(0.5):
+                now = time.time()
+                if duration and now - started >= duration:
+                    break
+                if not self.capture_thread.is_alive():
+                    # 回放结束，等流水线处理完最后一帧
+                    time.sleep(self.pipeline.interval * 2)
+                    break
+                if self.stats_interval and now - last_stats >= self.stats_interval:
+                    self.log_stats()
+                    last_stats = now
+        finally:
+            self.stop()
+        return True
+
+    def request_stop(self, *args):
+        self._stop.set()
+
+    def stop(self):
+        if self.capture_thread:
+            self.capture_thread.stop()
+        self.pipeline.stop()
+        if self.serial_comm:
+            self.serial_comm.clear_current_user()
+            self.serial_comm.stop()
+        self.face_recognizer.close()
+        self.log_stats()
+        logger.info("无界面识别服务已停止")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="无界面人脸识别服务")
+    parser.add_argument("--source", help="摄像头设备ID、录像文件或图片目录（默认使用配置 camera.source / device_id）")
+    parser.add_argument("--fast", action="store_true", help="回放时尽快读取，不按原始帧率")
+    parser.add_argument("--port", help="串口设备（默认 /dev/ttyCH341USB0）")
+    parser.add_argument("--no-serial", action="store_true", help="不连接串口")
+    parser.add_argument("--duration", type=float, help="运行多少秒后退出")
+    parser.add_argument("--stats-interval", type=float, default=60, help="输出运行统计的间隔（秒），0表示不输出")
+    args = parser.parse_args(argv)
+
+    service = HeadlessService(source=args.source, realtime=False if args.fast else None, serial_port=args.port,
+                              use_serial=not args.no_serial, stats_interval=args.stats_interval)
+    signal.signal(signal.SIGINT, service.request_stop)
+    signal.signal(signal.SIGTERM, service.request_stop)
+    return 0 if service.run(args.duration) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
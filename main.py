@@ -11,10 +11,15 @@ import os
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, current_dir)
 
-from PyQt5.QtWidgets import QApplication
-from ui.main_window import MainWindow
-
 def main():
+    # 没有屏幕的售卖机：python main.py --headless [headless_service.py 的参数]，不导入PyQt5
+    if "--headless" in sys.argv[1:]:
+        from headless_service import main as headless_main
+        sys.exit(headless_main([arg for arg in sys.argv[1:] if arg != "--headless"]))
+    
+    from PyQt5.QtWidgets import QApplication
+    from ui.main_window import MainWindow
+    
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+人脸模型维护工具
+convert: 将旧的YAML模型和 _labels.pkl 标签映射转换为二进制模型，并导入按用户存储
+info:    查看二进制模型信息
+compact: 每个用户只保留k个代表样本（k-medoids），并在留出样本上报告压缩前后的准确率和匹配耗时
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from face_recognition import model_store
+from face_recognition.compaction import compact_histograms, compaction_report
+from face_recognition.lbph_gallery import LBPHGallery
+
+DEFAULT_MODEL_PATH = "data/models/face_recognizer.yml"
+
+
+def convert(args):
+    """转换YAML模型"""
+    if not os.path.exists(args.model):
+        print(f"❌ 模型文件不存在: {args.model}")
+        return False
+
+    start = time.time()
+    output_path = model_store.convert_yaml_model(args.model, args.output)
+    elapsed = time.time() - start
+
+    yml_size = os.path.getsize(args.model) / 1024
+    bin_size = os.path.getsize(output_path) / 1024
+    print(f"✅ 转换完成: {args.model} ({yml_size:.0f} KB) -> {output_path} ({bin_size:.0f} KB)，耗时 {elapsed:.2f}s")
+
+    if args.output is None:
+        # 加载模型默认只读，迁移到按用户存储只在这里显式进行
+        from face_recognition.face_recognizer import FaceRecognizer
+
+        recognizer = FaceRecognizer(args.model, migrate=True)
+        recognizer.close()
+        print(f"✅ 已导入按用户存储: {recognizer.store.root_dir} ({len(recognizer.store.users())} 个用户)")
+    return True
+
+
+def info(args):
+    """显示二进制模型信息"""
+    path = args.model
+    if path.endswith('.yml'):
+        path = model_store.binary_model_path(path)
+    if not os.path.exists(path):
+        print(f"❌ 模型文件不存在: {path}")
+        return False
+
+    start = time.time()
+    gallery, id_to_name, header = model_store.load_model(path)
+    elapsed = (time.time() - start) * 1000
+
+    print(f"模型文件: {path} ({os.path.getsize(path) / 1024:.0f} KB)")
+    print(f"打开耗时: {elapsed:.1f} ms")
+    print(f"LBPH参数: {header['params']}")
+    print(f"样本数量: {gallery.size}, 维度: {gallery.dim}")
+    print(f"标签映射: {id_to_name}")
+    print(f"元数据: {header['metadata']}")
+    return True
+
+
+def compact(args):
+    """压缩已有模型的按用户存储"""
+    from face_recognition.face_recognizer import FaceRecognizer
+
+    # 只读加载：--dry-run 时不能修改任何模型文件
+    recognizer = FaceRecognizer(args.model)
+    if not recognizer.store.exists():
+        print(f"❌ 按用户存储不存在，请先运行: python model_tools.py convert --model {args.model}")
+        return False
+    if recognizer.gallery.size == 0:
+        print(f"❌ 模型为空: {args.model}")
+        return False
+
+    store = recognizer.store
+    rng = np.random.default_rng(args.seed)
+    kept = {}
+    train_blocks, compact_blocks, query_blocks = [], [], []
+
+    start = time.time()
+    for label_id, entry in store.users().items():
+        name = entry.get("name")
+        histograms = np.asarray(store.load_user(label_id), dtype=np.float32)
+        kept[label_id] = (name, histograms, compact_histograms(histograms, args.k, seed=args.seed))
+
+        # 每个用户留出一部分样本作为查询，只用其余样本压缩，评估压缩对未见过样本的影响
+        order = rng.permutation(len(histograms))
+        n_holdout = 0
+        if len(histograms) > 1 and args.holdout > 0:
+            n_holdout = min(len(histograms) - 1, max(1, int(len(histograms) * args.holdout)))
+        train = histograms[np.sort(order[n_holdout:])]
+        train_blocks.append((label_id, train))
+        compact_blocks.append((label_id, compact_histograms(train, args.k, seed=args.seed)))
+        query_blocks.append((label_id, histograms[np.sort(order[:n_holdout])]))
+    elapsed = time.time() - start
+
+    print(f"聚类耗时: {elapsed:.2f}s")
+    for label_id, (name, histograms, selected) in kept.items():
+        print(f"  {name} (ID: {label_id}): {len(histograms)} -> {len(selected)}")
+
+    def build(blocks):
+        gallery = LBPHGallery(**store.params)
+        gallery.set_samples(np.concatenate([h for _, h in blocks]),
+                            np.concatenate([np.full(len(h), label_id, dtype=np.int32) for label_id, h in blocks]))
+        return gallery
+
+    queries = np.concatenate([h for _, h in query_blocks])
+    query_labels = np.concatenate([np.full(len(h), label_id, dtype=np.int32) for label_id, h in query_blocks])
+    if len(queries):
+        report = compaction_report(build(train_blocks), build(compact_blocks), queries, query_labels)
+        print(f"留出样本评估（{len(queries)} 个查询，不参与压缩）:")
+        print(f"样本数: {report['full_samples']} -> {report['compact_samples']}")
+        print(f"准确率: {report['full_accuracy']:.3f} -> {report['compact_accuracy']:.3f}，结果一致率 {report['agreement']:.3f}")
+        print(f"匹配耗时: {report['full_ms_per_query']:.2f} -> {report['compact_ms_per_query']:.2f} ms/查询")
+    else:
+        print("样本太少，没有留出样本，跳过准确率评估")
+
+    if args.dry_run:
+        recognizer.close()
+        print("仅预览，未修改模型")
+        return True
+
+    for label_id, (name, histograms, selected) in kept.items():
+        if len(selected) < len(histograms):
+            store.put_user(label_id, name, selected)
+    recognizer.load_model(migrate=True)  # 按用户存储版本已变化，重建快照和索引
+    recognizer.close()
+    print(f"✅ 已压缩模型: {recognizer.binary_model_path} ({recognizer.gallery.size} 个样本)")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="人脸模型维护工具")
+    subparsers = parser.add_subparsers(dest="command")
+
+    convert_parser = subparsers.add_parser("convert", help="将YAML模型转换为二进制模型并导入按用户存储")
+    convert_parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="YAML模型路径")
+    convert_parser.add_argument("--output", default=None,
+                                help="输出路径（默认与YAML同名，后缀.lbph，并导入按用户存储；指定时只转换）")
+    convert_parser.set_defaults(func=convert)
+
+    info_parser = subparsers.add_parser("info", help="查看二进制模型信息")
+    info_parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="模型路径")
+    info_parser.set_defaults(func=info)
+
+    compact_parser = subparsers.add_parser("compact", help="每个用户只保留k个代表样本")
+    compact_parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="模型路径")
+    compact_parser.add_argument("-k", "--k", type=int, default=20, help="每个用户保留的样本数")
+    compact_parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    compact_parser.add_argument("--holdout", type=float, default=0.2,
+                                help="每个用户留出用于评估准确率的样本比例（不参与压缩）")
+    compact_parser.add_argument("--dry-run", action="store_true", help="只输出压缩报告，不修改模型")
+    compact_parser.set_defaults(func=compact)
+
+    args = parser.parse_args()
+    if not args.command:
+        parser.print_help()
+        return 1
+
+    return 0 if args.func(args) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
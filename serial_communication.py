@@ -9,6 +9,9 @@ import serial
 import threading
 import time
 from database.database_manager import DatabaseManager
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 class SerialCommunication:
     """串口通信类"""
@@ -47,14 +50,14 @@ class SerialCommunication:
         """设置当前识别的用户"""
         self.current_user_id = user_id
         self.current_user_name = user_name
-        print(f"串口通信: 设置当前用户 - ID: {user_id}, 姓名: {user_name}")
+        logger.debug("串口通信: 设置当前用户 - ID: %s, 姓名: %s", user_id, user_name)
         
         # 发送用户信息到串口
         self.send_user_info()
     
     def clear_current_user(self):
         """清除当前用户信息"""
-        print(f"串口通信: 清除当前用户 - ID: {self.current_user_id}, 姓名: {self.current_user_name}")
+        logger.debug("串口通信: 清除当前用户 - ID: %s, 姓名: %s", self.current_user_id, self.current_user_name)
         self.current_user_id = None
         self.current_user_name = None
         self.last_sent_data = None
@@ -74,7 +77,8 @@ class SerialCommunication:
                         # 糖量超过限制，只发送警告
                         warning_msg = f"{self.current_user_id},999"
                         self.send_data(warning_msg)
-                        print(f"警告: 用户糖量摄入已超过限制! 只发送警告信息: {warning_msg}")
+                        # 识别期间每次都会调用，用INFO级别以便采样
+                        logger.info("警告: 用户糖量摄入已超过限制! 只发送警告信息: %s", warning_msg)
                         # 更新上次发送的数据为警告数据
                         self.last_sent_data = ("WARNING", self.current_user_id)
                     else:
@@ -83,18 +87,18 @@ class SerialCommunication:
                         if self.last_sent_data != current_data:
                             message = f"{self.current_user_id},{round(sugar_intake):02d},{round(sugar_limit):02d}"
                             self.send_data(message)
-                            print(f"数据有变化，发送用户信息到串口: {message}")
+                            logger.debug("数据有变化，发送用户信息到串口: %s", message)
                             
                             # 更新上次发送的数据
                             self.last_sent_data = current_data
                         else:
-                            print(f"数据无变化，不发送串口信息: {current_data}")
+                            logger.debug("数据无变化，不发送串口信息: %s", current_data)
                 else:
-                    print("无法获取用户健康记录")
+                    logger.warning("无法获取用户健康记录")
             else:
-                print("没有当前用户，无法发送用户信息")
+                logger.debug("没有当前用户，无法发送用户信息")
         except Exception as e:
-            print(f"发送用户信息失败: {e}")
+            logger.error("发送用户信息失败: %s", e)
     
     def start(self):
         """启动串口通信"""
@@ -111,11 +115,11 @@ class SerialCommunication:
             self.listener_thread.daemon = True
             self.listener_thread.start()
             
-            print(f"串口通信已启动: {self.port}")
+            logger.info("串口通信已启动: %s", self.port)
             return True
             
         except Exception as e:
-            print(f"启动串口通信失败: {e}")
+            logger.error("启动串口通信失败: %s", e)
             return False
     
     def stop(self):
@@ -129,7 +133,7 @@ class SerialCommunication:
         if self.listener_thread:
             self.listener_thread.join(timeout=1)
         
-        print("串口通信已停止")
+        logger.info("串口通信已停止")
     
     def _listen_serial(self):
         """串口监听线程"""
@@ -143,7 +147,7 @@ class SerialCommunication:
                         self._process_serial_data(data)
                         
             except Exception as e:
-                print(f"串口读取错误: {e}")
+                logger.error("串口读取错误: %s", e)
                 time.sleep(0.1)
             
             time.sleep(0.01)  # 避免CPU占用过高
@@ -151,7 +155,7 @@ class SerialCommunication:
     def _process_serial_data(self, data):
         """处理串口数据"""
         try:
-            print(f"收到串口数据: {data}")
+            logger.info("收到串口数据: %s", data)
             
             # 只接收饮品ID（单个数字）
             try:
@@ -163,22 +167,22 @@ class SerialCommunication:
                     
                     # 检查是否有当前识别用户
                     if self.current_user_id is not None:
-                        print(f"用户 {self.current_user_name} 选择了 {drink_name}")
+                        logger.info("用户 %s 选择了 %s", self.current_user_name, drink_name)
                         
                         # 更新数据库
                         result = self.db_manager.add_drink_consumption(self.current_user_id, drink_id)
-                        print(f"数据库返回结果: {result} (类型: {type(result)})")
+                        logger.debug("数据库返回结果: %s (类型: %s)", result, type(result))
                         
                         if isinstance(result, tuple) and (result[0] == "SUCCESS" or result[0] == "WARNING"):
                             actual_sugar = result[1]  # 获取实际增加的糖量
-                            print(f"成功更新用户 {self.current_user_name} 的糖量摄入")
+                            logger.info("成功更新用户 %s 的糖量摄入", self.current_user_name)
                             
                             # 获取更新后的健康记录
                             health_record = self.db_manager.get_user_health_today(self.current_user_id)
                             if health_record:
                                 sugar_intake = health_record[3]
                                 sugar_limit = health_record[4]
-                                print(f"当前糖量摄入: {sugar_intake}g / {sugar_limit}g")
+                                logger.info("当前糖量摄入: %sg / %sg", sugar_intake, sugar_limit)
                                 
                                 # 发送更新后的用户信息到串口 (纯数字，糖量四舍五入为两位数，英文逗号)
                                 current_data = (self.current_user_id, round(sugar_intake), round(sugar_limit))
@@ -188,7 +192,7 @@ class SerialCommunication:
                                     # 糖量超过限制，只发送警告
                                     warning_msg = f"{self.current_user_id},999"
                                     self.send_data(warning_msg)
-                                    print(f"警告: 用户糖量摄入已超过限制! 只发送警告信息: {warning_msg}")
+                                    logger.warning("警告: 用户糖量摄入已超过限制! 只发送警告信息: %s", warning_msg)
                                     # 更新上次发送的数据为警告数据
                                     self.last_sent_data = ("WARNING", self.current_user_id)
                                 else:
@@ -196,37 +200,37 @@ class SerialCommunication:
                                     if self.last_sent_data != current_data:
                                         message = f"{self.current_user_id},{round(sugar_intake):02d},{round(sugar_limit):02d}"
                                         self.send_data(message)
-                                        print(f"数据有变化，发送更新信息到串口: {message}")
+                                        logger.debug("数据有变化，发送更新信息到串口: %s", message)
                                         
                                         # 更新上次发送的数据
                                         self.last_sent_data = current_data
                                     else:
-                                        print(f"数据无变化，不发送串口信息: {current_data}")
+                                        logger.debug("数据无变化，不发送串口信息: %s", current_data)
                                 
                                 # 通知Qt界面刷新显示，传递实际增加的糖量
                                 if self.on_data_updated:
                                     self.on_data_updated(self.current_user_id, self.current_user_name, actual_sugar)
                                 
                                 # 移除重复的警告检测，因为上面已经处理了
-                                print(f"饮品消费处理完成，结果: {result}")
+                                logger.debug("饮品消费处理完成，结果: %s", result)
                         else:
-                            print(f"更新用户 {self.current_user_name} 糖量摄入失败，返回结果: {result}")
+                            logger.error("更新用户 %s 糖量摄入失败，返回结果: %s", self.current_user_name, result)
                     else:
-                        print("没有识别到用户，无法添加饮品消费")
+                        logger.warning("没有识别到用户，无法添加饮品消费")
                         # 发送错误信息到串口 (纯数字: 888表示错误)
                         self.send_data("888,0")
                 else:
-                    print(f"无效的饮品ID: {drink_id}")
+                    logger.warning("无效的饮品ID: %s", drink_id)
                     # 发送错误信息到串口 (纯数字: 777表示无效饮品)
                     self.send_data(f"777,{drink_id}")
                     
             except ValueError:
-                print(f"数据格式错误: {data}，应为单个数字")
+                logger.warning("数据格式错误: %s，应为单个数字", data)
                 # 发送错误信息到串口 (纯数字: 666表示格式错误)
                 self.send_data("666,0")
                 
         except Exception as e:
-            print(f"处理串口数据失败: {e}")
+            logger.error("处理串口数据失败: %s", e)
             # 发送错误信息到串口 (纯数字: 555表示处理失败)
             self.send_data("555,0")
     
@@ -236,10 +240,10 @@ class SerialCommunication:
             if self.serial_port and self.serial_port.is_open:
                 message = f"{data}\n".encode('utf-8')
                 self.serial_port.write(message)
-                print(f"发送数据: {data}")
+                logger.debug("发送数据: %s", data)
                 return True
         except Exception as e:
-            print(f"发送数据失败: {e}")
+            logger.error("发送数据失败: %s", e)
         return False
     
     def get_status(self):
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+近似最近邻索引的测试
+验证近似搜索的top-1结果与精确搜索一致、增删样本后与特征库保持同步，以及保存后加载的索引结果不变。
+所有文件都写在临时目录中。
+
+用法：
+    python test_ann_index.py
+    python -m pytest -q test_ann_index.py
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from benchmark import synthetic_faces
+from face_recognition.ann_index import HistogramANNIndex
+from face_recognition.lbph_gallery import LBPHGallery
+
+
+def _gallery(identities=5, samples=4, dtype='float32', seed=0):
+    """用合成人脸建立特征库，返回 (gallery, images, labels)"""
+    images, labels = synthetic_faces(identities, samples, seed=seed)
+    gallery = LBPHGallery(dtype=dtype)
+    gallery.set_samples(gallery.compute_histograms(images), labels)
+    return gallery, images, labels
+
+
+def test_ann_recall():
+    """近似索引的top-1结果与精确搜索的一致率"""
+    print("\n🔍 测试近似最近邻召回率...")
+    gallery, images, labels = _gallery(identities=40, samples=6, seed=3)
+    index = HistogramANNIndex(n_components=32, shortlist=32, min_gallery_size=1)
+    assert index.build(gallery)
+    assert index.is_active(gallery)
+
+    queries, _ = synthetic_faces(40, 7, seed=3)
+    queries = gallery.compute_histograms(queries[6::7])
+    exact = [best[0][0] for best in gallery.match(queries)]
+    approximate = [best[0][0] for best in index.match(gallery, queries)]
+    recall = np.mean(np.array(exact) == np.array(approximate))
+    print(f"   召回率: {recall:.2%}")
+    assert recall >= 0.9
+    print("✅ 近似最近邻召回率达标")
+
+
+def test_ann_sync_and_save():
+    """增删样本后索引与特征库的标签逐个对应；保存后加载的索引给出相同的结果"""
+    print("\n🔍 测试索引同步和保存...")
+    gallery, images, labels = _gallery(identities=10, samples=4, seed=4)
+    index = HistogramANNIndex(n_components=16, shortlist=8, min_gallery_size=1)
+    assert index.build(gallery)
+    assert not HistogramANNIndex(min_gallery_size=1000).is_active(gallery)
+
+    extra, _ = synthetic_faces(1, 3, seed=5)
+    histograms = gallery.compute_histograms(extra)
+    gallery.add_samples(histograms, 10)
+    index.add_samples(histograms, 10)
+    gallery.remove_label(3)
+    index.remove_label(3)
+    assert index.is_active(gallery)
+    assert np.array_equal(index.labels, gallery.labels)
+
+    queries = gallery.compute_histograms(images[::4])
+    expected = index.match(gallery, queries, k=2)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "index.ann.npz")
+        index.save(path, metadata={'generation': 7})
+        loaded = HistogramANNIndex(shortlist=8, min_gallery_size=1)
+        assert loaded.load(path) == {'generation': 7}
+    assert loaded.n_components == index.n_components
+    assert loaded.match(gallery, queries, k=2) == expected
+    print("✅ 索引同步和保存正确")
+
+
+def main():
+    """主测试函数"""
+    print("🚀 近似最近邻索引测试开始")
+    print("=" * 50)
+
+    tests = [
+        ("近似最近邻召回率测试", test_ann_recall),
+        ("索引同步和保存测试", test_ann_sync_and_save),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}")
+        try:
+            test_func()
+            ok = True
+        except AssertionError as e:
+            print(f"断言失败: {e}")
+            ok = False
+        if ok:
+            passed += 1
+            print(f"✅ {test_name} 通过")
+        else:
+            print(f"❌ {test_name} 失败")
+
+    print("\n" + "=" * 50)
+    print(f"📊 测试结果: {passed}/{total} 通过")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+级联分类器和检测尺寸范围的测试
+验证配置的模型路径不存在时改用OpenCV自带的同名模型、分类器按线程缓存，
+以及按最近人脸尺寸收窄检测范围。
+
+用法：
+    python test_cascade_registry.py
+    python -m pytest -q test_cascade_registry.py
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import threading
+
+import cv2
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from face_recognition import cascade_registry
+from face_recognition.adaptive_size import AdaptiveSizeDetector
+
+CASCADE_PATH = os.path.join(current_dir, "data", "models", "haarcascade_frontalface_default.xml")
+
+
+class _BuiltinCascades:
+    """临时把 cv2.data.haarcascades 指向只包含默认人脸模型的目录"""
+
+    def __enter__(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        shutil.copy(CASCADE_PATH, self.tmp_dir)
+        self.data = getattr(cv2, 'data', None)
+        self.original = getattr(self.data, 'haarcascades', None)
+        if self.data is None:
+            cv2.data = type('data', (), {})()
+        cv2.data.haarcascades = self.tmp_dir + os.sep
+        return self.tmp_dir
+
+    def __exit__(self, *exc):
+        if self.data is None:
+            del cv2.data
+        else:
+            self.data.haarcascades = self.original
+        shutil.rmtree(self.tmp_dir)
+
+
+class _RecordingDetector:
+    """记录检测参数，返回预设人脸的检测器"""
+
+    def __init__(self, faces):
+        self.faces = faces
+        self.calls = []
+
+    def detect_faces(self, image, **kwargs):
+        self.calls.append(kwargs)
+        return self.faces
+
+
+def test_missing_path_falls_back_to_builtin():
+    """配置的模型路径不存在时改用OpenCV自带的同名模型；自带模型也没有时保留原路径并报错"""
+    print("\n🔍 测试级联模型路径回退...")
+    with _BuiltinCascades() as builtin_dir:
+        builtin = os.path.join(builtin_dir, "haarcascade_frontalface_default.xml")
+        assert cascade_registry.resolve_cascade_path("missing/haarcascade_frontalface_default.xml") == builtin
+        assert cascade_registry.resolve_cascade_path() == builtin
+        assert not cascade_registry.get_cascade("missing/haarcascade_frontalface_default.xml").empty()
+
+        # 存在的路径原样使用
+        assert cascade_registry.resolve_cascade_path(CASCADE_PATH) == CASCADE_PATH
+
+        missing = "missing/haarcascade_unknown.xml"
+        assert cascade_registry.resolve_cascade_path(missing) == os.path.abspath(missing)
+        try:
+            cascade_registry.get_cascade(missing)
+            assert False, "不存在的模型应当报错"
+        except ValueError:
+            pass
+    print("✅ 路径回退正确")
+
+
+def test_cascade_per_thread():
+    """同一线程重复使用同一个分类器，不同线程各自加载；FaceDetector按路径共享"""
+    print("\n🔍 测试分类器缓存...")
+    first = cascade_registry.get_cascade(CASCADE_PATH)
+    assert cascade_registry.get_cascade(CASCADE_PATH) is first
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(cascade_registry.get_cascade(CASCADE_PATH)))
+    thread.start()
+    thread.join()
+    assert other[0] is not first
+
+    assert cascade_registry.get_detector(CASCADE_PATH) is cascade_registry.get_detector(CASCADE_PATH)
+    print("✅ 分类器按线程缓存")
+
+
+def test_adaptive_size_range():
+    """观察到足够多的人脸后收窄尺寸范围，每隔 explore_interval 次恢复完整范围"""
+    print("\n🔍 测试检测尺寸范围收窄...")
+    inner = _RecordingDetector([(0, 0, 100, 100)])
+    detector = AdaptiveSizeDetector(inner, min_size=30, margin=(0.8, 1.25), min_observations=3, explore_interval=5)
+
+    for _ in range(3):
+        detector.detect_faces(None, min_size=(10, 10))
+    assert all(call['min_size'] == (30, 30) and call['max_size'] is None for call in inner.calls)
+
+    detector.detect_faces(None)
+    assert inner.calls[-1]['min_size'] == (80, 80) and inner.calls[-1]['max_size'] == (125, 125)
+    detector.detect_faces(None)
+    assert inner.calls[-1]['max_size'] is None
+
+    detector.reset()
+    detector.detect_faces(None)
+    assert inner.calls[-1]['min_size'] == (30, 30)
+    print("✅ 尺寸范围收窄正确")
+
+
+def main():
+    """主测试函数"""
+    print("🚀 级联分类器测试开始")
+    print("=" * 50)
+
+    tests = [
+        ("级联模型路径回退测试", test_missing_path_falls_back_to_builtin),
+        ("分类器缓存测试", test_cascade_per_thread),
+        ("检测尺寸范围测试", test_adaptive_size_range),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}")
+        try:
+            test_func()
+            ok = True
+        except AssertionError as e:
+            print(f"断言失败: {e}")
+            ok = False
+        if ok:
+            passed += 1
+            print(f"✅ {test_name} 通过")
+        else:
+            print(f"❌ {test_name} 失败")
+
+    print("\n" + "=" * 50)
+    print(f"📊 测试结果: {passed}/{total} 通过")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量人脸检测的测试
+验证 detect_batch 对每张输入都返回与 detect_faces 相同的结果、读取失败的图像不影响其他图像，
+以及同时在处理中的图像数不超过 window。所有文件都写在临时目录中。
+
+用法：
+    python test_face_detector.py
+    python -m pytest -q test_face_detector.py
+"""
+
+import os
+import sys
+import tempfile
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from benchmark import synthetic_scenes
+from face_recognition.face_detector import FaceDetector
+
+CASCADE_PATH = os.path.join(current_dir, "data", "models", "haarcascade_frontalface_default.xml")
+
+
+def test_detect_batch_matches_serial():
+    """路径和已解码图像混合输入时，每个序号都返回一次，结果与逐张检测一致；无法读取的路径返回None"""
+    print("\n🔍 测试批量检测结果...")
+    detector = FaceDetector(CASCADE_PATH)
+    scenes, _ = synthetic_scenes(4, 1, seed=3)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        items = []
+        for i, scene in enumerate(scenes):
+            if i % 2:
+                items.append(scene)
+            else:
+                path = os.path.join(tmp_dir, f"scene_{i}.png")
+                cv2.imwrite(path, scene)
+                items.append(path)
+        items.append(os.path.join(tmp_dir, "missing.png"))
+
+        results = {index: (gray, faces) for index, gray, faces in detector.detect_batch(items, workers=2, window=2)}
+
+    assert sorted(results) == list(range(len(items)))
+    for i, scene in enumerate(scenes):
+        gray, faces = results[i]
+        expected_gray = cv2.cvtColor(scene, cv2.COLOR_BGR2GRAY)
+        assert np.array_equal(gray, expected_gray)
+        assert np.array_equal(np.asarray(faces).reshape(-1, 4),
+                              np.asarray(detector.detect_faces(expected_gray)).reshape(-1, 4))
+    assert results[len(items) - 1][0] is None and len(results[len(items) - 1][1]) == 0
+    print("✅ 批量检测结果与逐张检测一致")
+
+
+def test_detect_batch_window():
+    """输入按需读取，已取出但尚未返回的图像不超过 window 张；提前结束迭代时不再读取"""
+    print("\n🔍 测试批量检测窗口...")
+    detector = FaceDetector(CASCADE_PATH)
+    image = np.zeros((60, 80, 3), dtype=np.uint8)
+    consumed = []
+
+    def images():
+        for i in range(20):
+            consumed.append(i)
+            yield image
+
+    yielded = 0
+    for _ in detector.detect_batch(images(), workers=2, window=3):
+        yielded += 1
+        assert len(consumed) - yielded <= 3
+        if yielded == 5:
+            break
+    assert len(consumed) <= 5 + 3
+    print("✅ 批量检测内存占用受窗口限制")
+
+
+def main():
+    """主测试函数"""
+    print("🚀 批量人脸检测测试开始")
+    print("=" * 50)
+
+    tests = [
+        ("批量检测结果测试", test_detect_batch_matches_serial),
+        ("批量检测窗口测试", test_detect_batch_window),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}")
+        try:
+            test_func()
+            ok = True
+        except AssertionError as e:
+            print(f"断言失败: {e}")
+            ok = False
+        if ok:
+            passed += 1
+            print(f"✅ {test_name} 通过")
+        else:
+            print(f"❌ {test_name} 失败")
+
+    print("\n" + "=" * 50)
+    print(f"📊 测试结果: {passed}/{total} 通过")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+人脸识别器模型更新的测试
+验证录入、删除、全量训练与识别并发时的结果，以及热重载和模型文件监视。
+所有文件都写在临时目录中，不会修改 data/ 下的模型。
+
+用法：
+    python test_face_recognizer.py
+    python -m pytest -q test_face_recognizer.py
+"""
+
+import os
+import sys
+import tempfile
+import threading
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from benchmark import synthetic_faces
+from face_recognition.face_recognizer import FaceRecognizer
+
+
+def test_enroll_during_recognize():
+    """录入、删除用户与识别并发进行时，识别结果始终正确（回归测试）"""
+    print("\n🔍 测试录入与识别并发...")
+    images, labels = synthetic_faces(12, 4, seed=5)
+    extra, _ = synthetic_faces(5, 3, seed=6)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        recognizer = FaceRecognizer(os.path.join(tmp_dir, "face_recognizer.yml"), tolerance=1e9,
+                                    ann_params={'min_gallery_size': 20, 'n_components': 16}, load=False)
+        for label_id in range(12):
+            recognizer.enroll_user(f"用户{label_id}", images[labels == label_id])
+        assert recognizer.ann_index.is_built
+
+        stop = threading.Event()
+        errors = []
+
+        def recognize():
+            while not stop.is_set():
+                results = recognizer.recognize_batch([images[0], images[13]])
+                if [name for name, _ in results] != ["用户0", "用户3"]:
+                    errors.append(results)
+
+        threads = [threading.Thread(target=recognize) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        try:
+            for i in range(20):
+                recognizer.enroll_user(f"新用户{i % 5}", extra[(i % 5) * 3:(i % 5) * 3 + 3], replace=bool(i % 2))
+                if i % 4 == 3:
+                    recognizer.remove_user(f"新用户{(i + 1) % 5}")
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            recognizer.close()
+
+        assert not errors, errors[:3]
+        assert recognizer.ann_index.size == recognizer.gallery.size
+    print("✅ 并发录入时识别结果正确")
+
+
+def test_train_swaps_new_model():
+    """全量训练在新的特征库上进行，完成后整体替换，旧特征库不被修改"""
+    print("\n🔍 测试全量训练...")
+    images, labels = synthetic_faces(4, 3, seed=7)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        recognizer = FaceRecognizer(os.path.join(tmp_dir, "face_recognizer.yml"), tolerance=1e9, load=False)
+        recognizer.enroll_user("旧用户", images[labels == 0])
+        old_gallery = recognizer.gallery
+        old_size = old_gallery.size
+        generation = recognizer.model_generation
+
+        for image, label in zip(images, labels):
+            recognizer.add_training_sample(image, f"用户{label}")
+        assert recognizer.train()
+
+        assert recognizer.gallery is not old_gallery and old_gallery.size == old_size
+        assert recognizer.model_generation == generation + 1
+        assert recognizer.known_face_names == ["用户0", "用户1", "用户2", "用户3"]
+        assert [name for name, _ in recognizer.recognize_batch([images[0], images[9]])] == ["用户0", "用户3"]
+
+        # 训练结果写入按用户存储和快照，重新加载后一致
+        reloaded = FaceRecognizer(recognizer.model_path, tolerance=1e9)
+        assert reloaded.known_face_names == recognizer.known_face_names
+        assert reloaded.gallery.size == recognizer.gallery.size
+    print("✅ 训练后整体替换模型")
+
+
+def test_reload_and_watch():
+    """其他进程修改模型后，reload_model 和模型文件监视都能加载到最新模型"""
+    print("\n🔍 测试热重载和文件监视...")
+    images, labels = synthetic_faces(3, 3, seed=8)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = os.path.join(tmp_dir, "face_recognizer.yml")
+        writer = FaceRecognizer(model_path, tolerance=1e9, load=False)
+        writer.enroll_user("用户0", images[labels == 0])
+
+        reader = FaceRecognizer(model_path, tolerance=1e9)
+        assert reader.known_face_names == ["用户0"]
+
+        # 手动重载
+        writer.enroll_user("用户1", images[labels == 1])
+        generation = reader.model_generation
+        assert reader.reload_model()
+        assert sorted(reader.known_face_names) == ["用户0", "用户1"]
+        assert reader.model_generation == generation + 1
+        assert reader.recognize_batch([images[3]])[0][0] == "用户1"
+
+        # 文件监视：存储版本变化后在后台重载
+        reloaded = threading.Event()
+        reader.start_watching(interval=0.05, on_reload=lambda success: success and reloaded.set())
+        try:
+            writer.enroll_user("用户2", images[labels == 2])
+            assert reloaded.wait(5), "模型更新后没有自动重载"
+            assert sorted(reader.known_face_names) == ["用户0", "用户1", "用户2"]
+        finally:
+            reader.close()
+            writer.close()
+        assert reader._watch_thread is None
+    print("✅ 热重载和文件监视正确")
+
+
+def main():
+    """主测试函数"""
+    print("🚀 人脸识别器测试开始")
+    print("=" * 50)
+
+    tests = [
+        ("并发录入测试", test_enroll_during_recognize),
+        ("全量训练测试", test_train_swaps_new_model),
+        ("热重载测试", test_reload_and_watch),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}")
+        try:
+            test_func()
+            ok = True
+        except AssertionError as e:
+            print(f"断言失败: {e}")
+            ok = False
+        if ok:
+            passed += 1
+            print(f"✅ {test_name} 通过")
+        else:
+            print(f"❌ {test_name} 失败")
+
+    print("\n" + "=" * 50)
+    print(f"📊 测试结果: {passed}/{total} 通过")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
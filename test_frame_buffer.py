@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+帧缓冲区的测试
+验证缓冲区满时丢弃最旧的帧、丢帧按消费者分别统计、等待新帧，以及关闭后不再返回帧。
+
+用法：
+    python test_frame_buffer.py
+    python -m pytest -q test_frame_buffer.py
+"""
+
+import os
+import sys
+import threading
+import time
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from utils.frame_buffer import FrameBuffer
+
+
+def test_frame_buffer_drop_oldest():
+    """帧缓冲区满时丢弃最旧的帧，丢帧按消费者分别统计，关闭后不再返回帧"""
+    print("\n🔍 测试帧缓冲区...")
+    buffer = FrameBuffer(capacity=2)
+    for i in range(5):
+        buffer.put(i)
+    assert len(buffer._frames) == 2
+    assert buffer.latest(consumer='pipeline')[0] == 5
+    assert buffer.latest(after=5, consumer='pipeline') is None
+
+    for i in range(3):
+        buffer.put(i)
+    assert buffer.latest(after=5, consumer='pipeline')[0] == 8
+    assert buffer.latest(consumer='display')[0] == 8
+    stats = buffer.stats()
+    assert stats['produced'] == 8
+    assert stats['pipeline']['consumed'] == 2 and stats['pipeline']['dropped'] == 2
+    assert stats['display']['consumed'] == 1 and stats['display']['dropped'] == 0
+
+    buffer.close()
+    assert buffer.latest() is None
+    assert buffer.latest(after=0, timeout=1) is None
+    print("✅ 帧缓冲区丢帧和关闭行为正确")
+
+
+def test_frame_buffer_wait():
+    """等待新帧的消费者在生产者写入后被唤醒，关闭时立即返回"""
+    print("\n🔍 测试等待新帧...")
+    buffer = FrameBuffer(capacity=2)
+    buffer.put('first')
+    timer = threading.Timer(0.1, buffer.put, args=('second',))
+    timer.start()
+    start = time.time()
+    assert buffer.latest(after=1, timeout=5)[0] == 2
+    assert time.time() - start < 5
+    timer.join()
+
+    timer = threading.Timer(0.1, buffer.close)
+    timer.start()
+    start = time.time()
+    assert buffer.latest(after=2, timeout=5) is None
+    assert time.time() - start < 5
+    timer.join()
+    print("✅ 等待新帧正确")
+
+
+def main():
+    """主测试函数"""
+    print("🚀 帧缓冲区测试开始")
+    print("=" * 50)
+
+    tests = [
+        ("帧缓冲区测试", test_frame_buffer_drop_oldest),
+        ("等待新帧测试", test_frame_buffer_wait),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}")
+        try:
+            test_func()
+            ok = True
+        except AssertionError as e:
+            print(f"断言失败: {e}")
+            ok = False
+        if ok:
+            passed += 1
+            print(f"✅ {test_name} 通过")
+        else:
+            print(f"❌ {test_name} 失败")
+
+    print("\n" + "=" * 50)
+    print(f"📊 测试结果: {passed}/{total} 通过")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+预览绘制路径的测试
+验证按宽高比缩放到标签大小、灰度和奇数宽度的画面、缓冲区复用，以及标注画在缩放后的副本上而不修改原始帧。
+只测试缩放和颜色转换部分，不需要PyQt5。
+
+用法：
+    python test_frame_renderer.py
+    python -m pytest -q test_frame_renderer.py
+"""
+
+import os
+import sys
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from ui.frame_renderer import FrameRenderer
+
+
+def test_fit_and_convert():
+    """保持宽高比缩放，输出RGB；灰度和奇数宽度的画面同样处理，尺寸不变时复用缓冲区"""
+    print("\n🔍 测试预览缩放...")
+    assert FrameRenderer.fit_size((640, 480), (320, 320)) == (320, 240, 0.5)
+    assert FrameRenderer.fit_size((640, 480), (800, 300)) == (400, 300, 0.625)
+
+    renderer = FrameRenderer()
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    frame[..., 0] = 255  # 纯蓝（BGR）
+    rgb = renderer.prepare(frame, (320, 320))
+    assert rgb.shape == (240, 320, 3)
+    assert (rgb[..., 2] == 255).all() and (rgb[..., :2] == 0).all()
+    assert renderer.prepare(frame, (320, 320)) is rgb
+
+    gray = np.full((101, 203), 77, dtype=np.uint8)
+    rgb = renderer.prepare(gray, (203, 101))
+    assert rgb.shape == (101, 203, 3) and (rgb == 77).all()
+    assert rgb.flags['C_CONTIGUOUS']
+    print("✅ 预览缩放正确")
+
+
+def test_draw_on_scaled_copy():
+    """标注回调收到缩放后的图像和缩放比例，原始帧不被修改"""
+    print("\n🔍 测试预览标注...")
+    renderer = FrameRenderer()
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    scales = []
+
+    def draw(image, scale):
+        scales.append(scale)
+        x, y, w, h = (int(v * scale) for v in (100, 100, 200, 200))
+        cv2.rectangle(image, (x, y), (x + w, y + h), (0, 255, 0), 2)
+
+    rgb = renderer.prepare(frame, (320, 240), draw)
+    assert scales == [0.5]
+    assert not frame.any()
+    assert rgb[50, 50:150, 1].min() == 255 and rgb[50, 50:150, [0, 2]].max() == 0
+    print("✅ 标注画在缩放后的副本上")
+
+
+def main():
+    """主测试函数"""
+    print("🚀 预览绘制测试开始")
+    print("=" * 50)
+
+    tests = [
+        ("预览缩放测试", test_fit_and_convert),
+        ("预览标注测试", test_draw_on_scaled_copy),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}")
+        try:
+            test_func()
+            ok = True
+        except AssertionError as e:
+            print(f"断言失败: {e}")
+            ok = False
+        if ok:
+            passed += 1
+            print(f"✅ {test_name} 通过")
+        else:
+            print(f"❌ {test_name} 失败")
+
+    print("\n" + "=" * 50)
+    print(f"📊 测试结果: {passed}/{total} 通过")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+帧来源的测试
+验证图片目录回放的顺序、循环播放，以及目录中没有可读取的图片时不会空转。
+所有文件都写在临时目录中。
+
+用法：
+    python test_frame_source.py
+    python -m pytest -q test_frame_source.py
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from utils.frame_source import ImageSequenceSource
+
+
+def _write_images(directory, values, broken=0):
+    """写入纯色图片（像素值即帧编号）和若干损坏的图片"""
+    for i, value in enumerate(values):
+        cv2.imwrite(os.path.join(directory, f"frame_{i:03d}.png"), np.full((8, 8, 3), value, dtype=np.uint8))
+    for i in range(broken):
+        with open(os.path.join(directory, f"broken_{i:03d}.jpg"), "wb") as f:
+            f.write(b"not an image")
+
+
+def test_image_sequence_order_and_loop():
+    """按文件名顺序回放，跳过损坏的图片；loop时从头开始，否则结束后关闭"""
+    print("\n🔍 测试图片目录回放...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _write_images(tmp_dir, [10, 20, 30], broken=1)
+
+        source = ImageSequenceSource(tmp_dir, realtime=False)
+        assert source.open()
+        values = []
+        while True:
+            ret, frame = source.read()
+            if not ret:
+                break
+            values.append(int(frame[0, 0, 0]))
+        assert values == [10, 20, 30]
+        assert not source.isOpened()
+
+        source = ImageSequenceSource(tmp_dir, realtime=False, loop=True)
+        assert source.open()
+        values = [int(source.read()[1][0, 0, 0]) for _ in range(7)]
+        assert values == [10, 20, 30, 10, 20, 30, 10]
+        assert source.isOpened()
+    print("✅ 回放顺序和循环正确")
+
+
+def test_image_sequence_without_readable_images():
+    """循环播放的目录中没有可读取的图片时返回 (False, None) 并关闭，不会空转（回归测试）"""
+    print("\n🔍 测试全部图片损坏的目录...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _write_images(tmp_dir, [], broken=3)
+
+        source = ImageSequenceSource(tmp_dir, realtime=False, loop=True)
+        assert source.open()
+        start = time.time()
+        assert source.read() == (False, None)
+        assert time.time() - start < 5
+        assert not source.isOpened()
+        assert source.read() == (False, None)
+    print("✅ 没有可读取的图片时停止回放")
+
+
+def main():
+    """主测试函数"""
+    print("🚀 帧来源测试开始")
+    print("=" * 50)
+
+    tests = [
+        ("图片目录回放测试", test_image_sequence_order_and_loop),
+        ("损坏目录测试", test_image_sequence_without_readable_images),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}")
+        try:
+            test_func()
+            ok = True
+        except AssertionError as e:
+            print(f"断言失败: {e}")
+            ok = False
+        if ok:
+            passed += 1
+            print(f"✅ {test_name} 通过")
+        else:
+            print(f"❌ {test_name} 失败")
+
+    print("\n" + "=" * 50)
+    print(f"📊 测试结果: {passed}/{total} 通过")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按用户存储的测试
+验证写入、读取、删除用户，以及多个进程同时修改同一个存储时不会互相覆盖。
+所有文件都写在临时目录中，不会修改 data/ 下的模型。
+
+用法：
+    python test_gallery_store.py
+    python -m pytest -q test_gallery_store.py
+"""
+
+import os
+import sys
+import tempfile
+import multiprocessing as mp
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from benchmark import synthetic_faces
+from face_recognition.face_recognizer import FaceRecognizer
+from face_recognition.gallery_store import GalleryStore
+from face_recognition.lbph_gallery import LBPHGallery
+
+
+def _gallery(identities=5, samples=4, dtype='float32', seed=0):
+    """用合成人脸建立特征库，返回 (gallery, images, labels)"""
+    images, labels = synthetic_faces(identities, samples, seed=seed)
+    gallery = LBPHGallery(dtype=dtype)
+    gallery.set_samples(gallery.compute_histograms(images), labels)
+    return gallery, images, labels
+
+
+def _enroll_worker(root_dir, prefix, count):
+    """在独立进程中录入若干用户，每个用户分配新的标签ID"""
+    store = GalleryStore(root_dir)
+    for i in range(count):
+        label_id = store.allocate_label()
+        store.put_user(label_id, f"{prefix}{i}", np.full((2, 4), label_id, dtype=np.float32))
+
+
+def test_gallery_store_round_trip():
+    """按用户存储：写入、读取、删除用户，版本号随修改递增"""
+    print("\n🔍 测试按用户存储...")
+    gallery, _, _ = _gallery(identities=3, samples=2)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = GalleryStore(os.path.join(tmp_dir, "gallery"))
+        store.reset(gallery.params)
+        for label_id in range(3):
+            store.put_user(label_id, f"用户{label_id}", gallery.histograms[gallery.labels == label_id])
+        version = store.version
+
+        reopened = GalleryStore(store.root_dir)
+        histograms, labels = reopened.load_all()
+        assert reopened.version == version
+        assert reopened.params == gallery.params
+        assert reopened.id_to_name() == {0: "用户0", 1: "用户1", 2: "用户2"}
+        order = np.argsort(labels, kind='stable')
+        assert np.array_equal(labels[order], gallery.labels)
+        assert np.allclose(histograms[order], gallery.histograms)
+
+        assert reopened.remove_user(1)
+        assert reopened.version == version + 1
+        assert sorted(GalleryStore(store.root_dir).users()) == [0, 2]
+    print("✅ 按用户存储读写一致")
+
+
+def test_concurrent_processes():
+    """多个进程同时录入用户，所有用户都保留，标签ID互不重复"""
+    print("\n🔍 测试多进程同时修改...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root_dir = os.path.join(tmp_dir, "gallery")
+        GalleryStore(root_dir).reset({'radius': 1, 'neighbors': 8, 'grid_x': 8, 'grid_y': 8})
+
+        context = mp.get_context('spawn')
+        processes = [context.Process(target=_enroll_worker, args=(root_dir, f"进程{p}_", 10)) for p in range(3)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(timeout=60)
+            assert process.exitcode == 0
+
+        store = GalleryStore(root_dir)
+        users = store.users()
+        assert len(users) == 30, sorted(entry["name"] for entry in users.values())
+        assert sorted(users) == list(range(30))
+        for label_id in users:
+            assert np.all(np.asarray(store.load_user(label_id)) == label_id)
+    print("✅ 多进程修改没有互相覆盖")
+
+
+def test_recognizers_keep_each_others_users():
+    """两个识别器实例先后录入用户，互不覆盖，并且都知道需要重新加载对方的修改"""
+    print("\n🔍 测试两个实例交替录入...")
+    images, labels = synthetic_faces(2, 3, seed=6)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = os.path.join(tmp_dir, "face_recognizer.yml")
+        first = FaceRecognizer(model_path, tolerance=1e9)
+        second = FaceRecognizer(model_path, tolerance=1e9)
+
+        assert first.enroll_user("用户0", images[labels == 0])
+        assert second.enroll_user("用户1", images[labels == 1])
+        assert second._local_signature() is None
+
+        reloaded = FaceRecognizer(model_path, tolerance=1e9)
+        assert sorted(reloaded.known_face_names) == ["用户0", "用户1"]
+        assert [name for name, _ in reloaded.recognize_batch([images[0], images[3]])] == ["用户0", "用户1"]
+
+        assert second.reload_model()
+        assert second._local_signature() == second.model_signature()
+    print("✅ 两个实例的录入都保留")
+
+
+def main():
+    """主测试函数"""
+    print("🚀 按用户存储测试开始")
+    print("=" * 50)
+
+    tests = [
+        ("按用户存储读写测试", test_gallery_store_round_trip),
+        ("多进程修改测试", test_concurrent_processes),
+        ("多实例录入测试", test_recognizers_keep_each_others_users),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}")
+        try:
+            test_func()
+            ok = True
+        except AssertionError as e:
+            print(f"断言失败: {e}")
+            ok = False
+        if ok:
+            passed += 1
+            print(f"✅ {test_name} 通过")
+        else:
+            print(f"❌ {test_name} 失败")
+
+    print("\n" + "=" * 50)
+    print(f"📊 测试结果: {passed}/{total} 通过")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+无界面识别服务的测试
+在临时目录中用合成画面回放整条流程（不连接串口），验证服务正常结束、流水线处理了回放的帧，
+并且整个过程不导入Qt。配置和模型复制到临时目录，不会修改 data/ 和 database/ 下的文件。
+
+用法：
+    python test_headless_service.py
+    python -m pytest -q test_headless_service.py
+"""
+
+import os
+import re
+import sys
+import shutil
+import subprocess
+import tempfile
+
+import cv2
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from benchmark import synthetic_scenes
+from headless_service import CaptureThread
+from utils.frame_buffer import FrameBuffer
+from utils.frame_source import ImageSequenceSource
+
+# 在子进程中运行服务，结束后检查是否导入了Qt
+SERVICE_SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+import headless_service
+code = headless_service.main(["--source", "scenes", "--fast", "--no-serial", "--stats-interval", "0", "--duration", "60"])
+qt = [name for name in sys.modules if name.startswith("PyQt")]
+print("QT_MODULES", qt)
+sys.exit(code or (2 if qt else 0))
+"""
+
+
+def _write_scenes(directory, count=4, empty=2):
+    os.makedirs(directory)
+    scenes, _ = synthetic_scenes(count, empty, seed=3)
+    for i, scene in enumerate(scenes):
+        cv2.imwrite(os.path.join(directory, f"scene_{i:03d}.png"), scene)
+    return len(scenes)
+
+
+def test_capture_thread_replay():
+    """采集线程把回放的每一帧写入缓冲区，回放结束后自行退出"""
+    print("\n🔍 测试采集线程...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        scene_dir = os.path.join(tmp_dir, "scenes")
+        count = _write_scenes(scene_dir)
+        buffer = FrameBuffer(capacity=count)
+        source = ImageSequenceSource(scene_dir, realtime=False)
+        assert source.open()
+        thread = CaptureThread(source, buffer)
+        thread.start()
+        thread.join(timeout=10)
+        assert not thread.is_alive()
+        assert buffer.stats()['produced'] == count
+        assert not source.isOpened()
+    print("✅ 采集线程回放完毕后退出")
+
+
+def test_headless_replay_without_qt():
+    """无界面服务回放图片目录：正常退出、输出识别结果、不导入Qt"""
+    print("\n🔍 测试无界面服务回放...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        shutil.copytree(os.path.join(current_dir, "config"), os.path.join(tmp_dir, "config"))
+        model_dir = os.path.join(tmp_dir, "data", "models")
+        os.makedirs(model_dir)
+        for name in ("haarcascade_frontalface_default.xml", "haarcascade_frontalface_alt2.xml"):
+            shutil.copy(os.path.join(current_dir, "data", "models", name), model_dir)
+        _write_scenes(os.path.join(tmp_dir, "scenes"))
+
+        result = subprocess.run([sys.executable, "-c", SERVICE_SCRIPT.format(root=current_dir)], cwd=tmp_dir,
+                                capture_output=True, text=True, timeout=120)
+        output = result.stdout + result.stderr
+        assert result.returncode == 0, output
+        assert "QT_MODULES []" in output, output
+        assert "无界面识别服务已启动" in output and "无界面识别服务已停止" in output, output
+        results = re.search(r"识别结果 (\d+)", output)
+        assert results and int(results.group(1)) > 0, output
+    print("✅ 无界面服务回放正常")
+
+
+def main():
+    """主测试函数"""
+    print("🚀 无界面识别服务测试开始")
+    print("=" * 50)
+
+    tests = [
+        ("采集线程测试", test_capture_thread_replay),
+        ("无界面服务回放测试", test_headless_replay_without_qt),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}")
+        try:
+            test_func()
+            ok = True
+        except AssertionError as e:
+            print(f"断言失败: {e}")
+            ok = False
+        if ok:
+            passed += 1
+            print(f"✅ {test_name} 通过")
+        else:
+            print(f"❌ {test_name} 失败")
+
+    print("\n" + "=" * 50)
+    print(f"📊 测试结果: {passed}/{total} 通过")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
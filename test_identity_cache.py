@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+用户和健康记录缓存的测试
+验证缓存命中时不查询数据库、写入后失效、跨天清除旧日期、同一数据库的管理器共用缓存，
+以及查询期间发生写入时不缓存旧结果。所有文件都写在临时目录中。
+
+用法：
+    python test_identity_cache.py
+    python -m pytest -q test_identity_cache.py
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+from datetime import datetime
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from database.database_manager import DatabaseManager
+from database.identity_cache import IdentityCache
+
+
+def test_identity_cache_invalidation():
+    """用户和今日健康记录的缓存：命中时不查询数据库，写入后失效，跨天清除旧日期"""
+    print("\n🔍 测试数据库缓存失效...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "test.db")
+        db_manager = DatabaseManager(db_path)
+        cache = db_manager.cache
+        user_id = db_manager.add_user("张三", 30)
+        today = datetime.now().strftime("%Y-%m-%d")
+        if not db_manager.get_user_health_today(user_id):
+            db_manager.add_health_record(user_id, today, 0.0)
+
+        db_manager.get_user_by_name("张三")
+        record = db_manager.get_user_health_today(user_id)
+        misses = cache.stats()['misses']
+        assert db_manager.get_user_by_name("张三")[1] == "张三"
+        assert db_manager.get_user_health_today(user_id) == record
+        assert cache.stats()['misses'] == misses
+
+        # 其他进程的写入也会被饮品消费累加，不会被缓存中的旧值覆盖
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("UPDATE health_records SET sugar_intake = sugar_intake + 10 WHERE id = ?", (record[0],))
+        status, actual_sugar = db_manager.add_drink_consumption(user_id, 1)
+        updated = db_manager.get_user_health_today(user_id)
+        assert abs(updated[3] - (record[3] + 10 + actual_sugar)) < 1e-6
+
+        db_manager.modify_user_info(user_id, "李四", 31, "男")
+        assert db_manager.get_user_by_name("张三") is None
+        assert db_manager.get_user_by_name("李四")[1] == "李四"
+
+        cache.get_health(user_id, "2000-01-01", 'today', lambda: record)
+        db_manager.get_user_health_today(user_id)
+        assert all(key[1] == today for key in cache._health)
+    print("✅ 缓存命中和失效正确")
+
+
+def test_shared_cache_and_concurrent_write():
+    """同一数据库文件的管理器共用缓存；查询期间发生的写入使查询结果不被缓存"""
+    print("\n🔍 测试缓存共享和并发写入...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "test.db")
+        first = DatabaseManager(db_path)
+        second = DatabaseManager(db_path)
+        assert first.cache is second.cache
+        assert DatabaseManager(os.path.join(tmp_dir, "other.db")).cache is not first.cache
+
+        user_id = first.add_user("张三", 30)
+        first.get_user_by_name("张三")
+        second.modify_user_info(user_id, "李四", 31, "男")
+        assert first.get_user_by_name("张三") is None
+
+    cache = IdentityCache()
+
+    def stale_loader():
+        # 模拟查询返回前另一线程完成了写入
+        cache.invalidate_users()
+        return ("stale",)
+
+    assert cache.get_user("王五", stale_loader) == ("stale",)
+    assert cache.get_user("王五", lambda: ("fresh",)) == ("fresh",)
+    assert cache.get_user("王五", lambda: ("unused",)) == ("fresh",)
+    print("✅ 缓存共享和并发写入处理正确")
+
+
+def main():
+    """主测试函数"""
+    print("🚀 数据库缓存测试开始")
+    print("=" * 50)
+
+    tests = [
+        ("数据库缓存测试", test_identity_cache_invalidation),
+        ("缓存共享和并发写入测试", test_shared_cache_and_concurrent_write),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}")
+        try:
+            test_func()
+            ok = True
+        except AssertionError as e:
+            print(f"断言失败: {e}")
+            ok = False
+        if ok:
+            passed += 1
+            print(f"✅ {test_name} 通过")
+        else:
+            print(f"❌ {test_name} 失败")
+
+    print("\n" + "=" * 50)
+    print(f"📊 测试结果: {passed}/{total} 通过")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
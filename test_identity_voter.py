@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多帧身份投票的测试
+验证投票确定身份、确定后跳过识别、定期复核、距离变大时提前复核，以及Unknown重试。
+
+用法：
+    python test_identity_voter.py
+    python -m pytest -q test_identity_voter.py
+"""
+
+import os
+import sys
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from face_recognition.identity_voter import IdentityVoter
+
+
+class _FakeRecognizer:
+    """按预设结果返回的识别器，记录调用次数"""
+
+    model_generation = 0
+    tolerance = 100.0
+
+    def __init__(self):
+        self.name = "张三"
+        self.distance = 30.0
+        self.calls = 0
+
+    def recognize_batch(self, face_images):
+        self.calls += len(face_images)
+        return [(self.name, self.distance)] * len(face_images)
+
+
+def test_identity_voter():
+    """多帧投票：确定身份后跳过识别，定期复核，复核不一致时重新投票，Unknown定时重试"""
+    print("\n🔍 测试多帧身份投票...")
+    recognizer = _FakeRecognizer()
+    voter = IdentityVoter(min_votes=3, decision_score=10.0, reverify_interval=3.0, unknown_retry=1.0)
+
+    # 前两帧尚未确定，第三帧确定
+    assert voter.recognize(recognizer, [1], [None], now=0.0) == [("张三", 30.0, False)]
+    assert voter.recognize(recognizer, [1], [None], now=0.5)[0][2] is False
+    assert voter.recognize(recognizer, [1], [None], now=1.0) == [("张三", 30.0, True)]
+    # 确定后不再调用识别器
+    voter.recognize(recognizer, [1], [None], now=2.0)
+    assert recognizer.calls == 3
+
+    # 到期复核一致时延续，复核不一致时重新投票
+    assert voter.recognize(recognizer, [1], [None], now=4.0) == [("张三", 30.0, True)]
+    assert recognizer.calls == 4
+    recognizer.name = "李四"
+    assert voter.recognize(recognizer, [1], [None], now=7.5) == [("李四", 30.0, False)]
+
+    # 模型变化后旧决定失效
+    recognizer.name = "张三"
+    for now in (8.0, 8.5, 9.0):
+        voter.recognize(recognizer, [2], [None], now=now)
+    assert voter.decision(2, 0, now=9.0) == ("张三", 30.0)
+    assert voter.decision(2, 1, now=9.0) is None
+
+    # Unknown决定只保持 unknown_retry 秒
+    recognizer.name = "Unknown"
+    for now in (10.0, 10.1, 10.2):
+        voter.recognize(recognizer, [3], [None], now=now)
+    assert voter.decision(3, 0, now=10.5) == ("Unknown", 30.0)
+    assert voter.decision(3, 0, now=11.5) is None
+    print("✅ 多帧投票结果正确")
+
+
+def test_reverify_on_confidence_drop():
+    """复核距离超过 confident_distance 时每帧复核，出现可信的一帧后恢复按间隔复核"""
+    print("\n🔍 测试距离变大时提前复核...")
+    recognizer = _FakeRecognizer()
+    voter = IdentityVoter(min_votes=3, decision_score=10.0, reverify_interval=3.0, confident_distance=60.0)
+    for now in (0.0, 0.5, 1.0):
+        voter.recognize(recognizer, [1], [None], now=now)
+    assert voter.decision(1, 0, now=1.5) == ("张三", 30.0)
+
+    # 到期复核时距离变大：身份不变，但之后每帧都复核
+    recognizer.distance = 80.0
+    assert voter.recognize(recognizer, [1], [None], now=4.0) == [("张三", 30.0, True)]
+    calls = recognizer.calls
+    assert voter.recognize(recognizer, [1], [None], now=4.5) == [("张三", 30.0, True)]
+    assert recognizer.calls == calls + 1
+
+    # 出现可信的一帧后恢复按间隔复核
+    recognizer.distance = 40.0
+    voter.recognize(recognizer, [1], [None], now=5.0)
+    calls = recognizer.calls
+    voter.recognize(recognizer, [1], [None], now=5.5)
+    assert recognizer.calls == calls
+
+    # 投票确定时平均距离就不可信的决定同样每帧复核
+    recognizer.distance = 90.0
+    for now in (6.0, 6.5, 7.0):
+        voter.recognize(recognizer, [2], [None], now=now)
+    assert voter.entries[2]['decision'] == ("张三", 90.0)
+    assert voter.decision(2, 0, now=7.1) is None
+    print("✅ 距离变大时提前复核")
+
+
+def main():
+    """主测试函数"""
+    print("🚀 多帧投票测试开始")
+    print("=" * 50)
+
+    tests = [
+        ("多帧投票测试", test_identity_voter),
+        ("可信距离复核测试", test_reverify_on_confidence_drop),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}")
+        try:
+            test_func()
+            ok = True
+        except AssertionError as e:
+            print(f"断言失败: {e}")
+            ok = False
+        if ok:
+            passed += 1
+            print(f"✅ {test_name} 通过")
+        else:
+            print(f"❌ {test_name} 失败")
+
+    print("\n" + "=" * 50)
+    print(f"📊 测试结果: {passed}/{total} 通过")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
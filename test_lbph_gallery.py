@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+向量化LBPH特征库的测试
+验证直方图和距离与OpenCV一致，以及增删样本后的匹配结果与重新建立的特征库一致。
+
+用法：
+    python test_lbph_gallery.py
+    python -m pytest -q test_lbph_gallery.py
+"""
+
+import os
+import sys
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from benchmark import synthetic_faces
+from face_recognition.lbph_gallery import LBPHGallery
+
+
+def test_lbph_parity():
+    """向量化的直方图和距离与 cv2.face.LBPHFaceRecognizer 一致"""
+    print("\n🔍 测试LBPH与OpenCV一致...")
+    images, labels = synthetic_faces(4, 3, seed=1)
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.train(list(images), labels)
+
+    gallery = LBPHGallery()
+    gallery.load_from_recognizer(recognizer)
+    histograms = gallery.compute_histograms(images)
+    assert np.allclose(histograms, np.vstack(recognizer.getHistograms()), atol=1e-6)
+
+    queries, _ = synthetic_faces(4, 1, seed=2)
+    for query, best in zip(queries, gallery.match(gallery.compute_histograms(queries))):
+        label, distance = recognizer.predict(query)
+        assert best[0][0] == label
+        assert abs(best[0][1] - distance) <= 1e-3 * max(1.0, distance)
+    print("✅ 直方图和predict结果一致")
+
+
+def test_incremental_add_remove():
+    """追加和删除样本后的匹配结果与用剩余样本重新建立的特征库一致"""
+    print("\n🔍 测试增删样本...")
+    images, labels = synthetic_faces(6, 3, seed=4)
+    histograms = LBPHGallery().compute_histograms(images)
+    labels = np.asarray(labels)
+
+    gallery = LBPHGallery()
+    gallery.set_samples(histograms[labels < 4], labels[labels < 4])
+    for label in (4, 5):
+        gallery.add_samples(histograms[labels == label], label)
+    assert gallery.remove_label(1) == 3
+    assert gallery.remove_label(1) == 0
+
+    keep = labels != 1
+    rebuilt = LBPHGallery()
+    rebuilt.set_samples(histograms[keep], labels[keep])
+    assert sorted(gallery.labels.tolist()) == sorted(rebuilt.labels.tolist())
+
+    queries, _ = synthetic_faces(6, 1, seed=5)
+    queries = gallery.compute_histograms(queries)
+    for got, expected in zip(gallery.match(queries, k=3), rebuilt.match(queries, k=3)):
+        assert [label for label, _ in got] == [label for label, _ in expected]
+        assert np.allclose([d for _, d in got], [d for _, d in expected], rtol=1e-5)
+    print("✅ 增删样本后匹配结果一致")
+
+
+def main():
+    """主测试函数"""
+    print("🚀 LBPH特征库测试开始")
+    print("=" * 50)
+
+    tests = [
+        ("LBPH一致性测试", test_lbph_parity),
+        ("增删样本测试", test_incremental_add_remove),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}")
+        try:
+            test_func()
+            ok = True
+        except AssertionError as e:
+            print(f"断言失败: {e}")
+            ok = False
+        if ok:
+            passed += 1
+            print(f"✅ {test_name} 通过")
+        else:
+            print(f"❌ {test_name} 失败")
+
+    print("\n" + "=" * 50)
+    print(f"📊 测试结果: {passed}/{total} 通过")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
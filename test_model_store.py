@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模型文件的测试
+验证 .lbph 二进制模型读写，以及加载模型默认只读、只在显式迁移或首次修改时写入按用户存储。
+所有文件都写在临时目录中，不会修改 data/ 下的模型。
+
+用法：
+    python test_model_store.py
+    python -m pytest -q test_model_store.py
+"""
+
+import os
+import sys
+import pickle
+import tempfile
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from benchmark import synthetic_faces
+from face_recognition import model_store
+from face_recognition.face_recognizer import FaceRecognizer
+from face_recognition.lbph_gallery import LBPHGallery
+
+
+def _gallery(identities=5, samples=4, dtype='float32', seed=0):
+    """用合成人脸建立特征库，返回 (gallery, images, labels)"""
+    images, labels = synthetic_faces(identities, samples, seed=seed)
+    gallery = LBPHGallery(dtype=dtype)
+    gallery.set_samples(gallery.compute_histograms(images), labels)
+    return gallery, images, labels
+
+
+def _write_yaml_model(tmp_dir, identities=3, samples=3):
+    """用OpenCV训练并保存旧版YAML模型和标签映射，返回 (模型路径, images, labels)"""
+    images, labels = synthetic_faces(identities, samples, seed=3)
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.train(list(images), labels)
+    model_path = os.path.join(tmp_dir, "face_recognizer.yml")
+    recognizer.write(model_path)
+
+    id_to_name = {label_id: f"用户{label_id}" for label_id in range(identities)}
+    name_to_id = {name: label_id for label_id, name in id_to_name.items()}
+    with open(model_path.replace('.yml', '_labels.pkl'), 'wb') as f:
+        pickle.dump({'name_to_id': name_to_id, 'id_to_name': id_to_name}, f)
+    return model_path, images, labels
+
+
+def test_binary_model_round_trip():
+    """.lbph 二进制模型保存后加载，数据和匹配结果不变（含量化类型和加载时转换类型）"""
+    print("\n🔍 测试二进制模型读写...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for dtype in ('float32', 'uint8'):
+            gallery, images, _ = _gallery(dtype=dtype)
+            path = os.path.join(tmp_dir, f"model_{dtype}.lbph")
+            id_to_name = {label_id: f"用户{label_id}" for label_id in range(5)}
+            model_store.save_model(path, gallery, id_to_name, metadata={'store_version': 3})
+
+            loaded, loaded_names, header = model_store.load_model(path, mmap=False)
+            assert loaded.dtype == gallery.dtype
+            assert loaded_names == id_to_name
+            assert header['metadata']['store_version'] == 3
+            assert np.array_equal(loaded.labels, gallery.labels)
+            assert np.array_equal(loaded.matrix, gallery.matrix)
+            queries = gallery.compute_histograms(images[::4])
+            assert loaded.match(queries, k=2) == gallery.match(queries, k=2)
+
+        converted, _, _ = model_store.load_model(path, mmap=False, dtype='float32')
+        assert converted.dtype == np.float32 and converted.size == gallery.size
+    print("✅ 二进制模型读写一致")
+
+
+def test_load_is_readonly():
+    """加载旧版YAML模型不写任何文件，migrate=True 时才导入按用户存储并生成快照"""
+    print("\n🔍 测试只读加载...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path, images, labels = _write_yaml_model(tmp_dir)
+        before = sorted(os.listdir(tmp_dir))
+
+        recognizer = FaceRecognizer(model_path, tolerance=1e9)
+        assert recognizer.gallery.size == len(images)
+        assert recognizer.recognize_batch([images[0]])[0][0] == "用户0"
+        assert sorted(os.listdir(tmp_dir)) == before
+
+        migrated = FaceRecognizer(model_path, tolerance=1e9, migrate=True)
+        assert migrated.store.exists() and os.path.exists(migrated.binary_model_path)
+        assert sorted(migrated.store.id_to_name().values()) == ["用户0", "用户1", "用户2"]
+
+        # 迁移后从按用户存储加载，结果不变
+        reloaded = FaceRecognizer(model_path, tolerance=1e9)
+        assert reloaded.recognize_batch([images[0]]) == recognizer.recognize_batch([images[0]])
+    print("✅ 加载模型不修改文件")
+
+
+def test_enroll_imports_readonly_model():
+    """只读加载旧模型后录入新用户，已有用户先导入按用户存储，不会丢失"""
+    print("\n🔍 测试只读加载后录入...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path, images, _ = _write_yaml_model(tmp_dir)
+        extra, _ = synthetic_faces(1, 3, seed=9)
+
+        recognizer = FaceRecognizer(model_path, tolerance=1e9)
+        assert recognizer.enroll_user("新用户", extra)
+
+        reloaded = FaceRecognizer(model_path, tolerance=1e9)
+        assert sorted(reloaded.known_face_names) == ["新用户", "用户0", "用户1", "用户2"]
+        assert reloaded.recognize_batch([images[0], extra[0]])[0][0] == "用户0"
+        assert reloaded.recognize_batch([extra[0]])[0][0] == "新用户"
+    print("✅ 录入时保留旧模型中的用户")
+
+
+def main():
+    """主测试函数"""
+    print("🚀 模型文件测试开始")
+    print("=" * 50)
+
+    tests = [
+        ("二进制模型读写测试", test_binary_model_round_trip),
+        ("只读加载测试", test_load_is_readonly),
+        ("只读加载后录入测试", test_enroll_imports_readonly_model),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}")
+        try:
+            test_func()
+            ok = True
+        except AssertionError as e:
+            print(f"断言失败: {e}")
+            ok = False
+        if ok:
+            passed += 1
+            print(f"✅ {test_name} 通过")
+        else:
+            print(f"❌ {test_name} 失败")
+
+    print("\n" + "=" * 50)
+    print(f"📊 测试结果: {passed}/{total} 通过")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
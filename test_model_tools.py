@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模型维护工具的测试
+验证 compact --dry-run 不修改任何模型文件，正式压缩后每个用户最多保留k个样本。
+所有文件都写在临时目录中，不会修改 data/ 下的模型。
+
+用法：
+    python test_model_tools.py
+    python -m pytest -q test_model_tools.py
+"""
+
+import os
+import sys
+import hashlib
+import argparse
+import tempfile
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+import model_tools
+from benchmark import synthetic_faces
+from face_recognition.face_recognizer import FaceRecognizer
+
+
+def _snapshot(root_dir):
+    """目录下所有文件的 {相对路径: 内容摘要}"""
+    files = {}
+    for dirpath, _, filenames in os.walk(root_dir):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            with open(path, 'rb') as f:
+                files[os.path.relpath(path, root_dir)] = hashlib.sha1(f.read()).hexdigest()
+    return files
+
+
+def _enrolled_model(tmp_dir, identities=3, samples=6):
+    """录入几个用户，返回模型路径"""
+    images, labels = synthetic_faces(identities, samples, seed=4)
+    model_path = os.path.join(tmp_dir, "face_recognizer.yml")
+    recognizer = FaceRecognizer(model_path, tolerance=1e9, load=False)
+    for label_id in range(identities):
+        assert recognizer.enroll_user(f"用户{label_id}", images[labels == label_id])
+    recognizer.close()
+    return model_path
+
+
+def test_compact_dry_run_is_readonly():
+    """compact --dry-run 只输出报告，不写任何文件"""
+    print("\n🔍 测试压缩预览...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = _enrolled_model(tmp_dir)
+        before = _snapshot(tmp_dir)
+
+        args = argparse.Namespace(model=model_path, k=2, seed=0, holdout=0.2, dry_run=True)
+        assert model_tools.compact(args)
+        assert _snapshot(tmp_dir) == before
+    print("✅ 预览没有修改模型")
+
+
+def test_compact_keeps_k_samples():
+    """正式压缩后每个用户最多保留k个样本，重新加载后仍能识别"""
+    print("\n🔍 测试模型压缩...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = _enrolled_model(tmp_dir)
+
+        args = argparse.Namespace(model=model_path, k=2, seed=0, holdout=0.2, dry_run=False)
+        assert model_tools.compact(args)
+
+        recognizer = FaceRecognizer(model_path, tolerance=1e9)
+        assert all(entry["count"] <= 2 for entry in recognizer.store.users().values())
+        assert recognizer.gallery.size == sum(entry["count"] for entry in recognizer.store.users().values())
+        assert sorted(recognizer.known_face_names) == ["用户0", "用户1", "用户2"]
+    print("✅ 压缩后样本数正确")
+
+
+def main():
+    """主测试函数"""
+    print("🚀 模型维护工具测试开始")
+    print("=" * 50)
+
+    tests = [
+        ("压缩预览测试", test_compact_dry_run_is_readonly),
+        ("模型压缩测试", test_compact_keeps_k_samples),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}")
+        try:
+            test_func()
+            ok = True
+        except AssertionError as e:
+            print(f"断言失败: {e}")
+            ok = False
+        if ok:
+            passed += 1
+            print(f"✅ {test_name} 通过")
+        else:
+            print(f"❌ {test_name} 失败")
+
+    print("\n" + "=" * 50)
+    print(f"📊 测试结果: {passed}/{total} 通过")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
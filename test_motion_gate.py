@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运动门控的测试
+验证画面静止时跳过检测、有变化或静止超时时处理，以及只在识别结果确定后才允许跳过。
+
+用法：
+    python test_motion_gate.py
+    python -m pytest -q test_motion_gate.py
+"""
+
+import os
+import sys
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from face_recognition.motion_gate import MotionGate
+from face_recognition.pipeline import DetectionStage
+from face_recognition.preprocessing import FramePreprocessor
+
+
+class _CountingDetector:
+    """记录调用次数、始终返回一张人脸的检测器"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def detect_faces(self, image, **kwargs):
+        self.calls += 1
+        return [(10, 10, 40, 40)]
+
+
+def _frame(value=100):
+    frame = np.full((240, 320), value, dtype=np.uint8)
+    frame[::8, :] = 30  # 条纹，避免整幅纯色
+    return frame
+
+
+def test_static_and_changed_frames():
+    """静止画面跳过，有变化的画面处理，静止超过 max_static_time 时强制处理"""
+    print("\n🔍 测试帧差检测...")
+    gate = MotionGate(threshold=15, min_area=0.01, max_static_time=5.0)
+    assert gate.changed(_frame(), now=0.0)
+    assert not gate.changed(_frame(), now=1.0)
+    # 轻微的亮度变化低于阈值
+    assert not gate.changed(_frame(105), now=2.0)
+
+    moved = _frame()
+    moved[100:180, 120:200] = 250
+    assert gate.changed(moved, now=3.0)
+    assert not gate.changed(moved, now=4.0)
+
+    assert gate.changed(moved, now=8.5)
+    assert gate.passed == 3 and gate.skipped == 3
+
+    gate.reset()
+    assert gate.changed(moved, now=9.0)
+    print("✅ 帧差检测正确")
+
+
+def test_detection_stage_gating():
+    """检测阶段只在上次结果已确定身份时跳过静止画面"""
+    print("\n🔍 测试检测阶段的运动门控...")
+    detector = _CountingDetector()
+    stage = DetectionStage(FramePreprocessor(detection_scale=0.5), detector, motion_gate=MotionGate())
+
+    assert stage.process(_frame(), now=0.0) is not None
+    assert stage.process(_frame(), now=0.5, settled=True) is None
+    # 身份尚未确定时即使画面静止也继续检测
+    assert stage.process(_frame(), now=1.0, settled=False) is not None
+    assert detector.calls == 2
+
+    stage.reset()
+    assert stage.process(_frame(), now=1.5) is not None
+    assert detector.calls == 3
+    print("✅ 检测阶段门控正确")
+
+
+def main():
+    """主测试函数"""
+    print("🚀 运动门控测试开始")
+    print("=" * 50)
+
+    tests = [
+        ("帧差检测测试", test_static_and_changed_frames),
+        ("检测阶段门控测试", test_detection_stage_gating),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}")
+        try:
+            test_func()
+            ok = True
+        except AssertionError as e:
+            print(f"断言失败: {e}")
+            ok = False
+        if ok:
+            passed += 1
+            print(f"✅ {test_name} 通过")
+        else:
+            print(f"❌ {test_name} 失败")
+
+    print("\n" + "=" * 50)
+    print(f"📊 测试结果: {passed}/{total} 通过")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
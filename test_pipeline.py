@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后台识别流水线的测试
+验证检测阶段交给识别线程的人脸区域不会被下一帧覆盖、当前用户信息的缓存，以及按配置创建识别器。
+所有文件都写在临时目录中，不会修改 data/ 下的模型。
+
+用法：
+    python test_pipeline.py
+    python -m pytest -q test_pipeline.py
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+import yaml
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from face_recognition.pipeline import DetectionStage, IdentityResolver, RecognitionResult, create_face_recognizer
+from face_recognition.preprocessing import FramePreprocessor
+from utils.config import ConfigManager
+
+
+class _FixedDetector:
+    """每帧都在同一位置返回一个人脸框的检测器"""
+
+    def detect_faces(self, image, **kwargs):
+        return [(10, 10, 40, 40)]
+
+
+def test_crops_survive_next_frame():
+    """检测下一帧后，上一帧截取的人脸区域保持不变（回归测试）"""
+    print("\n🔍 测试人脸区域不随下一帧改变...")
+    stage = DetectionStage(FramePreprocessor(detection_scale=0.5), _FixedDetector())
+
+    first = np.full((240, 320, 3), 50, dtype=np.uint8)
+    second = np.full((240, 320, 3), 200, dtype=np.uint8)
+    _, first_rois = stage.process(first, now=0.0)
+    _, second_rois = stage.process(second, now=0.1)
+
+    assert len(first_rois) == 1 and first_rois[0].size > 0
+    assert first_rois[0].mean() == 50, first_rois[0].mean()
+    assert second_rois[0].mean() == 200, second_rois[0].mean()
+    assert not np.shares_memory(first_rois[0], stage.preprocessor.gray)
+    print("✅ 人脸区域与共享灰度图互不影响")
+
+
+class _FakeDatabase:
+    """记录查询次数的数据库"""
+
+    def __init__(self):
+        self.queries = 0
+
+    def get_user_by_name(self, name):
+        self.queries += 1
+        return (1, name, 30)
+
+    def get_health_records(self, user_id):
+        return []
+
+
+class _FakeRecognizer:
+    def __init__(self, names):
+        self.name_to_id = {name: i for i, name in enumerate(names)}
+
+
+def _result(name, generation):
+    return RecognitionResult(0, 0.0, [(0, 0, 50, 50)], [(name, 30.0, True)], generation)
+
+
+def test_identity_resolver_keeps_user_across_generations():
+    """录入或删除其他用户后不重新查询当前用户，只有当前用户被删除时才放弃"""
+    print("\n🔍 测试当前用户缓存...")
+    db_manager = _FakeDatabase()
+    recognizer = _FakeRecognizer(["张三", "李四"])
+    resolver = IdentityResolver(db_manager, face_recognizer=recognizer)
+
+    assert resolver.resolve(_result("张三", 1)).identity_changed
+    assert db_manager.queries == 1
+
+    # 录入新用户：模型版本变化，但当前用户不变，不再查询数据库
+    recognizer.name_to_id["王五"] = 2
+    result = resolver.resolve(_result("张三", 2))
+    assert not result.identity_changed and result.user_info[1] == "张三"
+    assert db_manager.queries == 1
+
+    # 删除其他用户同样不影响当前用户
+    del recognizer.name_to_id["李四"]
+    assert not resolver.resolve(_result("张三", 3)).identity_changed
+    assert db_manager.queries == 1
+
+    # 删除当前用户后立即放弃缓存的用户信息
+    del recognizer.name_to_id["张三"]
+    result = resolver.resolve(RecognitionResult(0, 0.0, [(0, 0, 50, 50)], [("张三", 30.0, False)], 4))
+    assert result.identity_changed and result.user_info is None
+    assert resolver.active_identity is None
+    print("✅ 当前用户只在被删除时失效")
+
+
+def test_create_face_recognizer_config():
+    """create_face_recognizer 使用配置中的模型路径和置信度阈值"""
+    print("\n🔍 测试按配置创建识别器...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = os.path.join(tmp_dir, "face_recognizer.yml")
+        config_path = os.path.join(tmp_dir, "config.yaml")
+        with open(config_path, 'w', encoding='utf-8') as f:
+            yaml.safe_dump({'face_recognition': {'model_path': model_path, 'tolerance': 42}}, f)
+
+        recognizer = create_face_recognizer(ConfigManager(config_path))
+        try:
+            assert recognizer.model_path == model_path
+            assert recognizer.tolerance == 42
+        finally:
+            recognizer.close()
+    print("✅ 识别器使用配置中的模型路径和阈值")
+
+
+def main():
+    """主测试函数"""
+    print("🚀 识别流水线测试开始")
+    print("=" * 50)
+
+    tests = [
+        ("人脸区域复制测试", test_crops_survive_next_frame),
+        ("当前用户缓存测试", test_identity_resolver_keeps_user_across_generations),
+        ("识别器配置测试", test_create_face_recognizer_config),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}")
+        try:
+            test_func()
+            ok = True
+        except AssertionError as e:
+            print(f"断言失败: {e}")
+            ok = False
+        if ok:
+            passed += 1
+            print(f"✅ {test_name} 通过")
+        else:
+            print(f"❌ {test_name} 失败")
+
+    print("\n" + "=" * 50)
+    print(f"📊 测试结果: {passed}/{total} 通过")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ROI跟踪检测的测试
+验证两次全图检测之间只在人脸附近检测、级联漏检时用模板跟随，以及跟丢或到期时重新全图检测。
+
+用法：
+    python test_roi_tracker.py
+    python -m pytest -q test_roi_tracker.py
+"""
+
+import os
+import sys
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from face_recognition.roi_tracker import RoiTracker
+
+FACE = (100, 80, 40, 40)
+
+
+class _ScriptedDetector:
+    """按预设结果返回的检测器，记录每次调用的图像尺寸和参数"""
+
+    def __init__(self, faces=()):
+        self.faces = list(faces)
+        self.calls = []
+
+    def detect_faces(self, image, **kwargs):
+        self.calls.append((image.shape, kwargs))
+        return np.array(self.faces, dtype=np.int32).reshape(-1, 4)
+
+
+def _scene(seed):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, (240, 320)).astype(np.uint8)
+
+
+def test_roi_detection_between_full_detections():
+    """全图检测后只在ROI内检测，ROI结果映射回原图坐标；每隔 redetect_interval 次全图检测"""
+    print("\n🔍 测试ROI检测...")
+    full = _ScriptedDetector([FACE])
+    # ROI为人脸框四周各扩大50%：(80, 60) 起的 80x80 区域，人脸已是40像素，不缩放
+    roi = _ScriptedDetector([(22, 20, 40, 40)])
+    tracker = RoiTracker(roi, redetect_interval=3, full_detector=full)
+    image = _scene(0)
+
+    assert tracker.detect(image).tolist() == [list(FACE)]
+    assert len(full.calls) == 1 and not roi.calls
+
+    assert tracker.detect(image).tolist() == [[102, 80, 40, 40]]
+    assert len(full.calls) == 1 and len(roi.calls) == 1
+    shape, kwargs = roi.calls[0]
+    assert shape == (80, 80)
+    assert kwargs['equalized'] and kwargs['min_size'][0] < 40 < kwargs['max_size'][0]
+
+    # 全图检测后的第 redetect_interval 次检测重新全图检测
+    tracker.detect(image)
+    assert len(full.calls) == 1 and tracker.roi_detections == 2
+    tracker.detect(image)
+    assert len(full.calls) == 2 and tracker.full_detections == 2
+    print("✅ ROI检测和定期全图检测正确")
+
+
+def test_template_follow_and_lost():
+    """级联在ROI内漏检时用模板跟随，模板匹配不上时重新全图检测"""
+    print("\n🔍 测试模板跟随...")
+    full = _ScriptedDetector([FACE])
+    roi = _ScriptedDetector()
+    tracker = RoiTracker(roi, redetect_interval=10, full_detector=full, max_template_frames=2)
+    image = _scene(1)
+
+    tracker.detect(image)
+    # 画面不变：模板在原位置匹配
+    assert tracker.detect(image).tolist() == [list(FACE)]
+    assert len(full.calls) == 1 and tracker.tracks[0]['misses'] == 1
+
+    # 画面整体平移：模板跟随到新位置
+    shifted = np.roll(image, (3, 5), axis=(0, 1))
+    assert tracker.detect(shifted).tolist() == [[105, 83, 40, 40]]
+    assert len(full.calls) == 1
+
+    # 已连续跟随 max_template_frames 次，再漏检时丢弃并重新全图检测
+    tracker.detect(shifted)
+    assert len(full.calls) == 2 and tracker.tracks[0]['misses'] == 0
+
+    # 画面完全不同，模板匹配失败，同样重新全图检测
+    tracker.detect(_scene(2))
+    assert len(full.calls) == 3
+
+    tracker.reset()
+    tracker.detect(image)
+    assert len(full.calls) == 4
+    print("✅ 模板跟随和跟丢处理正确")
+
+
+def main():
+    """主测试函数"""
+    print("🚀 ROI跟踪检测测试开始")
+    print("=" * 50)
+
+    tests = [
+        ("ROI检测测试", test_roi_detection_between_full_detections),
+        ("模板跟随测试", test_template_follow_and_lost),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}")
+        try:
+            test_func()
+            ok = True
+        except AssertionError as e:
+            print(f"断言失败: {e}")
+            ok = False
+        if ok:
+            passed += 1
+            print(f"✅ {test_name} 通过")
+        else:
+            print(f"❌ {test_name} 失败")
+
+    print("\n" + "=" * 50)
+    print(f"📊 测试结果: {passed}/{total} 通过")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多进程分片特征库的测试
+验证分片匹配与单进程精确匹配一致，以及识别器只在替换模型时同步分片、识别时不启动或同步分片。
+所有文件都写在临时目录中，不会修改 data/ 下的模型。
+
+用法：
+    python test_sharded_gallery.py
+    python -m pytest -q test_sharded_gallery.py
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from benchmark import synthetic_faces
+from face_recognition.face_recognizer import FaceRecognizer
+from face_recognition.lbph_gallery import LBPHGallery
+from face_recognition.sharded_gallery import ShardedGallery
+
+
+def _gallery(identities=5, samples=4, dtype='float32', seed=0):
+    """用合成人脸建立特征库，返回 (gallery, images, labels)"""
+    images, labels = synthetic_faces(identities, samples, seed=seed)
+    gallery = LBPHGallery(dtype=dtype)
+    gallery.set_samples(gallery.compute_histograms(images), labels)
+    return gallery, images, labels
+
+
+def test_sharded_matches_exact():
+    """多进程分片匹配与单进程精确匹配结果相同"""
+    print("\n🔍 测试分片匹配...")
+    gallery, images, _ = _gallery(identities=6, samples=3, seed=4)
+    queries = gallery.compute_histograms(images[::2])
+    sharded = ShardedGallery(2, gallery.params, dtype=str(gallery.dtype))
+    try:
+        sharded.sync(gallery, version=1)
+        for got, expected in zip(sharded.match(queries, k=3), gallery.match(queries, k=3)):
+            # 分片的分块大小不同，浮点累加顺序不同，距离只比较到舍入误差
+            assert [label for label, _ in got] == [label for label, _ in expected]
+            assert np.allclose([d for _, d in got], [d for _, d in expected], rtol=1e-4, atol=1e-2)
+    finally:
+        sharded.close()
+    print("✅ 分片匹配与精确匹配一致")
+
+
+def test_recognizer_syncs_on_update():
+    """录入、删除用户时同步分片；识别使用的模型版本与分片不一致时本进程精确搜索"""
+    print("\n🔍 测试分片同步时机...")
+    images, labels = synthetic_faces(4, 3, seed=5)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        recognizer = FaceRecognizer(os.path.join(tmp_dir, "face_recognizer.yml"), tolerance=1e9, shards=2)
+        try:
+            # 特征库为空时不启动分片进程，识别也不会启动
+            assert recognizer.sharded_gallery is None
+            assert recognizer.recognize_batch([images[0]]) == [("Unknown", 999.0)]
+            assert recognizer.sharded_gallery is None
+
+            for label_id in range(4):
+                recognizer.enroll_user(f"用户{label_id}", images[labels == label_id])
+            sharded = recognizer.sharded_gallery
+            assert sharded is not None and sharded.version == recognizer.model_generation
+
+            recognizer.remove_user("用户3")
+            assert recognizer.sharded_gallery is sharded
+            assert sharded.version == recognizer.model_generation
+            assert [name for name, _ in recognizer.recognize_batch([images[0], images[6]])] == ["用户0", "用户2"]
+
+            # 版本不一致时分片拒绝匹配，识别器退回本进程精确搜索
+            queries = recognizer.gallery.compute_histograms(images[:1])
+            assert sharded.match(queries, version=recognizer.model_generation - 1) is None
+            assert sharded.match(queries, version=recognizer.model_generation)[0][0][0] == 0
+        finally:
+            recognizer.close()
+        assert recognizer.sharded_gallery is None
+    print("✅ 分片只在模型替换时同步")
+
+
+def main():
+    """主测试函数"""
+    print("🚀 分片特征库测试开始")
+    print("=" * 50)
+
+    tests = [
+        ("分片匹配测试", test_sharded_matches_exact),
+        ("分片同步测试", test_recognizer_syncs_on_update),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}")
+        try:
+            test_func()
+            ok = True
+        except AssertionError as e:
+            print(f"断言失败: {e}")
+            ok = False
+        if ok:
+            passed += 1
+            print(f"✅ {test_name} 通过")
+        else:
+            print(f"❌ {test_name} 失败")
+
+    print("\n" + "=" * 50)
+    print(f"📊 测试结果: {passed}/{total} 通过")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+两级人脸检测的测试
+在合成画面上验证粗检 + 验证的两级检测找到与真实位置一致的人脸，且不会在没有人脸的画面上误检。
+
+用法：
+    python test_two_stage_detector.py
+    python -m pytest -q test_two_stage_detector.py
+"""
+
+import os
+import sys
+
+import cv2
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from benchmark import synthetic_scenes
+from face_recognition.cascade_registry import get_detector
+from face_recognition.tracking import box_iou
+from face_recognition.two_stage_detector import TwoStageDetector
+
+MODEL_DIR = os.path.join(current_dir, "data", "models")
+
+
+def _detectors():
+    verify = get_detector(os.path.join(MODEL_DIR, "haarcascade_frontalface_default.xml"))
+    coarse = get_detector(os.path.join(MODEL_DIR, "haarcascade_frontalface_alt2.xml"))
+    return verify, TwoStageDetector(verify, coarse)
+
+
+def test_two_stage_finds_faces():
+    """每张有人脸的画面都检测到与真实位置重合的人脸，空画面没有误检"""
+    print("\n🔍 测试两级检测...")
+    _, detector = _detectors()
+    scenes, boxes = synthetic_scenes(6, 2, seed=3)
+    for scene, truth in zip(scenes, boxes):
+        gray = cv2.equalizeHist(cv2.cvtColor(scene, cv2.COLOR_BGR2GRAY))
+        faces = detector.detect_faces(gray, equalized=True)
+        if truth:
+            assert len(faces) == 1, (truth, faces)
+            assert box_iou(faces, truth)[0, 0] > 0.5, (truth, faces)
+        else:
+            assert len(faces) == 0, faces
+    assert detector.verified == 6 and detector.candidates >= 6
+    print("✅ 两级检测结果正确")
+
+
+def test_two_stage_accepts_bgr_and_min_size():
+    """未预处理的BGR图像也能检测；小于 min_size 的人脸被过滤"""
+    print("\n🔍 测试两级检测的输入和尺寸限制...")
+    _, detector = _detectors()
+    scenes, boxes = synthetic_scenes(1, 0, seed=3)
+    faces = detector.detect_faces(scenes[0])
+    assert len(faces) == 1 and box_iou(faces, boxes[0])[0, 0] > 0.5
+
+    size = boxes[0][0][2]
+    assert len(detector.detect_faces(scenes[0], min_size=(size * 2, size * 2))) == 0
+    print("✅ 输入格式和尺寸限制正确")
+
+
+def main():
+    """主测试函数"""
+    print("🚀 两级人脸检测测试开始")
+    print("=" * 50)
+
+    tests = [
+        ("两级检测测试", test_two_stage_finds_faces),
+        ("输入和尺寸限制测试", test_two_stage_accepts_bgr_and_min_size),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n📋 {test_name}")
+        try:
+            test_func()
+            ok = True
+        except AssertionError as e:
+            print(f"断言失败: {e}")
+            ok = False
+        if ok:
+            passed += 1
+            print(f"✅ {test_name} 通过")
+        else:
+            print(f"❌ {test_name} 失败")
+
+    print("\n" + "=" * 50)
+    print(f"📊 测试结果: {passed}/{total} 通过")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
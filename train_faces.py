@@ -15,16 +15,18 @@ from datetime import datetime
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, current_dir)
 
-from face_recognition.face_detector import FaceDetector
+from face_recognition.cascade_registry import get_cascade, get_detector
 from face_recognition.face_recognizer import FaceRecognizer
 from database.database_manager import DatabaseManager
+from utils.config import config
+from utils.frame_source import create_frame_source
 
 class UnifiedFaceTrainer:
     """统一的人脸训练器"""
     
     def __init__(self):
-        self.face_detector = FaceDetector()
-        self.face_recognizer = FaceRecognizer()
+        self.face_detector = get_detector()
+        self.face_recognizer = FaceRecognizer(max_samples_per_user=config.get('training.max_samples_per_user', 0))
         self.db_manager = DatabaseManager()
         self.face_images_dir = "data/faces"
         
@@ -34,8 +36,7 @@ class UnifiedFaceTrainer:
     def face_detect_demo(self, image):
         """人脸检测函数（基于用户代码）"""
         gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        face_detector = cv2.CascadeClassifier("data/models/haarcascade_frontalface_default.xml")
-        faces = face_detector.detectMultiScale(gray, 1.2, 6)
+        faces = get_cascade("data/models/haarcascade_frontalface_default.xml").detectMultiScale(gray, 1.2, 6)
         
         # 如果未检测到面部，则返回None
         if len(faces) == 0:
@@ -48,8 +49,8 @@ class UnifiedFaceTrainer:
         # 返回图像的脸部部分
         return gray[y:y+h, x:x+w], largest_face
     
-    def collect_from_directory(self, dir_path, person_name):
-        """从目录收集训练样本（基于用户代码）"""
+    def collect_from_directory(self, dir_path, person_name, workers=None):
+        """从目录收集训练样本（基于用户代码），workers为并行检测的线程数，默认CPU核数"""
         faces = []
         saved_images = []
         print(f"从目录收集 {person_name} 的训练样本: {dir_path}")
@@ -62,28 +63,32 @@ class UnifiedFaceTrainer:
         user_dir = os.path.join(self.face_images_dir, person_name)
         os.makedirs(user_dir, exist_ok=True)
         
-        for i, file in enumerate(os.listdir(dir_path)):
-            file_path = os.path.join(dir_path, file)
-            if os.path.isfile(file_path):
-                # 读取图像
-                img = cv2.imread(file_path)
-                if img is None:
-                    continue
-                
-                # 检测人脸
-                face, rect = self.face_detect_demo(img)
-                if face is not None:
-                    # 保存检测到的人脸图片
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    filename = f"{person_name}_{timestamp}_{i:03d}.jpg"
-                    save_path = os.path.join(user_dir, filename)
-                    cv2.imwrite(save_path, face)
-                    saved_images.append(save_path)
-                    
-                    # 预处理人脸（调整大小）
-                    processed_face = cv2.resize(face, (150, 150))
-                    faces.append(processed_face)
-                    print(f"成功处理: {file} -> {filename}")
+        file_paths = [os.path.join(dir_path, file) for file in os.listdir(dir_path)]
+        file_paths = [path for path in file_paths if os.path.isfile(path)]
+        
+        # 读取和检测在线程池中并行进行；参数与 face_detect_demo 相同（灰度图上直接检测，不做均衡化）
+        detector = get_detector("data/models/haarcascade_frontalface_default.xml")
+        for i, gray, rects in detector.detect_batch(file_paths, workers=workers, scale_factor=1.2, min_neighbors=6,
+                                                    min_size=(0, 0), equalize=False):
+            if gray is None or len(rects) == 0:
+                continue
+            
+            # 取最大的人脸
+            x, y, w, h = max(rects, key=lambda r: r[2] * r[3])
+            face = gray[y:y+h, x:x+w]
+            file = os.path.basename(file_paths[i])
+            
+            # 保存检测到的人脸图片
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"{person_name}_{timestamp}_{i:03d}.jpg"
+            save_path = os.path.join(user_dir, filename)
+            cv2.imwrite(save_path, face)
+            saved_images.append(save_path)
+            
+            # 预处理人脸（调整大小）
+            processed_face = cv2.resize(face, (150, 150))
+            faces.append(processed_face)
+            print(f"成功处理: {file} -> {filename}")
         
         print(f"从目录收集到 {len(faces)} 个样本，保存了 {len(saved_images)} 张图片")
         return faces, saved_images
@@ -160,44 +165,17 @@ class UnifiedFaceTrainer:
         
         print(f"\n总共收集到 {len(all_faces)} 个样本，{len(all_names)} 个用户")
         
-        # 创建标签映射
-        unique_names = list(set(all_labels))
-        name_to_id = {name: i for i, name in enumerate(unique_names)}
-        
-        # 转换标签为数字ID
-        numeric_labels = [name_to_id[name] for name in all_labels]
-        
-        # 转换为numpy数组
-        images = np.array(all_faces)
-        labels = np.array(numeric_labels)
-        
+        # 逐个用户增量录入，模型中的其他用户保持不变
         print(f"开始训练模型...")
-        print(f"图像数量: {len(images)}, 标签数量: {len(labels)}")
-        print(f"标签映射: {name_to_id}")
-        
-        # 训练模型
         try:
-            recognizer = cv2.face.LBPHFaceRecognizer_create()
-            recognizer.train(images, labels)
-            
-            # 保存模型
-            model_path = "data/models/face_recognizer.yml"
-            os.makedirs(os.path.dirname(model_path), exist_ok=True)
-            recognizer.write(model_path)
-            
-            # 保存标签映射
-            import pickle
-            label_map_path = model_path.replace('.yml', '_labels.pkl')
-            label_data = {
-                'name_to_id': name_to_id,
-                'id_to_name': {i: name for name, i in name_to_id.items()}
-            }
-            with open(label_map_path, 'wb') as f:
-                pickle.dump(label_data, f)
+            for person_name in dict.fromkeys(all_names):
+                faces = [face for face, label in zip(all_faces, all_labels) if label == person_name]
+                if not self.face_recognizer.enroll_user(person_name, faces):
+                    print(f"❌ 训练失败: {person_name}")
+                    return False
             
             print(f"✅ 训练完成！")
-            print(f"模型已保存: {model_path}")
-            print(f"标签映射已保存: {label_map_path}")
+            print(f"模型已保存: {self.face_recognizer.store.root_dir}")
             
             return True
             
@@ -209,9 +187,9 @@ class UnifiedFaceTrainer:
         """从摄像头训练模型"""
         print(f"开始从摄像头收集 {person_name} 的训练样本...")
         
-        # 启动摄像头
-        camera = cv2.VideoCapture(0)
-        if not camera.isOpened():
+        # 启动摄像头（或配置中的录像/图片目录）
+        camera = create_frame_source()
+        if not camera.open():
             print("无法打开摄像头")
             return False
         
@@ -283,18 +261,10 @@ class UnifiedFaceTrainer:
         return filepath
     
     def train_single_person(self, person_name, samples):
-        """训练单个人员的模型"""
+        """训练单个人员的模型（增量录入，不影响其他用户）"""
         print(f"开始训练 {person_name} 的识别模型...")
         
-        # 清空之前的训练数据
-        self.face_recognizer.clear_training_data()
-        
-        # 添加所有样本
-        for sample in samples:
-            self.face_recognizer.add_training_sample(sample, person_name)
-        
-        # 训练模型
-        success = self.face_recognizer.train()
+        success = self.face_recognizer.enroll_user(person_name, samples)
         
         if success:
             print(f"{person_name} 训练完成！")
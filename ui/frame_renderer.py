@@ -0,0 +1,70 @@
+"""
+摄像头预览的绘制路径
+
+原来每帧：BGR整帧构造QImage → rgbSwapped()整帧复制 → QPixmap → SmoothTransformation缩放，
+整帧的复制和平滑缩放比检测本身还慢。这里先用cv2把画面一次缩放到标签大小，写入复用的缓冲区，
+再转换到复用的RGB缓冲区并按其行跨度直接包装成QImage（不复制），只在最后生成QPixmap时复制一次缩小后的图像。
+"""
+
+import cv2
+import numpy as np
+
+
+class FrameRenderer:
+    """把BGR/灰度帧缩放到目标尺寸并转换为QPixmap，缓冲区在尺寸不变时复用"""
+
+    def __init__(self, interpolation=cv2.INTER_LINEAR):
+        """
+        Args:
+            interpolation: cv2缩放方式，实时预览用INTER_LINEAR即可，INTER_NEAREST更快
+        """
+        self.interpolation = interpolation
+        self._scaled = None  # 缩放后的BGR图像
+        self._rgb = None  # 交给QImage的RGB图像
+
+    @staticmethod
+    def fit_size(frame_size, target_size):
+        """保持宽高比缩放到目标尺寸内，返回 (宽, 高, 缩放比例)"""
+        width, height = frame_size
+        target_width, target_height = target_size
+        scale = min(target_width / width, target_height / height)
+        return max(1, int(width * scale)), max(1, int(height * scale)), scale
+
+    @staticmethod
+    def _buffer(buffer, shape):
+        if buffer is None or buffer.shape != shape:
+            buffer = np.empty(shape, dtype=np.uint8)
+        return buffer
+
+    def prepare(self, frame, target_size, draw=None):
+        """缩放并转换为RGB，返回复用的RGB缓冲区
+
+        Args:
+            frame: BGR或灰度图像
+            target_size: 目标区域 (宽, 高)，保持宽高比缩放到其内部
+            draw: 可选的 draw(image, scale) 回调，在缩放后的BGR图像上绘制标注，不修改原始帧
+        """
+        height, width = frame.shape[:2]
+        out_width, out_height, scale = self.fit_size((width, height), target_size)
+        if frame.ndim == 2:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+
+        self._scaled = self._buffer(self._scaled, (out_height, out_width, 3))
+        cv2.resize(frame, (out_width, out_height), dst=self._scaled, interpolation=self.interpolation)
+        if draw is not None:
+            draw(self._scaled, scale)
+
+        self._rgb = self._buffer(self._rgb, (out_height, out_width, 3))
+        cv2.cvtColor(self._scaled, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        return self._rgb
+
+    def render(self, frame, target_size, draw=None):
+        """返回可以直接显示在QLabel上的QPixmap，参数同prepare"""
+        # PyQt5只在生成QPixmap时导入，缩放和转换部分不依赖Qt
+        from PyQt5.QtGui import QImage, QPixmap
+
+        rgb = self.prepare(frame, target_size, draw)
+        height, width = rgb.shape[:2]
+        # QImage直接引用缓冲区内存（按实际行跨度），QPixmap.fromImage时才复制
+        image = QImage(rgb.data, width, height, rgb.strides[0], QImage.Format_RGB888)
+        return QPixmap.fromImage(image)
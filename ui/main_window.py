@@ -1,20 +1,25 @@
 import cv2
 import numpy as np
-import time
 from datetime import datetime, timedelta
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                              QPushButton, QLabel, QTableWidget, QTableWidgetItem,
                              QTabWidget, QGroupBox, QMessageBox, QInputDialog, QDialog,
                              QMenu, QComboBox) # Added QSizePolicy
-from PyQt5.QtCore import QTimer, QThread, pyqtSignal, Qt
-from PyQt5.QtGui import QPixmap, QImage
+from PyQt5.QtCore import QTimer, QThread, QObject, Qt, pyqtSignal
 import os # Added for file system operations
 
 # 使用绝对导入
-from face_recognition.face_detector import FaceDetector
-from face_recognition.face_recognizer import FaceRecognizer
+from face_recognition.cascade_registry import get_detector
+from face_recognition.pipeline import create_face_recognizer, create_pipeline
 from database.database_manager import DatabaseManager
 from serial_communication import SerialCommunication
+from utils.config import config
+from utils.logger import get_logger
+from utils.frame_buffer import FrameBuffer
+from utils.frame_source import create_frame_source
+from ui.frame_renderer import FrameRenderer
+
+logger = get_logger(__name__)
 
 class TrainingDialog(QDialog):
     """人脸训练对话框"""
@@ -29,6 +34,7 @@ class TrainingDialog(QDialog):
         self.samples = []
         self.saved_images = []  # 保存的图片路径
         self.camera = None
+        self.frame_renderer = FrameRenderer()
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_camera_frame)
         
@@ -114,8 +120,9 @@ class TrainingDialog(QDialog):
     
     def start_camera(self):
         """启动摄像头"""
-        self.camera = cv2.VideoCapture(0)
-        if not self.camera.isOpened():
+        self.camera = create_frame_source()
+        if not self.camera.open():
+            self.camera = None
             QMessageBox.critical(self, "错误", "无法打开摄像头！")
             return
         
@@ -142,16 +149,9 @@ class TrainingDialog(QDialog):
                     cv2.putText(frame, "Face Detected", (x, y-10), 
                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
                 
-                # 转换帧格式并显示
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                h, w, ch = rgb_frame.shape
-                bytes_per_line = ch * w
-                qt_image = QImage(rgb_frame.data, w, h, bytes_per_line, QImage.Format_RGB888)
-                pixmap = QPixmap.fromImage(qt_image)
-                
-                # 调整大小以适应标签
-                scaled_pixmap = pixmap.scaled(self.camera_label.size(), Qt.KeepAspectRatio)
-                self.camera_label.setPixmap(scaled_pixmap)
+                # 缩放到标签大小并显示
+                pixmap = self.frame_renderer.render(frame, (self.camera_label.width(), self.camera_label.height()))
+                self.camera_label.setPixmap(pixmap)
     
     def capture_sample(self):
         """采集样本"""
@@ -208,12 +208,8 @@ class TrainingDialog(QDialog):
             # 保存训练数据到数据库
             self.save_training_data_to_db()
             
-            # 添加训练样本到识别器
-            for sample in self.samples:
-                self.face_recognizer.add_training_sample(sample, self.user_name)
-            
-            # 开始训练
-            success = self.face_recognizer.train()
+            # 增量录入该用户，不影响已训练的其他用户
+            success = self.face_recognizer.enroll_user(self.user_name, self.samples)
             
             if success:
                 QMessageBox.information(self, "成功", f"用户 {self.user_name} 的人脸识别模型训练成功！")
@@ -351,32 +347,36 @@ class UserEditDialog(QDialog):
             QMessageBox.critical(self, "错误", f"修改失败: {e}")
 
 class CameraThread(QThread):
-    frame_ready = pyqtSignal(np.ndarray)
+    """采集线程：帧写入FrameBuffer（只保留最新帧），由界面定时取最新一帧，不在事件队列里堆积"""
     
-    def __init__(self, camera_id=0):
+    def __init__(self, frame_source=None, frame_buffer=None):
         super().__init__()
-        self.camera_id = camera_id
+        self.frame_source = frame_source or create_frame_source()
+        self.frame_buffer = frame_buffer or FrameBuffer()
         self.running = False
-        self.cap = None
     
     def run(self):
-        self.cap = cv2.VideoCapture(self.camera_id)
-        if not self.cap.isOpened():
+        if not self.frame_source.open():
             return
         
+        # 摄像头按自身帧率出帧，回放来源自己控制播放速度，读取后不再额外等待
         self.running = True
-        while self.running:
-            ret, frame = self.cap.read()
+        while self.running and self.frame_source.isOpened():
+            ret, frame = self.frame_source.read()
             if ret:
-                self.frame_ready.emit(frame)
-            self.msleep(30)
+                self.frame_buffer.put(frame)
+            else:
+                self.msleep(30)
+        self.frame_source.release()
     
     def stop(self):
         self.running = False
-        if self.cap:
-            self.cap.release()
         self.wait()
 
+class RecognitionResultBridge(QObject):
+    """识别流水线在工作线程中产生结果，通过信号转到界面线程处理"""
+    result_ready = pyqtSignal(object)
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -397,20 +397,32 @@ class MainWindow(QMainWindow):
         self.daily_refresh_timer.timeout.connect(self.check_daily_refresh)
         self.start_daily_refresh_timer()
         
-        self.face_detector = FaceDetector()
-        self.face_recognizer = FaceRecognizer()
+        self.face_detector = get_detector(config.get('face_detection.model_path'))
+        
+        self.face_recognizer = create_face_recognizer(config)
+        # 其他进程（如train_faces.py）重新训练后，在后台线程加载新模型并整体替换，不阻塞界面
+        self.face_recognizer.start_watching()
         
         # 串口通信
         self.serial_comm = SerialCommunication()
         
-        # 摄像头线程
+        # 摄像头线程；界面每30ms从缓冲区取最新一帧，处理不过来时丢弃旧帧而不是排队
         self.camera_thread = None
+        self.frame_buffer = FrameBuffer(capacity=1)
+        self.last_frame_seq = 0
+        self.frame_timer = QTimer()
+        self.frame_timer.timeout.connect(self.poll_camera_frame)
         self.current_frame = None
+        self.frame_renderer = FrameRenderer()
         self.is_recognition_active = False
         
-        # 添加识别控制变量
-        self.last_recognition_time = 0
-        self.recognition_interval = 0.5  # 每0.5秒识别一次，减少卡顿
+        # 检测、识别、数据库查询和串口切换用户都在后台流水线中进行，界面线程只显示画面和结果
+        self.recognition_pipeline = create_pipeline(config, self.frame_buffer, self.face_recognizer, self.db_manager,
+                                                    self.serial_comm)
+        self.result_bridge = RecognitionResultBridge()
+        self.result_bridge.result_ready.connect(self.on_recognition_result)
+        self.recognition_pipeline.on_result = self.result_bridge.result_ready.emit
+        self.last_result = None  # 最近一次识别结果，绘制在之后的每一帧上
         
         # 当前识别的用户信息
         self.current_user_info = None
@@ -739,9 +751,12 @@ class MainWindow(QMainWindow):
     
     def start_camera(self):
         if self.camera_thread is None or not self.camera_thread.isRunning():
-            self.camera_thread = CameraThread(0)
-            self.camera_thread.frame_ready.connect(self.on_frame_ready)
+            self.frame_buffer.clear()
+            self.camera_thread = CameraThread(create_frame_source(), self.frame_buffer)
             self.camera_thread.start()
+            self.frame_timer.start(30)
+            if self.is_recognition_active:
+                self.recognition_pipeline.start()
             
             self.start_camera_btn.setEnabled(False)
             self.stop_camera_btn.setEnabled(True)
@@ -751,6 +766,9 @@ class MainWindow(QMainWindow):
     
     def stop_camera(self):
         if self.camera_thread and self.camera_thread.isRunning():
+            self.frame_timer.stop()
+            self.recognition_pipeline.stop()
+            self.last_result = None
             self.camera_thread.stop()
             self.camera_thread.wait()
             self.camera_thread = None
@@ -765,157 +783,115 @@ class MainWindow(QMainWindow):
             self.camera_label.setText("摄像头未启动")
             self.camera_label.setStyleSheet("border: 2px solid gray; background-color: black; color: white;")
     
+    def poll_camera_frame(self):
+        """取缓冲区中的最新一帧，没有新帧时直接返回"""
+        latest = self.frame_buffer.latest(after=self.last_frame_seq, consumer='display')
+        if latest is None:
+            return
+        self.last_frame_seq, _, frame = latest
+        self.on_frame_ready(frame)
+        
+        if self.last_frame_seq % 300 == 0:
+            logger.debug("摄像头帧统计: %s", self.frame_buffer.stats())
+    
     def on_frame_ready(self, frame):
         self.current_frame = frame
         
-        if self.is_recognition_active:
-            self.process_frame_for_recognition(frame)
+        # 预览按摄像头帧率刷新，只在缩放后的画面上叠加最近一次的识别结果（帧与流水线共享，不能修改）
+        result = self.last_result if self.is_recognition_active else None
+        if result is not None:
+            self.display_frame(frame, lambda image, scale: self.draw_recognition_result(image, result, scale))
         else:
             self.display_frame(frame)
     
-    def display_frame(self, frame):
+    def display_frame(self, frame, draw=None):
         if frame is None:
             return
         
-        height, width, channel = frame.shape
-        bytes_per_line = 3 * width
-        q_image = QImage(frame.data, width, height, bytes_per_line, QImage.Format_RGB888).rgbSwapped()
-        
-        pixmap = QPixmap.fromImage(q_image)
-        scaled_pixmap = pixmap.scaled(self.camera_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        
-        self.camera_label.setPixmap(scaled_pixmap)
+        # 用cv2一次缩放到标签大小，写入复用的缓冲区后直接包装成QImage
+        pixmap = self.frame_renderer.render(frame, (self.camera_label.width(), self.camera_label.height()), draw)
+        self.camera_label.setPixmap(pixmap)
     
-    def process_frame_for_recognition(self, frame):
-        if frame is None:
-            return
-        
-        current_time = time.time()
-        
-        # 控制识别频率，减少卡顿
-        if current_time - self.last_recognition_time < self.recognition_interval:
-            # 如果距离上次识别时间太短，只显示画面，不进行识别
-            self.display_frame(frame)
+    def draw_recognition_result(self, frame, result, scale=1.0):
+        """在画面上绘制识别结果，最大人脸投票未完成时用黄色框；scale为画面相对原始帧的缩放比例"""
+        for i, (face, (name, confidence, decided)) in enumerate(zip(result.faces, result.results)):
+            x, y, w, h = (int(v * scale) for v in face)
+            if i == result.largest_index and not decided:
+                # 投票尚未完成 - 黄色框
+                color, label = (0, 255, 255), f"{name}?"
+            elif name and name != "Unknown":
+                # 已知人脸 - 绿色框
+                color, label = (0, 255, 0), f"{name} ({confidence:.2f})"
+            else:
+                # 未知人脸 - 红色框
+                color, label = (0, 0, 255), "Unknown"
+            cv2.rectangle(frame, (x, y), (x+w, y+h), color, 2)
+            cv2.putText(frame, label, (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+    
+    def on_recognition_result(self, result):
+        """在界面线程中显示识别流水线的结果"""
+        if not self.is_recognition_active:
             return
+        self.last_result = result
         
-        # 更新识别时间
-        self.last_recognition_time = current_time
-        
-        # 缩小图像尺寸，提高检测速度
-        small_frame = cv2.resize(frame, (0, 0), fx=0.5, fy=0.5)
-        
-        # 人脸检测
-        faces = self.face_detector.detect_faces(small_frame)
-        
-        if len(faces) > 0:
-            # 将检测结果转换回原始尺寸
-            faces = [(int(x*2), int(y*2), int(w*2), int(h*2)) for (x, y, w, h) in faces]
-            
-            # 获取最大的人脸
-            largest_face = max(faces, key=lambda x: x[2] * x[3])
-            x, y, w, h = largest_face
-            
-            # 提取人脸区域，增加边界确保完整
-            margin = int(min(w, h) * 0.1)  # 10%的边界
-            y1 = max(0, y - margin)
-            y2 = min(frame.shape[0], y + h + margin)
-            x1 = max(0, x - margin)
-            x2 = min(frame.shape[1], x + w + margin)
-            
-            face_roi = frame[y1:y2, x1:x2]
+        if result.status == 'no_face':
+            self.sugar_added_label.setText("未检测到人脸")
+            self.sugar_added_label.setStyleSheet("color: orange; font-size: 16px; font-weight: bold;")
             
-            # 进行人脸识别
-            name, confidence = self.face_recognizer.recognize_face(face_roi)
-            
-            # 调试信息
-            print(f"检测到人脸: {x}, {y}, {w}, {h}")
-            print(f"识别结果: name={name}, confidence={confidence}")
+            # 清除当前用户信息
+            self.current_user_info = None
+            self.user_info_label.setText("用户信息: 未检测到人脸")
+            self.user_info_label.setStyleSheet("color: orange; font-weight: bold;")
+            self.health_info_label.setText("健康信息: 未检测到人脸")
+            self.health_info_label.setStyleSheet("color: orange; font-weight: bold;")
+        elif result.status == 'pending':
+            # 投票尚未完成，保持当前用户不变
+            self.sugar_added_label.setText("识别中...")
+            self.sugar_added_label.setStyleSheet("color: orange; font-size: 16px; font-weight: bold;")
+        elif result.status == 'known':
+            self.sugar_added_label.setText(f"识别到: {result.name}")
+            self.sugar_added_label.setStyleSheet("color: green; font-size: 16px; font-weight: bold;")
             
-            if name and name != "Unknown":
-                # 已知人脸 - 绿色框
-                cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-                cv2.putText(frame, f"{name} ({confidence:.2f})", 
-                           (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                
-                        self.sugar_added_label.setText(f"识别到: {name}")
-        self.sugar_added_label.setStyleSheet("color: green; font-size: 16px; font-weight: bold;")
-                
-                # 获取用户信息
-                self.current_user_info = self.db_manager.get_user_by_name(name)
+            # 身份变化时流水线已查询数据库并切换串口当前用户，这里只更新显示
+            if result.identity_changed:
+                self.current_user_info = result.user_info
                 if self.current_user_info:
-                    # 设置当前用户到串口通信模块
-                    self.serial_comm.set_current_user(self.current_user_info[0], self.current_user_info[1])
-                    
                     self.user_info_label.setText(f"用户信息: {self.current_user_info[1]} (ID: {self.current_user_info[0]})")
                     self.user_info_label.setStyleSheet("color: green; font-weight: bold;")
                     
-                    # 获取健康记录 - 每次都重新获取最新数据
-                    try:
-                        print(f"=== 开始获取用户 {self.current_user_info[1]} 的健康信息 ===")
-                        
-                        # 强制刷新数据库连接，获取最新数据
-                        health_records = self.db_manager.get_health_records(self.current_user_info[0])
-                        print(f"获取到 {len(health_records)} 条健康记录")
-                        
-                        if health_records:
-                            latest_record = health_records[-1]
-                            # 确保显示的是最新的糖量数据
-                            current_sugar = latest_record[3]
-                            current_limit = latest_record[4]
-                            
-                            print(f"最新记录: ID={latest_record[0]}, 用户ID={latest_record[1]}, 日期={latest_record[2]}, 糖量={latest_record[3]}, 限制={latest_record[4]}")
-                            print(f"显示数据: 糖量={current_sugar:.2f}g, 限制={current_limit:.2f}g")
-                            
-                            self.health_info_label.setText(f"健康信息: 今日糖分摄入: {current_sugar:.2f}g, 今日糖分限制: {current_limit:.2f}g")
-                            self.health_info_label.setStyleSheet("color: green; font-weight: bold;")
-                            
-                            print(f"✅ 界面已更新: 用户 {self.current_user_info[1]} 糖量 {current_sugar:.2f}g, 限制 {current_limit:.2f}g")
-                        else:
-                            print("❌ 没有找到健康记录")
-                            self.health_info_label.setText("健康信息: 无健康记录")
-                            self.health_info_label.setStyleSheet("color: orange; font-weight: bold;")
-                    except Exception as e:
-                        print(f"❌ 获取健康记录失败: {e}")
+                    if result.error:
                         self.health_info_label.setText("健康信息: 获取失败")
                         self.health_info_label.setStyleSheet("color: red; font-weight: bold;")
+                    elif result.health_record:
+                        current_sugar = result.health_record[3]
+                        current_limit = result.health_record[4]
+                        self.health_info_label.setText(f"健康信息: 今日糖分摄入: {current_sugar:.2f}g, 今日糖分限制: {current_limit:.2f}g")
+                        self.health_info_label.setStyleSheet("color: green; font-weight: bold;")
+                        logger.debug("✅ 界面已更新: 用户 %s 糖量 %.2fg, 限制 %.2fg", self.current_user_info[1], current_sugar, current_limit)
+                    else:
+                        self.health_info_label.setText("健康信息: 无健康记录")
+                        self.health_info_label.setStyleSheet("color: orange; font-weight: bold;")
                 else:
                     self.user_info_label.setText("用户信息: 未知用户")
                     self.user_info_label.setStyleSheet("color: orange; font-weight: bold;")
                     self.health_info_label.setText("健康信息: 未知用户")
                     self.health_info_label.setStyleSheet("color: orange; font-weight: bold;")
-            else:
-                # 未知人脸 - 红色框
-                cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 0, 255), 2)
-                cv2.putText(frame, "Unknown", (x, y-10), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-                        self.sugar_added_label.setText("未识别到已知人脸")
-        self.sugar_added_label.setStyleSheet("color: red; font-size: 16px; font-weight: bold;")
-                
-                # 清除当前用户信息
+        else:
+            self.sugar_added_label.setText("未识别到已知人脸")
+            self.sugar_added_label.setStyleSheet("color: red; font-size: 16px; font-weight: bold;")
+            
+            # 清除当前用户信息
+            if result.identity_changed:
                 self.current_user_info = None
-                self.serial_comm.clear_current_user()
-                
                 self.user_info_label.setText("用户信息: 未知用户")
                 self.user_info_label.setStyleSheet("color: orange; font-weight: bold;")
                 self.health_info_label.setText("健康信息: 未知用户")
                 self.health_info_label.setStyleSheet("color: orange; font-weight: bold;")
-            
-            self.display_frame(frame)
-        else:
-            self.display_frame(frame)
-                    self.sugar_added_label.setText("未检测到人脸")
-        self.sugar_added_label.setStyleSheet("color: orange; font-size: 16px; font-weight: bold;")
-            
-            # 清除当前用户信息
-            self.current_user_info = None
-            self.serial_comm.clear_current_user()
-            
-            self.user_info_label.setText("用户信息: 未检测到人脸")
-            self.user_info_label.setStyleSheet("color: orange; font-weight: bold;")
-            self.health_info_label.setText("健康信息: 未检测到人脸")
-            self.health_info_label.setStyleSheet("color: orange; font-weight: bold;")
+    
     def start_recognition(self):
         self.is_recognition_active = True
+        self.last_result = None
+        self.recognition_pipeline.start()
         self.start_recognition_btn.setEnabled(False)
         self.stop_recognition_btn.setEnabled(True)
         self.status_label.setText("人脸识别已启动")
@@ -924,6 +900,8 @@ class MainWindow(QMainWindow):
     def stop_recognition(self):
         """停止人脸识别"""
         if self.camera_thread and self.camera_thread.isRunning():
+            self.frame_timer.stop()
+            self.recognition_pipeline.stop()
             self.camera_thread.stop()
             self.camera_thread.wait()
             self.camera_thread = None
@@ -955,6 +933,7 @@ class MainWindow(QMainWindow):
         
         # 清除当前用户信息
         self.current_user_info = None
+        self.last_result = None
         
         # 清除串口通信中的当前用户
         if hasattr(self, 'serial_comm') and self.serial_comm:
@@ -1037,8 +1016,7 @@ class MainWindow(QMainWindow):
             # 创建训练对话框
             training_dialog = TrainingDialog(self.face_detector, self.face_recognizer, self.db_manager, user_id, user_name, self)
             if training_dialog.exec_() == QDialog.Accepted:
-                # 训练成功后，重新加载识别器
-                self.face_recognizer.load_model()
+                # 识别器在录入时已经更新了内存中的特征库，无需重新加载模型
                 QMessageBox.information(self, "成功", f"用户 {user_name} 训练完成！现在可以进行人脸识别了。")
             
         except Exception as e:
@@ -1235,6 +1213,9 @@ class MainWindow(QMainWindow):
         if reply == QMessageBox.Yes:
             try:
                 if self.db_manager.delete_user(user_id):
+                    # 同时从识别模型中移除该用户的样本
+                    if user_name in self.face_recognizer.get_known_faces():
+                        self.face_recognizer.remove_user(user_name)
                     QMessageBox.information(self, "成功", f"用户 '{user_name}' 已删除！")
                     self.load_users_data()  # 刷新表格
                 else:
@@ -1470,13 +1451,8 @@ class MainWindow(QMainWindow):
                 # 获取今日健康记录
                 health_record = self.db_manager.get_user_health_today(user_id)
                 if health_record:
-                    # 重置今日糖分摄入量为0
-                    cursor = self.db_manager.conn.cursor()
-                    cursor.execute(
-                        "UPDATE health_records SET sugar_intake = 0.0 WHERE id = ?",
-                        (health_record[0],)
-                    )
-                    self.db_manager.conn.commit()
+                    # 重置今日糖分摄入量为0（经过DatabaseManager，同时使缓存失效）
+                    self.db_manager.update_health_record_sugar(health_record[0], 0.0)
                     print(f"用户 {user[1]} (ID: {user_id}) 的糖分摄入量已重置为0")
             
             # 重新设置下次刷新时间（24小时后）
@@ -1487,6 +1463,8 @@ class MainWindow(QMainWindow):
             print(f"每日糖量数据刷新失败: {e}")
     
     def closeEvent(self, event):
+        self.frame_timer.stop()
+        self.recognition_pipeline.stop(reset=False)
         if self.camera_thread and self.camera_thread.isRunning():
             self.camera_thread.stop()
         
@@ -1494,4 +1472,6 @@ class MainWindow(QMainWindow):
         if self.serial_comm:
             self.serial_comm.stop()
         
+        self.face_recognizer.close()
+        
         event.accept()
\ No newline at end of file
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+摄像头与消费者之间的有界帧缓冲区
+
+采集线程只管写入，缓冲区满时丢弃最旧的帧；消费者每次只取最新的一帧。
+识别变慢时不会有帧在事件队列里越积越多，延迟和内存都有上限。
+每帧带递增的序号和采集时间，跳过未处理的帧计入丢帧数。
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class FrameBuffer:
+    """丢弃最旧帧的环形缓冲区（默认只保留一帧）
+
+    可以有多个消费者（如界面预览和识别流水线）：每个消费者按名字记录自己取到的最后一帧、
+    取走和丢弃的帧数，互不影响。
+    """
+
+    def __init__(self, capacity=1):
+        self.capacity = capacity
+        self._frames = deque(maxlen=capacity)  # [(序号, 采集时间, 帧), ...]
+        self._condition = threading.Condition()
+        self._closed = False
+        self.produced = 0  # 写入的帧数，也是最新一帧的序号
+        # 消费者名 -> {'last_taken': 取到的最后一帧序号, 'consumed': 取走的帧数,
+        #              'dropped': 没有被该消费者取到就被覆盖或跳过的帧数, 'latency': 最近一帧从采集到被取走的时间（秒）}
+        self._consumers = {}
+
+    def _consumer(self, name):
+        state = self._consumers.get(name)
+        if state is None:
+            # 新的消费者从取到的第一帧开始计数，之前的帧不算丢弃
+            state = {'last_taken': None, 'consumed': 0, 'dropped': 0, 'latency': 0.0}
+            self._consumers[name] = state
+        return state
+
+    def put(self, frame, timestamp=None):
+        """写入一帧，返回它的序号"""
+        with self._condition:
+            self.produced += 1
+            self._frames.append((self.produced, time.time() if timestamp is None else timestamp, frame))
+            self._condition.notify_all()
+            return self.produced
+
+    def latest(self, after=None, timeout=0, consumer='default'):
+        """取最新的一帧
+
+        Args:
+            after: 只返回序号大于该值的帧（已处理过的最后一帧序号），None表示不限制
+            timeout: 没有新帧时最多等待的秒数，0表示不等待，None表示一直等待
+            consumer: 消费者名，取走和丢弃的帧数按消费者分别统计
+
+        Returns:
+            (序号, 采集时间, 帧)，没有新帧或缓冲区已关闭时返回None
+        """
+        with self._condition:
+            def ready():
+                return self._closed or (self._frames and (after is None or self._frames[-1][0] > after))
+
+            if timeout != 0 and not self._condition.wait_for(ready, timeout):
+                return None
+            if self._closed or not ready():
+                return None
+
+            state = self._consumer(consumer)
+            seq, timestamp, frame = self._frames[-1]
+            if state['last_taken'] is None:
+                state['consumed'] += 1
+                state['last_taken'] = seq
+            elif seq > state['last_taken']:
+                state['dropped'] += seq - state['last_taken'] - 1
+                state['consumed'] += 1
+                state['last_taken'] = seq
+            state['latency'] = time.time() - timestamp
+            return seq, timestamp, frame
+
+    def stats(self):
+        """写入的帧数，以及每个消费者取走、丢弃的帧数和最近一帧的延迟（毫秒）"""
+        with self._condition:
+            stats = {'produced': self.produced}
+            for name, state in self._consumers.items():
+                stats[name] = {
+                    'consumed': state['consumed'],
+                    'dropped': state['dropped'],
+                    'latency_ms': state['latency'] * 1000,
+                }
+            return stats
+
+    def clear(self):
+        """清空缓冲区中的帧（计数保留，清空前未取走的帧不计入丢弃）"""
+        with self._condition:
+            self._frames.clear()
+            for state in self._consumers.values():
+                state['last_taken'] = self.produced
+
+    def close(self):
+        """关闭缓冲区，唤醒所有等待的消费者；之后 latest 总是返回None"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def reopen(self):
+        """重新启用已关闭的缓冲区"""
+        with self._condition:
+            self._closed = False
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+帧来源：摄像头、录像文件、图片目录
+
+接口与 cv2.VideoCapture 相同（open/read/isOpened/release），采集线程和训练代码不关心帧从哪里来。
+- CameraSource：摄像头，按配置设置分辨率、帧率、FOURCC和驱动缓冲区大小
+- VideoFileSource：录像文件回放
+- ImageSequenceSource：按文件名顺序回放目录中的图片
+回放来源可以按原始帧率实时播放（realtime=True，与摄像头行为一致），也可以尽快读取（用于基准测试）。
+配置 camera.source 为录像文件或图片目录时，界面和训练脚本就在录像上运行，便于无摄像头地测试整条识别流程。
+"""
+
+import os
+import time
+from abc import ABC, abstractmethod
+
+import cv2
+
+from utils.config import config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+class FrameSource(ABC):
+    """帧来源基类"""
+
+    fps = 0.0
+
+    @abstractmethod
+    def open(self):
+        """打开来源，成功返回True"""
+
+    @abstractmethod
+    def read(self):
+        """读取下一帧，返回 (ret, frame)；来源结束后isOpened()变为False"""
+
+    @abstractmethod
+    def isOpened(self):
+        """来源是否处于打开状态"""
+
+    def release(self):
+        pass
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class _Pacer:
+    """按帧率控制回放速度"""
+
+    def __init__(self, fps, realtime):
+        self.interval = 1.0 / fps if realtime and fps > 0 else 0.0
+        self.next_time = None
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.time()
+        if self.next_time is None or now - self.next_time > self.interval:
+            # 第一帧或读取方落后太多时重新计时，不连续补帧
+            self.next_time = now
+        elif self.next_time > now:
+            time.sleep(self.next_time - now)
+        self.next_time += self.interval
+
+
+class CameraSource(FrameSource):
+    """摄像头"""
+
+    def __init__(self, device_id=0, width=None, height=None, fps=None, fourcc=None, buffer_size=None):
+        """
+        Args:
+            device_id: 摄像头设备ID
+            width/height: 分辨率，None表示使用摄像头默认值
+            fps: 帧率，None表示使用摄像头默认值
+            fourcc: 像素格式，如 'MJPG'（USB摄像头在高分辨率下帧率更高），None或空表示默认
+            buffer_size: 驱动缓冲区帧数，1可以减少画面延迟（并非所有后端都支持）
+        """
+        self.device_id = device_id
+        self.width = width
+        self.height = height
+        self.fps = fps or 0.0
+        self.fourcc = fourcc
+        self.buffer_size = buffer_size
+        self.capture = None
+
+    def open(self):
+        self.capture = cv2.VideoCapture(self.device_id)
+        if not self.capture.isOpened():
+            logger.error("无法打开摄像头 %s", self.device_id)
+            return False
+
+        # FOURCC需要在分辨率之前设置，部分驱动切换格式时会重置分辨率
+        if self.fourcc:
+            self.capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+        if self.width:
+            self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        if self.height:
+            self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        if self.fps:
+            self.capture.set(cv2.CAP_PROP_FPS, self.fps)
+        if self.buffer_size:
+            self.capture.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size)
+
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or self.fps
+        logger.info("摄像头 %s 已打开: %sx%s @ %sfps", self.device_id, int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                    int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT)), self.fps)
+        return True
+
+    def read(self):
+        if self.capture is None:
+            return False, None
+        return self.capture.read()
+
+    def isOpened(self):
+        return self.capture is not None and self.capture.isOpened()
+
+    def release(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+
+class VideoFileSource(FrameSource):
+    """录像文件回放"""
+
+    def __init__(self, path, realtime=True, loop=False):
+        """
+        Args:
+            path: 录像文件路径
+            realtime: True按录像帧率播放，False尽快读取
+            loop: 播放结束后是否从头开始
+        """
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self.capture = None
+        self.pacer = None
+
+    def open(self):
+        self.capture = cv2.VideoCapture(self.path)
+        if not self.capture.isOpened():
+            logger.error("无法打开录像文件: %s", self.path)
+            self.capture = None
+            return False
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        self.pacer = _Pacer(self.fps, self.realtime)
+        logger.info("回放录像 %s (%s帧, %.1ffps, %s)", self.path, int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT)),
+                    self.fps, "实时" if self.realtime else "尽快")
+        return True
+
+    def read(self):
+        if self.capture is None:
+            return False, None
+        ret, frame = self.capture.read()
+        if not ret and self.loop:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.capture.read()
+        if not ret:
+            self.release()
+            return False, None
+        self.pacer.wait()
+        return True, frame
+
+    def isOpened(self):
+        return self.capture is not None
+
+    def release(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+
+class ImageSequenceSource(FrameSource):
+    """按文件名顺序回放目录中的图片"""
+
+    def __init__(self, directory, fps=30.0, realtime=True, loop=False):
+        """
+        Args:
+            directory: 图片目录
+            fps: 实时播放时的帧率
+            realtime: True按fps播放，False尽快读取
+            loop: 播放结束后是否从头开始
+        """
+        self.directory = directory
+        self.fps = fps
+        self.realtime = realtime
+        self.loop = loop
+        self.paths = None
+        self.index = 0
+        self.pacer = None
+
+    def open(self):
+        if not os.path.isdir(self.directory):
+            logger.error("图片目录不存在: %s", self.directory)
+            return False
+        self.paths = sorted(os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                            if name.lower().endswith(IMAGE_EXTENSIONS))
+        if not self.paths:
+            logger.error("图片目录中没有图片: %s", self.directory)
+            self.paths = None
+            return False
+        self.index = 0
+        self.pacer = _Pacer(self.fps, self.realtime)
+        logger.info("回放图片目录 %s (%s张, %s)", self.directory, len(self.paths), "实时" if self.realtime else "尽快")
+        return True
+
+    def read(self):
+        failures = 0  # 连续读取失败的图片数，达到图片总数说明一整轮都没有可用的图片
+        while self.paths is not None and failures < len(self.paths):
+            if self.index >= len(self.paths):
+                if not self.loop:
+                    self.release()
+                    break
+                self.index = 0
+            path = self.paths[self.index]
+            self.index += 1
+            frame = cv2.imread(path)
+            if frame is None:
+                logger.warning("无法读取图片: %s", path)
+                failures += 1
+                continue
+            self.pacer.wait()
+            return True, frame
+        if self.paths is not None:
+            # 循环播放时避免在全部损坏的目录上空转
+            logger.error("图片目录中没有可读取的图片: %s", self.directory)
+            self.release()
+        return False, None
+
+    def isOpened(self):
+        return self.paths is not None
+
+    def release(self):
+        self.paths = None
+
+
+def create_frame_source(source=None, realtime=None, loop=None):
+    """按配置文件的 camera 部分创建帧来源（未打开）
+
+    Args:
+        source: 摄像头设备ID、录像文件路径或图片目录；None时使用 camera.source，为空时使用 camera.device_id
+        realtime: 回放时是否按原始帧率播放，None时使用 camera.realtime
+        loop: 回放结束后是否从头开始，None时使用 camera.loop
+    """
+    if source is None or source == '':
+        source = config.get('camera.source') or config.get('camera.device_id', 0)
+    realtime = config.get('camera.realtime', True) if realtime is None else realtime
+    loop = config.get('camera.loop', False) if loop is None else loop
+    fps = config.get('camera.fps', 30)
+
+    if isinstance(source, int) or str(source).isdigit():
+        return CameraSource(
+            int(source),
+            width=config.get('camera.width'),
+            height=config.get('camera.height'),
+            fps=fps,
+            fourcc=config.get('camera.fourcc'),
+            buffer_size=config.get('camera.buffer_size'),
+        )
+    if os.path.isdir(source):
+        return ImageSequenceSource(source, fps=fps, realtime=realtime, loop=loop)
+    return VideoFileSource(source, realtime=realtime, loop=loop)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志模块
+
+基于标准库logging的分级日志，所有模块的日志都挂在 face_system 根日志器下。
+- 关闭的级别几乎没有开销：消息使用 %s 延迟格式化，构造代价大的参数先用 isEnabledFor 判断
+- 采样模式：sample_rate 为 N 时，DEBUG/INFO 日志在每个调用位置每 N 条只输出 1 条，WARNING 及以上全部输出
+- 配置来自 config.yaml 的 logging 段，也可以调用 setup_logging 覆盖
+"""
+
+import logging
+import threading
+from collections import defaultdict
+
+ROOT_LOGGER_NAME = "face_system"
+DEFAULT_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+
+# 方便调用方使用 isEnabledFor(DEBUG) 而不必再导入logging
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+ERROR = logging.ERROR
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+class SamplingFilter(logging.Filter):
+    """按调用位置采样：低于 WARNING 的日志每 sample_rate 条只保留 1 条"""
+
+    def __init__(self, sample_rate=1):
+        super().__init__()
+        self.sample_rate = max(1, int(sample_rate))
+        self._counts = defaultdict(int)
+
+    def filter(self, record):
+        if self.sample_rate == 1 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.pathname, record.lineno)
+        count = self._counts[key]
+        self._counts[key] = count + 1
+        return count % self.sample_rate == 0
+
+
+def setup_logging(level="INFO", sample_rate=1, log_file=None, fmt=DEFAULT_FORMAT):
+    """配置日志输出（重复调用会替换之前的配置）
+
+    Args:
+        level: 日志级别名称或数值，如 "DEBUG"、"INFO"、"WARNING"、"OFF"
+        sample_rate: 采样率，1表示不采样
+        log_file: 日志文件路径，为None时输出到终端
+        fmt: 日志格式
+    """
+    global _configured
+
+    root = logging.getLogger(ROOT_LOGGER_NAME)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+    if isinstance(level, str):
+        level = logging.CRITICAL + 1 if level.upper() == "OFF" else logging.getLevelName(level.upper())
+    root.setLevel(level)
+    root.propagate = False
+
+    handler = logging.FileHandler(log_file, encoding="utf-8") if log_file else logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(fmt))
+    handler.addFilter(SamplingFilter(sample_rate))
+    root.addHandler(handler)
+
+    _configured = True
+    return root
+
+
+def _configure_from_config():
+    """首次获取日志器时按 config.yaml 的 logging 段配置"""
+    global _configured
+
+    with _configure_lock:
+        if _configured:
+            return
+        try:
+            from utils.config import config
+            settings = config.get("logging", {}) or {}
+        except Exception:
+            settings = {}
+        setup_logging(
+            level=settings.get("level", "INFO"),
+            sample_rate=settings.get("sample_rate", 1),
+            log_file=settings.get("file"),
+        )
+
+
+def get_logger(name):
+    """获取模块日志器，如 get_logger(__name__)"""
+    if not _configured:
+        _configure_from_config()
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{name}")